@@ -0,0 +1,151 @@
+"""Async facade that keeps storage I/O off the event loop."""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+from bot.models import Receipt
+
+
+class AsyncStorage:
+    """Runs a storage backend's blocking calls on a bounded thread pool.
+
+    Wraps either `Storage` or `SQLiteStorage` and exposes the same methods as
+    coroutines, so cogs never do file I/O or pydantic parsing on the
+    discord.py event loop.
+    """
+
+    def __init__(self, storage, max_workers: int = 4, batch_size: int = 64):
+        """
+        Initialize the facade.
+
+        Args:
+            storage: Synchronous storage backend to wrap
+            max_workers: Size of the storage thread pool
+            batch_size: Receipts loaded per pool task in load_receipts
+        """
+        self.storage = storage
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+
+    @property
+    def data_dir(self) -> Path:
+        """Base data directory of the wrapped storage."""
+        return self.storage.data_dir
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run any blocking callable on the storage thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def save_receipt(self, receipt: Receipt) -> str:
+        """Save receipt and return its filename."""
+        return await self.run(self.storage.save_receipt, receipt)
+
+    async def load_receipt(self, filename: str) -> Optional[Receipt]:
+        """Load a single receipt."""
+        return await self.run(self.storage.load_receipt, filename)
+
+    async def load_ocr_text(self, receipt: Receipt) -> Optional[str]:
+        """Load a receipt's raw OCR text from the blob store."""
+        return await self.run(self.storage.load_ocr_text, receipt)
+
+    async def load_receipts(self, filenames: list[str]) -> list[Optional[Receipt]]:
+        """
+        Load many receipts, in order.
+
+        Filenames are split into batches so each pool task loads several
+        receipts, keeping scheduling overhead low for large scans while still
+        spreading the work across workers.
+        """
+        batches = [
+            filenames[i:i + self.batch_size]
+            for i in range(0, len(filenames), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(self.run(self._load_batch, batch) for batch in batches)
+        )
+        return [receipt for batch in results for receipt in batch]
+
+    def _load_batch(self, filenames: list[str]) -> list[Optional[Receipt]]:
+        """Load a batch of receipts on a worker thread."""
+        return [self.storage.load_receipt(filename) for filename in filenames]
+
+    async def list_receipts(self) -> list[str]:
+        """List all receipt filenames."""
+        return await self.run(self.storage.list_receipts)
+
+    async def iter_receipts(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        **filters,
+    ) -> tuple[list[Receipt], Optional[str]]:
+        """Return one page of receipts and the cursor for the next page."""
+        return await self.run(self.storage.iter_receipts, cursor, limit, **filters)
+
+    def complete_filenames(self, query: str, limit: int = 25) -> list[str]:
+        """Return filenames matching a partial name (in-memory, safe on the loop)."""
+        return self.storage.complete_filenames(query, limit)
+
+    def count_receipts(self) -> int:
+        """Number of stored receipts (in-memory, safe on the loop)."""
+        return self.storage.count_receipts()
+
+    async def delete_receipt(self, filename: str) -> bool:
+        """Delete a receipt."""
+        return await self.run(self.storage.delete_receipt, filename)
+
+    async def query_receipts(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        verified: Optional[bool] = None,
+        store: Optional[str] = None,
+    ) -> list[Receipt]:
+        """Load receipts matching the given filters."""
+        return await self.run(
+            self.storage.query_receipts, start=start, end=end, verified=verified, store=store
+        )
+
+    async def item_spending(self, product: str, month: Optional[str] = None) -> tuple[float, int]:
+        """Sum spending on items whose name contains a product string."""
+        return await self.run(self.storage.item_spending, product, month)
+
+    async def monthly_summary(self, month: str) -> tuple[float, int, int]:
+        """Return (total, receipt count, item count) for a month."""
+        return await self.run(self.storage.monthly_summary, month)
+
+    async def month_breakdown(self, month: str) -> dict[tuple[str, str], dict]:
+        """Return the rollup rows for a month."""
+        return await self.run(self.storage.month_breakdown, month)
+
+    async def range_summary(self, start: datetime, end: datetime) -> tuple[float, int]:
+        """Return (total, receipt count) between two datetimes."""
+        return await self.run(self.storage.range_summary, start, end)
+
+    async def rebuild_rollups(self) -> int:
+        """Recompute rollups from every stored receipt."""
+        return await self.run(self.storage.rebuild_rollups)
+
+    async def load_corrections(self) -> dict[str, str]:
+        """Load item name corrections."""
+        return await self.run(self.storage.load_corrections)
+
+    async def save_correction(self, raw_name: str, store: str, actual_name: str) -> None:
+        """Save a correction mapping."""
+        await self.run(self.storage.save_correction, raw_name, store, actual_name)
+
+    async def delete_correction(self, raw_name: str, store: str) -> bool:
+        """Delete a correction mapping."""
+        return await self.run(self.storage.delete_correction, raw_name, store)
+
+    def close(self) -> None:
+        """Wait for pending storage work and stop the thread pool."""
+        self._executor.shutdown(wait=True)
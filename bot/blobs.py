@@ -0,0 +1,113 @@
+"""Compressed, content-addressed blob store for large text fields."""
+
+import argparse
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency; fall back to gzip
+    zstandard = None
+
+
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+class BlobStore:
+    """Stores text blobs compressed on disk, addressed by SHA-256 of the text.
+
+    Identical texts share one blob. Blobs are laid out as
+    `<root>/<first two hex digits>/<sha256>.zst` (or `.gz` without zstandard).
+    """
+
+    def __init__(self, root: Path, compression: Optional[str] = None):
+        """
+        Initialize the blob store.
+
+        Args:
+            root: Directory holding the blobs
+            compression: "zstd" or "gzip"; defaults to zstd when available
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression = compression or ("zstd" if zstandard else "gzip")
+        if self.compression == "zstd" and not zstandard:
+            raise ValueError("zstd compression requires the zstandard package")
+
+    def put_text(self, text: str) -> str:
+        """Store text (if not already present) and return its SHA-256 hex digest."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if self._find(digest):
+            return digest
+
+        path = self._path(digest, self.compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp file per writer, so two threads storing the same text don't collide
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._compress(data))
+            os.replace(tmp_name, path)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            # Another writer stored the same blob first
+            if self._find(digest):
+                return digest
+            raise
+        return digest
+
+    def get_text(self, digest: str) -> Optional[str]:
+        """Return the text for a digest, or None if the blob is missing."""
+        path = self._find(digest)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.suffix == EXTENSIONS["zstd"]:
+            if not zstandard:
+                raise RuntimeError(f"{path} is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        return gzip.decompress(data).decode("utf-8")
+
+    def _compress(self, data: bytes) -> bytes:
+        """Compress bytes with the configured codec."""
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=9)
+
+    def _path(self, digest: str, compression: str) -> Path:
+        """Path of a blob for a given codec."""
+        return self.root / digest[:2] / f"{digest}{EXTENSIONS[compression]}"
+
+    def _find(self, digest: str) -> Optional[Path]:
+        """Locate an existing blob written with any codec."""
+        for compression in EXTENSIONS:
+            path = self._path(digest, compression)
+            if path.exists():
+                return path
+        return None
+
+
+def main():
+    """Command-line entry point: python -m bot.blobs migrate."""
+    from bot.storage import create_storage
+
+    parser = argparse.ArgumentParser(description="OCR text blob maintenance")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        storage = create_storage(args.backend, args.data_dir)
+        count = storage.externalize_ocr_text()
+        print(f"Moved raw OCR text of {count} receipts into blobs")
+
+
+if __name__ == "__main__":
+    main()
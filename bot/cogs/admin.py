@@ -0,0 +1,102 @@
+"""Admin cog - handles /admin commands for operating the bot."""
+
+import asyncio
+import discord
+from discord import app_commands
+from discord.ext import commands
+from bot.services.usage import OCR, UsageTracker
+from typing import Literal
+
+
+# Embed fields Discord allows per message, less the summary fields
+MAX_PERIOD_FIELDS = 22
+
+# Embed characters used before older periods are left out (Discord allows 6000)
+EMBED_BUDGET = 5000
+
+
+def format_tokens(tokens: int) -> str:
+    """Compact token count (e.g. 12.3k)."""
+    if tokens >= 1_000_000:
+        return f"{tokens / 1_000_000:.1f}M"
+    if tokens >= 1_000:
+        return f"{tokens / 1_000:.1f}k"
+    return str(tokens)
+
+
+class AdminCog(commands.Cog):
+    """Commands for server administrators: API usage and cost."""
+
+    def __init__(self, bot: commands.Bot, usage: UsageTracker):
+        """Initialize admin cog."""
+        self.bot = bot
+        self.usage = usage
+
+    admin_group = app_commands.Group(
+        name="admin",
+        description="Bot administration commands",
+        guild_only=True,
+        default_permissions=discord.Permissions(administrator=True),
+    )
+
+    @admin_group.command(
+        name="usage", description="Show OCR and LLM usage and cost by day or month"
+    )
+    async def usage_report(
+        self,
+        interaction: discord.Interaction,
+        period: Literal["day", "month"] = "day",
+        count: app_commands.Range[int, 1, 31] = 7,
+    ):
+        """Roll up this server's recorded calls by period, stage and model."""
+        rows, stores = await asyncio.gather(
+            asyncio.to_thread(self.usage.rollup, period, count, interaction.guild_id),
+            asyncio.to_thread(self.usage.top_stores, period, count, interaction.guild_id),
+        )
+
+        unit = "days" if period == "day" else "months"
+        embed = discord.Embed(title=f"API Usage: last {count} {unit}", color=0x0000FF)
+        if not rows:
+            embed.description = "No calls recorded."
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        by_period: dict[str, list[dict]] = {}
+        for row in rows:
+            by_period.setdefault(row["period"], []).append(row)
+
+        total_cost = sum(row["cost"] for row in rows)
+        total_calls = sum(row["calls"] for row in rows)
+        embed.add_field(name="Total Cost", value=f"${total_cost:.4f}", inline=True)
+        embed.add_field(name="Calls", value=str(total_calls), inline=True)
+
+        for name, period_rows in list(by_period.items())[:MAX_PERIOD_FIELDS]:
+            lines = []
+            for row in period_rows:
+                tokens = row["prompt_tokens"] + row["completion_tokens"]
+                volume = f"{row['pages']} pages" if row["stage"] == OCR else f"{format_tokens(tokens)} tokens"
+                failures = f", {row['failures']} failed" if row["failures"] else ""
+                extra = f" incl. {row['retries']} retries, {row['hedges']} hedges" if row["retries"] or row["hedges"] else ""
+                lines.append(
+                    f"• {row['stage']} `{row['model']}`: {row['calls']} calls{extra}{failures}, {volume}, "
+                    f"${row['cost']:.4f}, avg {row['avg_latency_ms'] / 1000:.1f}s"
+                )
+            period_cost = sum(row["cost"] for row in period_rows)
+            field_name, value = f"{name} (${period_cost:.4f})", "\n".join(lines)[:1024]
+            if len(embed) + len(field_name) + len(value) > EMBED_BUDGET:
+                embed.set_footer(text="Older periods omitted; use a shorter count")
+                break
+            embed.add_field(name=field_name, value=value, inline=False)
+
+        top = [
+            f"• {store['store'] or 'No store (OCR, batches)'}: ${store['cost']:.4f} ({store['calls']} calls)"
+            for store in stores
+        ]
+        embed.add_field(name="Top Stores by Cost", value="\n".join(top)[:1024], inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    """Setup function for loading the cog."""
+    pass
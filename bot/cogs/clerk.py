@@ -1,17 +1,19 @@
 """Clerk cog - handles /clerk commands for expense tracking."""
 
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
 from bot.services.sheets import SheetsService
-from bot.storage import Storage
+from bot.async_storage import AsyncStorage
+from bot.rollups import ALL_CATEGORIES, summarize_month_rows
 from datetime import datetime
 
 
 class ClerkCog(commands.Cog):
     """Commands for expense aggregation and Google Sheets sync."""
 
-    def __init__(self, bot: commands.Bot, sheets: SheetsService, storage: Storage):
+    def __init__(self, bot: commands.Bot, sheets: SheetsService, storage: AsyncStorage):
         """Initialize clerk cog."""
         self.bot = bot
         self.sheets = sheets
@@ -29,20 +31,15 @@ class ClerkCog(commands.Cog):
         await interaction.response.defer()
 
         try:
-            # Load all receipts
-            filenames = self.storage.list_receipts()
-            receipts = [
-                self.storage.load_receipt(f)
-                for f in filenames
-                if self.storage.load_receipt(f) and self.storage.load_receipt(f).verified
-            ]
+            # Load verified receipts
+            receipts = await self.storage.query_receipts(verified=True)
 
             if not receipts:
                 await interaction.followup.send("No verified receipts to sync.")
                 return
 
             # Sync to sheets
-            count = self.sheets.sync_multiple(receipts)
+            count = await asyncio.to_thread(self.sheets.sync_multiple, receipts)
 
             embed = discord.Embed(
                 title="Sync Complete",
@@ -64,27 +61,7 @@ class ClerkCog(commands.Cog):
         month: str = None,
     ):
         """Calculate total spending on a product."""
-        filenames = self.storage.list_receipts()
-        receipts = [self.storage.load_receipt(f) for f in filenames]
-
-        total = 0.0
-        count = 0
-
-        for receipt in receipts:
-            if not receipt:
-                continue
-
-            # Filter by month if specified
-            if month and not receipt.datetime.strftime("%Y-%m").startswith(month):
-                continue
-
-            for item in receipt.items:
-                item_name = (
-                    item.confirmed_name or item.guessed_name or item.raw_name
-                ).lower()
-                if product.lower() in item_name:
-                    total += item.price * item.quantity
-                    count += 1
+        total, count = await self.storage.item_spending(product, month)
 
         embed = discord.Embed(
             title=f"Spending on '{product}'",
@@ -108,21 +85,23 @@ class ClerkCog(commands.Cog):
         if not month:
             month = datetime.now().strftime("%Y-%m")
 
-        filenames = self.storage.list_receipts()
-        receipts = [self.storage.load_receipt(f) for f in filenames]
-
-        total = 0.0
-        receipt_count = 0
-        item_count = 0
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            await interaction.response.send_message(
+                "Invalid month format. Use YYYY-MM."
+            )
+            return
 
-        for receipt in receipts:
-            if not receipt:
-                continue
+        breakdown = await self.storage.month_breakdown(month)
+        total, receipt_count, item_count = summarize_month_rows(breakdown)
 
-            if receipt.datetime.strftime("%Y-%m") == month:
-                total += receipt.total
-                receipt_count += 1
-                item_count += len(receipt.items)
+        # Top categories across all stores
+        category_totals: dict[str, float] = {}
+        for (store, category), row in breakdown.items():
+            if category != ALL_CATEGORIES:
+                category_totals[category] = category_totals.get(category, 0.0) + row["total"]
+        top_categories = sorted(category_totals.items(), key=lambda kv: kv[1], reverse=True)[:5]
 
         embed = discord.Embed(
             title=f"Monthly Summary: {month}",
@@ -131,6 +110,12 @@ class ClerkCog(commands.Cog):
         embed.add_field(name="Total Spent", value=f"${total:.2f}", inline=False)
         embed.add_field(name="Receipts", value=str(receipt_count), inline=True)
         embed.add_field(name="Items", value=str(item_count), inline=True)
+        if top_categories:
+            embed.add_field(
+                name="Top Categories",
+                value="\n".join(f"• {name}: ${amount:.2f}" for name, amount in top_categories),
+                inline=False,
+            )
 
         await interaction.response.send_message(embed=embed)
 
@@ -153,19 +138,7 @@ class ClerkCog(commands.Cog):
             )
             return
 
-        filenames = self.storage.list_receipts()
-        receipts = [self.storage.load_receipt(f) for f in filenames]
-
-        total = 0.0
-        receipt_count = 0
-
-        for receipt in receipts:
-            if not receipt:
-                continue
-
-            if start <= receipt.datetime <= end:
-                total += receipt.total
-                receipt_count += 1
+        total, receipt_count = await self.storage.range_summary(start, end)
 
         embed = discord.Embed(
             title="Expense Report",
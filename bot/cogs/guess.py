@@ -4,7 +4,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from bot.services.guesser import ItemGuesser
-from bot.storage import Storage
+from bot.async_storage import AsyncStorage
 from bot.config import Settings
 
 
@@ -15,7 +15,7 @@ class GuessCog(commands.Cog):
         self,
         bot: commands.Bot,
         guesser: ItemGuesser,
-        storage: Storage,
+        storage: AsyncStorage,
         settings: Settings,
     ):
         """Initialize guess cog."""
@@ -52,7 +52,7 @@ class GuessCog(commands.Cog):
         await interaction.response.defer()
 
         # Save correction to storage
-        self.storage.save_correction(raw_name, store, actual_name)
+        await self.storage.save_correction(raw_name, store, actual_name)
 
         # Update guesser's corrections cache
         key = f"{raw_name}|{store}"
@@ -70,7 +70,7 @@ class GuessCog(commands.Cog):
         """Display all learned item name corrections."""
         await interaction.response.defer()
 
-        corrections = self.storage.load_corrections()
+        corrections = await self.storage.load_corrections()
 
         if not corrections:
             await interaction.followup.send("No corrections saved yet.")
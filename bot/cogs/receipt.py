@@ -1,16 +1,265 @@
 """Receipt processing cog - handles /receipt commands."""
 
+import asyncio
+import logging
+import time
 import discord
 from discord import app_commands
 from discord.ext import commands
-from datetime import datetime
 from bot.services.ocr import OCRService
 from bot.services.ai_extractor import AIExtractor
 from bot.services.guesser import ItemGuesser
-from bot.storage import Storage
-from bot.models import Receipt, ReceiptItem
+from bot.services.scheduler import BACKFILL, INTERACTIVE, request_context
+from bot.services.templates import TemplateExtractor
+from bot.async_storage import AsyncStorage
+from bot.image_index import DuplicateReceiptError, ImageHashIndex, dhash, hamming
+from bot.models import GuessResult, Receipt
 from bot.config import Settings
-import re
+from typing import Any, Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Most attachments a Discord message (and /receipt batch) can carry
+BATCH_LIMIT = 10
+
+
+class StreamingItemTable:
+    """One Discord message showing extracted items as they stream in.
+
+    The first item sends the message; later items edit it, at most once
+    per `interval` seconds to stay within Discord's edit rate limits.
+    Items are keyed by index, so a retried stream overwrites rather than
+    duplicates rows; `finish` re-renders from the final items, dropping
+    extra rows left by a failed or losing attempt.
+    """
+
+    MAX_ROWS = 20
+
+    def __init__(self, send: Callable[..., Awaitable[Any]], interval: float = 1.0):
+        """
+        Initialize the table.
+
+        Args:
+            send: Followup send coroutine; must accept `wait=True` and
+                return the sent message
+            interval: Minimum seconds between message edits
+        """
+        self.send = send
+        self.interval = interval
+        self.items: dict[int, dict] = {}
+        self.message = None
+        self.edits = 0
+        self._last_update = 0.0
+
+    async def add(self, index: int, item: dict) -> None:
+        """Record an item and refresh the message if the interval has passed."""
+        self.items[index] = item
+        if time.monotonic() - self._last_update >= self.interval:
+            await self._update(done=False)
+
+    async def finish(self, items: Optional[list[dict]] = None) -> None:
+        """
+        Show the final items and mark the table complete.
+
+        Args:
+            items: Items of the extraction that won; replaces the streamed rows
+        """
+        if self.message is None and not self.items:
+            return
+        if items is not None:
+            self.items = dict(enumerate(items))
+        await self._update(done=True)
+
+    def render(self, done: bool) -> str:
+        """Message content for the items received so far."""
+        rows = [self.items[index] for index in sorted(self.items)]
+        status = "🧾 Extracted" if done else "🧾 Extracting…"
+        lines = [f"{status} {len(rows)} item{'s' if len(rows) != 1 else ''}", "```"]
+        for item in rows[-self.MAX_ROWS:]:
+            name = str(item.get("raw_name", ""))
+            name = (name[:28] + "..") if len(name) > 30 else name
+            try:
+                price = f"${float(item.get('price', 0)):.2f}"
+            except (TypeError, ValueError):
+                price = "?"
+            lines.append(f"{name:<30} {price:>9}")
+        if len(rows) > self.MAX_ROWS:
+            lines.insert(2, f"... {len(rows) - self.MAX_ROWS} earlier items")
+        lines.append("```")
+        return "\n".join(lines)
+
+    async def _update(self, done: bool) -> None:
+        """Send or edit the message; a failed edit never fails extraction."""
+        self._last_update = time.monotonic()
+        content = self.render(done)
+        try:
+            if self.message is None:
+                self.message = await self.send(content, wait=True)
+            else:
+                await self.message.edit(content=content)
+            self.edits += 1
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update streamed item table: {e}")
+
+
+class BatchPhotos:
+    """Perceptual hashes of the photos accepted so far in one batch.
+
+    A batch's receipts run concurrently, so none is in the image index
+    before the others are checked; this catches a photo attached twice.
+    Photos are claimed in attachment order, whichever finishes hashing
+    first, so the first attachment is the one processed.
+    """
+
+    def __init__(self, max_distance: int, count: int):
+        """
+        Initialize the set.
+
+        Args:
+            max_distance: Largest Hamming distance treated as the same photo
+            count: Number of attachments in the batch
+        """
+        self.max_distance = max_distance
+        self._hashes: list[tuple[int, str]] = []
+        self._turns = [asyncio.Event() for _ in range(count)]
+
+    async def claim(self, index: int, image_hash: Optional[int], name: str) -> None:
+        """
+        Accept a photo unless an earlier one in the batch matches it.
+
+        Waits until every earlier attachment has been claimed or has failed.
+
+        Args:
+            index: Position of the attachment in the batch
+            image_hash: The photo's perceptual hash, or None if it has none
+            name: Attachment filename, reported for later matches
+
+        Raises:
+            DuplicateReceiptError: An earlier attachment is the same photo
+        """
+        if index:
+            await self._turns[index - 1].wait()
+        try:
+            if image_hash is None:
+                return
+            for other_hash, other_name in self._hashes:
+                distance = hamming(image_hash, other_hash)
+                if distance <= self.max_distance:
+                    raise DuplicateReceiptError(other_name, distance, in_batch=True)
+            self._hashes.append((image_hash, name))
+        finally:
+            self._turns[index].set()
+
+    async def skip(self, index: int) -> None:
+        """Give up an attachment's turn without claiming a photo (e.g. it failed)."""
+        if index:
+            await self._turns[index - 1].wait()
+        self._turns[index].set()
+
+
+class BatchExtraction:
+    """Gathers the OCR text of a batch's receipts and extracts them in one call.
+
+    Every receipt either submits its text through `extract` or leaves
+    without one (template hit, duplicate, failure). Once all have done one
+    or the other, the submitted texts go to `AIExtractor.extract_batch`
+    together and each submitter receives its own result or error.
+    """
+
+    def __init__(self, ai_extractor: AIExtractor, receipts: int):
+        """
+        Initialize the batch.
+
+        Args:
+            ai_extractor: Extractor whose extract_batch is called
+            receipts: Number of receipts in the batch
+        """
+        self.ai_extractor = ai_extractor
+        self.outstanding = receipts
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def extract(self, ocr_text: str) -> dict:
+        """Submit one receipt's OCR text and wait for its extracted data."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((ocr_text, future))
+        self._arrived()
+        return await future
+
+    def leave(self) -> None:
+        """Record a receipt that will not submit any text."""
+        self._arrived()
+
+    def _arrived(self) -> None:
+        """Count a receipt off and send the batch once none are outstanding."""
+        self.outstanding -= 1
+        if self.outstanding == 0 and self._pending:
+            pending, self._pending = self._pending, []
+            self._task = asyncio.ensure_future(self._send(pending))
+
+    async def _send(self, pending: list[tuple[str, asyncio.Future]]) -> None:
+        """Extract the submitted texts and hand each result to its receipt."""
+        try:
+            results = await self.ai_extractor.extract_batch([text for text, _ in pending])
+        except Exception as e:
+            results = [e] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class ReceiptListView(discord.ui.View):
+    """Prev/Next buttons paging through stored receipts with a keyset cursor."""
+
+    PAGE_SIZE = 25
+
+    def __init__(self, storage: AsyncStorage, user_id: int):
+        """Initialize the view for the user who ran the command."""
+        super().__init__(timeout=300)
+        self.storage = storage
+        self.user_id = user_id
+        # Cursor that starts each page seen so far; the last one is the current page
+        self.page_cursors: list[Optional[str]] = [None]
+        self.next_cursor: Optional[str] = None
+        self.receipts: list[Receipt] = []
+
+    async def load_page(self) -> discord.Embed:
+        """Load the current page and return its embed."""
+        self.receipts, self.next_cursor = await self.storage.iter_receipts(
+            self.page_cursors[-1], limit=self.PAGE_SIZE
+        )
+        self.previous_page.disabled = len(self.page_cursors) == 1
+        self.next_page.disabled = self.next_cursor is None
+
+        embed = discord.Embed(title="Stored Receipts", color=0x0000FF)
+        embed.description = "\n".join(
+            f"{'✓' if r.verified else '•'} `{r.filename}` ${r.total:.2f}" for r in self.receipts
+        )
+        first = (len(self.page_cursors) - 1) * self.PAGE_SIZE + 1
+        total = self.storage.count_receipts()
+        embed.set_footer(text=f"Showing {first}-{first + len(self.receipts) - 1} of {total} receipts")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Only the user who ran /receipt list can page through it."""
+        return interaction.user.id == self.user_id
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Go back one page."""
+        self.page_cursors.pop()
+        await interaction.response.edit_message(embed=await self.load_page(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Go forward one page."""
+        self.page_cursors.append(self.next_cursor)
+        await interaction.response.edit_message(embed=await self.load_page(), view=self)
 
 
 class ReceiptCog(commands.Cog):
@@ -20,10 +269,12 @@ class ReceiptCog(commands.Cog):
         self,
         bot: commands.Bot,
         ocr_service: OCRService,
-        storage: Storage,
+        storage: AsyncStorage,
         guesser: ItemGuesser,
         ai_extractor: AIExtractor,
         settings: Settings,
+        image_index: Optional[ImageHashIndex] = None,
+        templates: Optional[TemplateExtractor] = None,
     ):
         """Initialize receipt cog."""
         self.bot = bot
@@ -32,6 +283,18 @@ class ReceiptCog(commands.Cog):
         self.guesser = guesser
         self.ai_extractor = ai_extractor
         self.settings = settings
+        self.image_index = image_index
+        self.templates = templates
+
+        # Context menus cannot be declared inside a cog class
+        self.process_menu = app_commands.ContextMenu(
+            name="Process receipts", callback=self.process_message_attachments
+        )
+        self.bot.tree.add_command(self.process_menu)
+
+    async def cog_unload(self) -> None:
+        """Remove the context menu registered in __init__."""
+        self.bot.tree.remove_command(self.process_menu.name, type=self.process_menu.type)
 
     receipt_group = app_commands.Group(
         name="receipt", description="Receipt processing commands"
@@ -39,61 +302,35 @@ class ReceiptCog(commands.Cog):
 
     @receipt_group.command(name="process", description="Upload and process a receipt image")
     async def process(
-        self, interaction: discord.Interaction, image: discord.Attachment
+        self, interaction: discord.Interaction, image: discord.Attachment, force: bool = False
     ):
-        """Process a receipt image with OCR and automatically guess item names."""
+        """Process a receipt image with OCR and automatically guess item names.
+
+        A photo of a receipt that has already been saved is rejected before
+        any API call unless `force` is set.
+        """
         await interaction.response.defer()
 
         try:
-            # Step 1: Download image
+            # Download image and run the pipeline, reporting each step
             image_bytes = await image.read()
+            table = (
+                StreamingItemTable(interaction.followup.send)
+                if self.settings.streaming_extraction else None
+            )
+            with request_context(interaction.guild_id, INTERACTIVE):
+                parsed, filename, validation_issues, needs_review = await self._process_one(
+                    image_bytes, progress=interaction.followup.send, force=force,
+                    on_item=table.add if table else None,
+                )
+            if table:
+                await table.finish([item.model_dump() for item in parsed.items])
 
-            # Step 2: OCR
-            await interaction.followup.send("🔍 Processing receipt with OCR...")
-            ocr_text = await self.ocr_service.process_image(image_bytes)
-
-            # Step 3: AI Extraction
-            await interaction.followup.send("🤖 Extracting structured data...")
-            extracted_data = await self.ai_extractor.extract_receipt_data(ocr_text)
-            parsed = self.ai_extractor.convert_to_receipt(extracted_data, ocr_text)
-
-            # Validate extracted data
-            validation_issues = self._validate_receipt(parsed)
             if validation_issues:
                 issues_text = "\n".join(f"• {issue}" for issue in validation_issues)
                 await interaction.followup.send(f"⚠️ **Validation Issues:**\n{issues_text}")
 
-            # Step 4: Save receipt (unguessed)
-            filename = self.storage.save_receipt(parsed)
-
-            # Step 5: AUTO-GUESS ITEMS
-            await interaction.followup.send("🤖 Guessing item names...")
-
-            # Load latest corrections
-            corrections = self.storage.load_corrections()
-            self.guesser.update_corrections(corrections)
-
-            # Batch guess all items
-            guess_results = await self.guesser.guess_batch(parsed.items, parsed.store)
-
-            # Update items with guesses
-            needs_review = 0
-            for item, guess_result in zip(parsed.items, guess_results):
-                item.guessed_name = guess_result.product_name
-                item.confidence = guess_result.confidence
-
-                # Mark for review if confidence is low
-                if guess_result.confidence < self.settings.confidence_threshold:
-                    item.needs_review = True
-                    needs_review += 1
-
-            # Save updated receipt with guesses
-            self.storage.save_receipt(parsed)
-
-            # Save items to TSV file
-            self._save_items_to_tsv(parsed)
-
-            # Step 6: Send final result with table
+            # Send final result with table
             embed = discord.Embed(
                 title="✅ Receipt Processed & Items Guessed",
                 color=0x00FF00,
@@ -142,31 +379,286 @@ class ReceiptCog(commands.Cog):
 
             await interaction.followup.send(embed=embed)
 
+        except DuplicateReceiptError as e:
+            await interaction.followup.send(
+                f"♻️ This receipt looks {e}. "
+                f"See `/receipt show filename:{e.filename}`, or run `/receipt process` "
+                f"with `force: True` to process it again."
+            )
         except Exception as e:
             await interaction.followup.send(f"❌ Error processing receipt: {e}")
 
+    @receipt_group.command(name="batch", description="Process up to 10 receipt images at once")
+    async def batch(
+        self,
+        interaction: discord.Interaction,
+        image1: discord.Attachment,
+        image2: Optional[discord.Attachment] = None,
+        image3: Optional[discord.Attachment] = None,
+        image4: Optional[discord.Attachment] = None,
+        image5: Optional[discord.Attachment] = None,
+        image6: Optional[discord.Attachment] = None,
+        image7: Optional[discord.Attachment] = None,
+        image8: Optional[discord.Attachment] = None,
+        image9: Optional[discord.Attachment] = None,
+        image10: Optional[discord.Attachment] = None,
+    ):
+        """Process several receipt images concurrently."""
+        images = [
+            image for image in (
+                image1, image2, image3, image4, image5,
+                image6, image7, image8, image9, image10,
+            )
+            if image is not None
+        ]
+        await interaction.response.defer()
+        await self._process_batch(interaction, images)
+
+    async def process_message_attachments(
+        self, interaction: discord.Interaction, message: discord.Message
+    ):
+        """Context menu: process every image attached to a message."""
+        images = [
+            attachment for attachment in message.attachments
+            if (attachment.content_type or "").startswith("image/")
+            or attachment.filename.lower().endswith((".heic", ".heif"))
+        ]
+        if not images:
+            await interaction.response.send_message("No images attached to that message.", ephemeral=True)
+            return
+
+        await interaction.response.defer()
+        await self._process_batch(interaction, images[:BATCH_LIMIT])
+
+    async def _process_batch(
+        self, interaction: discord.Interaction, images: list[discord.Attachment]
+    ) -> None:
+        """Run the pipeline on several images at once and report one embed.
+
+        Receipts run concurrently in the backfill lane of the request
+        scheduler, so single uploads (interactive) are served ahead of a
+        large batch and one server's batch cannot starve the others. Receipts
+        that need the LLM are extracted together through BatchExtraction,
+        sharing the instruction prompt across a few receipts per request.
+        """
+        await interaction.followup.send(f"🔍 Processing {len(images)} receipts...")
+        started = time.perf_counter()
+        extraction = BatchExtraction(self.ai_extractor, len(images))
+        photos = (
+            BatchPhotos(self.image_index.max_distance, len(images))
+            if self.image_index is not None else None
+        )
+
+        async def run(index: int, image: discord.Attachment):
+            submitted = False
+
+            async def extract(ocr_text: str) -> dict:
+                nonlocal submitted
+                submitted = True
+                return await extraction.extract(ocr_text)
+
+            async def claim(image_hash: Optional[int]) -> None:
+                await photos.claim(index, image_hash, image.filename)
+
+            try:
+                return await self._process_one(
+                    await image.read(), extract=extract, claim=claim if photos is not None else None
+                )
+            finally:
+                if not submitted:
+                    extraction.leave()
+                if photos is not None:
+                    await photos.skip(index)
+
+        with request_context(interaction.guild_id, BACKFILL):
+            results = await asyncio.gather(
+                *(run(index, image) for index, image in enumerate(images)),
+                return_exceptions=True,
+            )
+        elapsed = time.perf_counter() - started
+
+        lines = []
+        total = 0.0
+        processed = 0
+        needs_review_total = 0
+        for image, result in zip(images, results):
+            if isinstance(result, DuplicateReceiptError):
+                lines.append(f"♻️ `{image.filename}`: {result}")
+                continue
+            if isinstance(result, Exception):
+                lines.append(f"❌ `{image.filename}`: {result}")
+                continue
+
+            parsed, filename, validation_issues, needs_review = result
+            processed += 1
+            total += parsed.total
+            needs_review_total += needs_review
+            line = f"✅ `{filename}` {parsed.store} ${parsed.total:.2f} ({len(parsed.items)} items"
+            line += f", {needs_review} to review)" if needs_review else ")"
+            if validation_issues:
+                line += f"\n   ⚠️ {'; '.join(validation_issues)}"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title=f"Processed {processed} of {len(images)} Receipts",
+            description="\n".join(lines)[:4096],
+            color=0x00FF00 if processed == len(images) else 0xFFFF00,
+        )
+        embed.add_field(name="Total", value=f"${total:.2f}", inline=True)
+        embed.add_field(name="Needs Review", value=needs_review_total, inline=True)
+        embed.set_footer(text=f"Finished in {elapsed:.1f}s")
+        await interaction.followup.send(embed=embed)
+
+    async def _process_one(
+        self,
+        image_bytes: bytes,
+        progress: Optional[Callable[[str], Awaitable[Any]]] = None,
+        force: bool = False,
+        on_item: Optional[Callable[[int, dict], Awaitable[Any]]] = None,
+        extract: Optional[Callable[[str], Awaitable[dict]]] = None,
+        claim: Optional[Callable[[Optional[int]], Awaitable[Any]]] = None,
+    ) -> tuple[Receipt, str, list[str], int]:
+        """
+        Run OCR, extraction and guessing on one image and save the receipt.
+
+        Args:
+            image_bytes: Raw image bytes
+            progress: Optional coroutine called with a status line before each step
+            force: Process even if the photo matches a saved receipt
+            on_item: Optional coroutine called with (index, item) as LLM
+                extraction streams items
+            extract: Optional coroutine that turns OCR text into extracted
+                data instead of a single extraction request (e.g. a
+                BatchExtraction)
+            claim: Optional coroutine given the photo's hash (None if it has
+                none) before OCR; raises DuplicateReceiptError for a photo
+                repeated in the same batch
+
+        Returns:
+            Tuple of (receipt, filename, validation issues, items needing review)
+
+        Raises:
+            DuplicateReceiptError: The photo matches a saved receipt (and not
+                force), or an earlier photo of the same batch
+        """
+        async def report(message: str) -> None:
+            if progress:
+                await progress(message)
+
+        # Preprocess once; the duplicate check and OCR share the result
+        image_bytes = await self.ocr_service.prepare(image_bytes)
+        image_hash = await self._check_duplicate(image_bytes, force)
+        if claim:
+            await claim(image_hash)
+
+        # Step 1: OCR
+        await report("🔍 Processing receipt with OCR...")
+        ocr_text = await self.ocr_service.process_image(image_bytes, prepared=True)
+
+        # Step 2: Extraction, from a store template when the layout is known
+        parsed = (
+            self.templates.extract(ocr_text, self._validate_receipt) if self.templates else None
+        )
+        if parsed is None:
+            await report("🤖 Extracting structured data...")
+            if extract:
+                extracted_data = await extract(ocr_text)
+            else:
+                extracted_data = await self.ai_extractor.extract_receipt_data(ocr_text, on_item=on_item)
+            parsed = self.ai_extractor.convert_to_receipt(extracted_data, ocr_text)
+
+        # Validate extracted data
+        validation_issues = self._validate_receipt(parsed)
+
+        # Step 3: Save receipt (unguessed)
+        filename = await self.storage.save_receipt(parsed)
+        if image_hash is not None:
+            await self.storage.run(self.image_index.add, image_hash, filename)
+
+        # Step 4: AUTO-GUESS ITEMS
+        # Load latest corrections
+        corrections = await self.storage.load_corrections()
+        self.guesser.update_corrections(corrections)
+
+        # Corrections win; fused extraction may already have guessed the rest
+        guess_results = [
+            self.guesser.correction(item.raw_name, parsed.store)
+            or (GuessResult(product_name=item.guessed_name, confidence=item.confidence)
+                if item.guessed_name else None)
+            for item in parsed.items
+        ]
+
+        # Batch guess the items still without a name
+        missing = [item for item, guess in zip(parsed.items, guess_results) if guess is None]
+        if missing:
+            await report("🤖 Guessing item names...")
+            guessed = iter(await self.guesser.guess_batch(missing, parsed.store))
+            guess_results = [guess or next(guessed) for guess in guess_results]
+
+        # Update items with guesses
+        needs_review = 0
+        for item, guess_result in zip(parsed.items, guess_results):
+            item.guessed_name = guess_result.product_name
+            item.confidence = guess_result.confidence
+
+            # Mark for review if confidence is low
+            if guess_result.confidence < self.settings.confidence_threshold:
+                item.needs_review = True
+                needs_review += 1
+
+        # Save updated receipt with guesses
+        await self.storage.save_receipt(parsed)
+
+        # Save items to TSV file
+        await self.storage.run(self._save_items_to_tsv, parsed)
+
+        return parsed, filename, validation_issues, needs_review
+
+    async def _check_duplicate(self, image_bytes: bytes, force: bool) -> Optional[int]:
+        """
+        Hash a photo and reject it if it matches an already-saved receipt.
+
+        Returns:
+            The photo's perceptual hash, or None when there is no index or
+            the image cannot be decoded
+
+        Raises:
+            DuplicateReceiptError: A saved receipt's photo is within the
+                index's distance (and not force)
+        """
+        if self.image_index is None:
+            return None
+        try:
+            image_hash = await asyncio.to_thread(dhash, image_bytes)
+        except Exception:
+            # Undecodable here (e.g. HEIC without pillow-heif); OCR may still read it
+            return None
+
+        match = None if force else self.image_index.find(image_hash)
+        if match:
+            filename, distance = match
+            if await self.storage.load_receipt(filename):
+                raise DuplicateReceiptError(filename, distance)
+            # Receipt was removed outside the bot
+            await self.storage.run(self.image_index.remove, filename)
+        return image_hash
+
     @receipt_group.command(name="list", description="List all processed receipts")
     async def list_receipts(self, interaction: discord.Interaction):
-        """List all stored receipts."""
-        receipts = self.storage.list_receipts()
+        """List stored receipts, one page at a time."""
+        view = ReceiptListView(self.storage, interaction.user.id)
+        embed = await view.load_page()
 
-        if not receipts:
+        if not view.receipts:
             await interaction.response.send_message("No receipts found.")
             return
 
-        embed = discord.Embed(title="Stored Receipts", color=0x0000FF)
-        receipt_list = "\n".join(f"• {r}" for r in receipts[:25])
-        embed.description = receipt_list
-
-        if len(receipts) > 25:
-            embed.set_footer(text=f"Showing 25 of {len(receipts)} receipts")
-
-        await interaction.response.send_message(embed=embed)
+        await interaction.response.send_message(embed=embed, view=view)
 
     @receipt_group.command(name="show", description="Display a specific receipt")
     async def show(self, interaction: discord.Interaction, filename: str):
         """Show details of a specific receipt."""
-        receipt = self.storage.load_receipt(filename)
+        receipt = await self.storage.load_receipt(filename)
 
         if not receipt:
             await interaction.response.send_message("Receipt not found.")
@@ -193,98 +685,41 @@ class ReceiptCog(commands.Cog):
     @receipt_group.command(name="verify", description="Mark receipt as verified")
     async def verify(self, interaction: discord.Interaction, filename: str):
         """Mark a receipt as verified."""
-        receipt = self.storage.load_receipt(filename)
+        receipt = await self.storage.load_receipt(filename)
 
         if not receipt:
             await interaction.response.send_message("Receipt not found.")
             return
 
         receipt.verified = True
-        self.storage.save_receipt(receipt)
+        await self.storage.save_receipt(receipt)
 
         await interaction.response.send_message(f"Receipt `{filename}` marked as verified.")
 
     @receipt_group.command(name="delete", description="Delete a receipt")
     async def delete(self, interaction: discord.Interaction, filename: str):
         """Delete a stored receipt."""
-        success = self.storage.delete_receipt(filename)
+        success = await self.storage.delete_receipt(filename)
 
         if success:
+            if self.image_index is not None:
+                await self.storage.run(self.image_index.remove, filename)
             await interaction.response.send_message(f"Receipt `{filename}` deleted.")
         else:
             await interaction.response.send_message("Receipt not found.")
 
-    def _parse_receipt(self, ocr_text: str) -> Receipt:
-        """Parse OCR text into a Receipt object (basic implementation)."""
-        lines = [line.strip() for line in ocr_text.strip().split("\n") if line.strip()]
-
-        # Simple heuristics for parsing
-        store = lines[0] if lines else "Unknown Store"
-        total = 0.0
-        items = []
-
-        # Look for total (prioritize lines with just "total", not "subtotal")
-        for line in lines:
-            line_lower = line.lower()
-            # Match "total" but not "subtotal"
-            if line_lower.startswith("total") or " total " in line_lower or line_lower.endswith("total"):
-                # Extract price from line (take the last match)
-                matches = re.findall(r"\$?(\d+\.\d{2})", line)
-                if matches:
-                    total = float(matches[-1])
-                    break  # Stop at first "total" match
-
-        # Keywords to skip (not actual items)
-        skip_keywords = [
-            "total", "subtotal", "amount", "change", "rounding",
-            "gst", "tax", "card", "eft", "credit", "debit",
-            "sales", "payment", "net", "cash"
+    @show.autocomplete("filename")
+    @verify.autocomplete("filename")
+    @delete.autocomplete("filename")
+    async def filename_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest stored receipt filenames matching what has been typed."""
+        return [
+            app_commands.Choice(name=filename, value=filename)
+            for filename in self.storage.complete_filenames(current, limit=25)
         ]
 
-        # Basic item extraction (simplified)
-        for line in lines:
-            # Look for lines with prices
-            matches = re.findall(r"(.+?)\s+\$?(\d+\.\d{2})", line)
-            if matches:
-                name, price = matches[0]
-                price_float = float(price)
-
-                # Skip if price is 0 or negative
-                if price_float <= 0:
-                    continue
-
-                # Skip lines containing common non-item keywords
-                if any(keyword in line.lower() for keyword in skip_keywords):
-                    continue
-
-                # Skip lines that look like dates (e.g., "30.12.25" or "02/01/2026")
-                # Check if line contains date patterns: DD.MM.YY or MM/DD/YYYY
-                if re.search(r'\d{1,2}[./]\d{1,2}[./]\d{2,4}', line):
-                    continue
-
-                # Skip lines that look like transaction codes or reference numbers
-                # Lines starting with * or # followed by digits, or containing REF/TRANS/TERMINAL
-                if re.search(r'^[*#]\d+|REF|TRANS|TERMINAL', line, re.IGNORECASE):
-                    continue
-
-                # Try to create ReceiptItem, skip if validation fails
-                try:
-                    items.append(
-                        ReceiptItem(raw_name=name.strip(), price=price_float)
-                    )
-                except Exception:
-                    # Skip invalid items silently
-                    continue
-
-        return Receipt(
-            filename="",
-            store=store,
-            datetime=datetime.now(),
-            raw_ocr_text=ocr_text,
-            items=items,
-            total=total,
-        )
-
     def _validate_receipt(self, receipt: Receipt) -> list[str]:
         """Validate extracted receipt data.
 
@@ -323,8 +758,8 @@ class ReceiptCog(commands.Cog):
         items_dir = Path(self.storage.data_dir) / "items"
         items_dir.mkdir(parents=True, exist_ok=True)
 
-        # Generate TSV filename based on receipt datetime and store
-        tsv_filename = f"{receipt.datetime:%Y-%m-%d_%H%M}_{receipt.store.lower().replace(' ', '_')}_items.tsv"
+        # Name the TSV after the receipt file so it is unique per receipt
+        tsv_filename = f"{Path(receipt.filename).stem}_items.tsv"
         tsv_path = items_dir / tsv_filename
 
         # Write items to TSV
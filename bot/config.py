@@ -14,10 +14,32 @@ class Settings(BaseSettings):
     # Mistral OCR
     mistral_api_key: str
     mistral_ocr_model: str = "mistral-ocr-latest"
+    ocr_backend: str = "mistral"  # "mistral", "tesseract" or "local-first"
+    ocr_min_lines: int = 8  # Lines local OCR needs before local-first accepts it
 
     # OpenRouter (for AI extraction and guessing)
     openrouter_api_key: str
     openrouter_model: str = "openai/gpt-4o-mini"
+    extraction_max_concurrency: int = 4  # Extraction requests in flight at once
+    guess_max_concurrency: int = 4  # Item-guessing requests in flight at once
+    guess_timeout_seconds: float = 30.0  # Abandon (and retry) a guessing request after this long
+    streaming_extraction: bool = False  # Stream extraction and show items as they arrive in /receipt process
+    fused_extraction: bool = False  # Guess full item names in the extraction call (one LLM call, not two)
+    ocr_pruning: bool = True  # Strip card slips and footers from OCR text sent to the LLM
+    template_extraction: bool = True  # Parse known store layouts locally before calling the LLM
+    extraction_batch_size: int = 4  # Receipts per extraction request in /receipt batch; 1 disables packing
+    extraction_batch_tokens: int = 6000  # Token budget of one batched extraction request
+
+    # Provider rate limits shared by all requests (0 = unlimited)
+    mistral_rpm: int = 60
+    openrouter_rpm: int = 120
+    openrouter_tpm: int = 200000
+
+    # Retries, hedging and circuit breaking for Mistral and OpenRouter calls
+    retry_max_attempts: int = 3  # Attempts per request on 429/5xx/network errors
+    request_hedging: bool = True  # Duplicate a request that outlives the p95 latency
+    circuit_failure_threshold: int = 5  # Consecutive failures before failing fast
+    circuit_reset_seconds: float = 30.0  # How long to fail fast before trying again
 
     # Google Sheets
     google_credentials_path: str = "credentials.json"
@@ -26,6 +48,15 @@ class Settings(BaseSettings):
     # Application Settings
     confidence_threshold: float = 0.7
     data_dir: str = "data"
+    storage_backend: str = "json"  # "json" or "sqlite"
+    storage_workers: int = 4  # Thread pool size for storage I/O
+    ocr_cache_max_mb: int = 64  # Disk cache of OCR output keyed by image hash
+    extraction_cache_max_mb: int = 16  # Disk cache of extraction results keyed by OCR text; 0 disables
+    ocr_max_concurrency: int = 4  # OCR requests in flight at once
+    ocr_preprocess: bool = True  # Grayscale, crop and downsample photos before upload
+    ocr_target_dpi: int = 300  # Receipt resolution after preprocessing
+    usage_tracking: bool = True  # Record tokens, latency and cost of every API call in data/usage.db
+    duplicate_max_distance: int = 10  # Photo hash bits (of 64) that may differ for a duplicate; 0 disables
     log_level: str = "INFO"
 
     model_config = SettingsConfigDict(
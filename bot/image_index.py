@@ -0,0 +1,178 @@
+"""Perceptual-hash index of processed receipt photos for duplicate detection."""
+
+import io
+import threading
+from pathlib import Path
+from typing import Optional
+from PIL import Image, ImageOps
+from bot.journal import KeyedJournal
+from bot.services.preprocess import find_receipt_columns
+
+
+class DuplicateReceiptError(Exception):
+    """Raised when a photo matches a receipt that has already been saved."""
+
+    def __init__(self, filename: str, distance: int, in_batch: bool = False):
+        """
+        Record the existing receipt and how close the photos are.
+
+        Args:
+            filename: Saved receipt, or (in_batch) the earlier attachment
+            distance: Hamming distance between the photos' hashes
+            in_batch: The match is another photo of the same upload
+        """
+        super().__init__(
+            f"same photo as `{filename}` in this batch" if in_batch else f"already saved as `{filename}`"
+        )
+        self.filename = filename
+        self.distance = distance
+        self.in_batch = in_batch
+
+
+def dhash(image_bytes: bytes, size: int = 8) -> int:
+    """
+    Compute the difference hash of an image.
+
+    The photo is upright-rotated, converted to grayscale and cropped to the
+    receipt's width (as for OCR), then shrunk to (size + 1) x size. Each bit
+    records whether a pixel is brighter than its right-hand neighbour, so
+    the hash survives re-encoding, resizing and small shifts in framing.
+
+    Args:
+        image_bytes: Raw image bytes (HEIC needs pillow-heif)
+        size: Hash side; the hash has size * size bits
+
+    Returns:
+        The hash as an int
+    """
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes))).convert("L")
+    columns = find_receipt_columns(image)
+    if columns:
+        image = image.crop((columns[0], 0, columns[1], image.height))
+
+    pixels = image.resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+class HammingIndex:
+    """Multi-index hashing for fixed-radius search under Hamming distance.
+
+    A 64-bit hash is split into four 16-bit chunks, each with its own
+    table. If two hashes are within `max_distance`, then by pigeonhole at
+    least one chunk differs in at most max_distance // 4 bits, so a search
+    only probes each table at the query chunk's near neighbours. That is a
+    few hundred dict lookups, independent of the number of stored hashes.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self, max_distance: int = 10):
+        """
+        Create an empty index.
+
+        Args:
+            max_distance: Search radius in bits
+        """
+        self.max_distance = max_distance
+        chunk_radius = max_distance // self.CHUNKS
+        # XOR masks of every 16-bit value within chunk_radius of zero
+        self._masks = [
+            mask for mask in range(1 << self.CHUNK_BITS) if mask.bit_count() <= chunk_radius
+        ]
+        self._tables: list[dict[int, set[int]]] = [{} for _ in range(self.CHUNKS)]
+        self._values: dict[int, list] = {}
+
+    def _chunks(self, value_hash: int) -> list[int]:
+        """Split a hash into its chunks."""
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(value_hash >> (i * self.CHUNK_BITS)) & mask for i in range(self.CHUNKS)]
+
+    def add(self, value_hash: int, value) -> None:
+        """Insert a value under a hash (equal hashes share an entry)."""
+        if value_hash not in self._values:
+            self._values[value_hash] = []
+            for table, chunk in zip(self._tables, self._chunks(value_hash)):
+                table.setdefault(chunk, set()).add(value_hash)
+        self._values[value_hash].append(value)
+
+    def search(self, query: int) -> list[tuple[int, object]]:
+        """Return (distance, value) for every value within max_distance, closest first."""
+        candidates: set[int] = set()
+        for table, chunk in zip(self._tables, self._chunks(query)):
+            for mask in self._masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates |= bucket
+
+        matches = []
+        for candidate in candidates:
+            distance = hamming(query, candidate)
+            if distance <= self.max_distance:
+                matches.extend((distance, value) for value in self._values[candidate])
+        return sorted(matches, key=lambda match: match[0])
+
+
+class ImageHashIndex:
+    """Hashes of processed receipt photos, keyed by receipt filename.
+
+    Persisted through a KeyedJournal (filename -> hex hash) and searched
+    through an in-memory HammingIndex. Removed receipts stay in the search
+    index until restart but are filtered out of results.
+    """
+
+    def __init__(self, path: Path, max_distance: int = 10):
+        """
+        Load the index.
+
+        Args:
+            path: Journal file (e.g. data/image_hashes.jsonl)
+            max_distance: Largest Hamming distance (of 64 bits) treated as
+                the same receipt
+        """
+        self.journal = KeyedJournal(path)
+        self.max_distance = max_distance
+        self.index = HammingIndex(max_distance)
+        self._lock = threading.Lock()
+        for filename, hex_hash in self.journal.snapshot().items():
+            self.index.add(int(hex_hash, 16), filename)
+
+    def find(self, image_hash: int) -> Optional[tuple[str, int]]:
+        """Return (filename, distance) of the closest stored photo, or None."""
+        with self._lock:
+            matches = self.index.search(image_hash)
+        for distance, filename in matches:
+            stored = self.journal.get(filename)
+            # Skip receipts removed (or re-hashed) since they were indexed
+            if stored is not None and hamming(int(stored, 16), image_hash) == distance:
+                return filename, distance
+        return None
+
+    def add(self, image_hash: int, filename: str) -> None:
+        """Record the photo a receipt was processed from."""
+        with self._lock:
+            self.index.add(image_hash, filename)
+        self.journal.set(filename, f"{image_hash:016x}")
+
+    def remove(self, filename: str) -> None:
+        """Forget a receipt's photo (e.g. when the receipt is deleted)."""
+        self.journal.delete(filename)
+
+    def __len__(self) -> int:
+        """Number of indexed receipts."""
+        return len(self.journal.data)
+
+    def close(self) -> None:
+        """Close the underlying journal."""
+        self.journal.close()
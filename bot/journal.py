@@ -0,0 +1,194 @@
+"""Append-only JSON-lines key/value journal with compaction."""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def _write_snapshot(path: Path, data: dict[str, Any]) -> None:
+    """Atomically replace `path` with one set record per key."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for key, value in data.items():
+            record = {"op": "set", "key": key, "value": value}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class KeyedJournal:
+    """Key/value store persisted as an append-only JSON-lines log.
+
+    Every write appends one record, so writes are O(1) and a crash can at
+    worst lose a torn final line. The log is replayed into memory on open
+    and rewritten (compacted) once enough records are superseded.
+    """
+
+    def __init__(self, path: Path, compact_threshold: int = 1000):
+        """
+        Open (or create) a journal and replay it into memory.
+
+        Args:
+            path: Path of the .jsonl journal file
+            compact_threshold: Minimum record count before compaction is
+                considered; compaction also requires at least half of the
+                records to be superseded
+        """
+        self.path = Path(path)
+        self.compact_threshold = compact_threshold
+        self.data: dict[str, Any] = {}
+
+        self._lock = threading.RLock()
+        self._records = 0
+        self._compacting = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, path: Path, data: dict[str, Any], **kwargs) -> "KeyedJournal":
+        """
+        Create a journal pre-filled with `data`.
+
+        The file only appears once fully written, so a crash part-way
+        leaves no journal rather than an empty or partial one.
+
+        Args:
+            path: Path of the .jsonl journal file
+            data: Initial contents
+            **kwargs: Passed to the constructor
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_snapshot(path, data)
+        return cls(path, **kwargs)
+
+    def _replay(self) -> None:
+        """Rebuild in-memory state from the journal file.
+
+        A torn final line is cut off (or, if it parsed, terminated) so the
+        next append starts on a fresh line instead of being glued onto it.
+        """
+        if not self.path.exists():
+            return
+
+        offset = 0
+        last_line = b""
+        last_ok = True
+        with open(self.path, "rb") as f:
+            for line_number, last_line in enumerate(f, start=1):
+                offset += len(last_line)
+                line = last_line.strip()
+                last_ok = True
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # A torn write from a crash; everything before it is intact
+                    logger.warning(f"Skipping corrupt record {self.path}:{line_number}")
+                    last_ok = False
+                    continue
+
+                if record.get("op") == "set":
+                    self.data[record["key"]] = record["value"]
+                elif record.get("op") == "delete":
+                    self.data.pop(record["key"], None)
+                self._records += 1
+
+        if last_line and not last_line.endswith(b"\n"):
+            with open(self.path, "r+b") as f:
+                if last_ok:
+                    f.seek(offset)
+                    f.write(b"\n")
+                else:
+                    f.truncate(offset - len(last_line))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _append(self, record: dict) -> None:
+        """Append one record durably."""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value for a key."""
+        with self._lock:
+            return self.data.get(key, default)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of all current values."""
+        with self._lock:
+            return dict(self.data)
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a key and append the change to the journal."""
+        with self._lock:
+            self._append({"op": "set", "key": key, "value": value})
+            self.data[key] = value
+        self._maybe_compact()
+
+    def delete(self, key: str) -> bool:
+        """Delete a key; returns False if it did not exist."""
+        with self._lock:
+            if key not in self.data:
+                return False
+            self._append({"op": "delete", "key": key})
+            del self.data[key]
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self) -> None:
+        """Start a background compaction when the log is mostly stale."""
+        with self._lock:
+            if self._compacting:
+                return
+            if self._records < self.compact_threshold or self._records < 2 * len(self.data):
+                return
+            self._compacting = True
+
+        threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self) -> None:
+        """Thread target for compaction."""
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Journal compaction failed for {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self, data: Optional[dict[str, Any]] = None) -> None:
+        """
+        Rewrite the journal as one record per live key.
+
+        The new log is written to a temporary file and atomically renamed
+        over the old one, so a crash leaves either the old or new log.
+
+        Args:
+            data: Replace the current contents with this mapping first
+        """
+        with self._lock:
+            if data is not None:
+                self.data = dict(data)
+
+            _write_snapshot(self.path, self.data)
+            self._file.close()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._records = len(self.data)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            self._file.close()
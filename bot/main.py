@@ -3,15 +3,25 @@
 import discord
 from discord.ext import commands
 import logging
+from pathlib import Path
 from bot.config import get_settings
-from bot.storage import Storage
+from bot.storage import create_storage
+from bot.async_storage import AsyncStorage
+from bot.image_index import ImageHashIndex
+from bot.services.cache import DiskCache
 from bot.services.ocr import OCRService
+from bot.services.ocr_backends import create_ocr_backend
+from bot.services.resilience import ResilienceRegistry
+from bot.services.scheduler import RequestScheduler
 from bot.services.ai_extractor import AIExtractor
+from bot.services.templates import TemplateExtractor
+from bot.services.usage import UsageTracker
 from bot.services.guesser import ItemGuesser
 from bot.services.sheets import SheetsService
 from bot.cogs.receipt import ReceiptCog
 from bot.cogs.guess import GuessCog
 from bot.cogs.clerk import ClerkCog
+from bot.cogs.admin import AdminCog
 
 
 # Setup logging
@@ -40,19 +50,85 @@ class ReceiptBot(commands.Bot):
         self.settings = get_settings()
 
         # Initialize services
-        self.storage = Storage(self.settings.data_dir)
+        self.scheduler = RequestScheduler({
+            "mistral": (self.settings.mistral_rpm, 0),
+            "openrouter": (self.settings.openrouter_rpm, self.settings.openrouter_tpm),
+        })
+        self.resilience = ResilienceRegistry(
+            max_attempts=self.settings.retry_max_attempts,
+            hedge=self.settings.request_hedging,
+            failure_threshold=self.settings.circuit_failure_threshold,
+            reset_seconds=self.settings.circuit_reset_seconds,
+        )
+        self.usage = (
+            UsageTracker(Path(self.settings.data_dir) / "usage.db")
+            if self.settings.usage_tracking
+            else None
+        )
+        self.storage = AsyncStorage(
+            create_storage(self.settings.storage_backend, self.settings.data_dir),
+            max_workers=self.settings.storage_workers,
+        )
         self.ocr_service = OCRService(
             api_key=self.settings.mistral_api_key,
             model=self.settings.mistral_ocr_model,
+            cache=DiskCache(
+                Path(self.settings.data_dir) / "cache" / "ocr",
+                max_bytes=self.settings.ocr_cache_max_mb * 1024 * 1024,
+                suffix=".md",
+            ),
+            max_concurrency=self.settings.ocr_max_concurrency,
+            preprocess=self.settings.ocr_preprocess,
+            target_dpi=self.settings.ocr_target_dpi,
+            backend=create_ocr_backend(
+                self.settings.ocr_backend,
+                self.settings.mistral_api_key,
+                self.settings.mistral_ocr_model,
+                min_lines=self.settings.ocr_min_lines,
+                scheduler=self.scheduler,
+                resilience=self.resilience.policy("mistral"),
+                usage=self.usage,
+            ),
+        )
+        self.image_index = (
+            ImageHashIndex(
+                Path(self.settings.data_dir) / "image_hashes.jsonl",
+                max_distance=self.settings.duplicate_max_distance,
+            )
+            if self.settings.duplicate_max_distance > 0
+            else None
         )
         self.ai_extractor = AIExtractor(
             api_key=self.settings.openrouter_api_key,
             model=self.settings.openrouter_model,
+            max_concurrency=self.settings.extraction_max_concurrency,
+            scheduler=self.scheduler,
+            prune=self.settings.ocr_pruning,
+            fused=self.settings.fused_extraction,
+            batch_size=self.settings.extraction_batch_size,
+            batch_tokens=self.settings.extraction_batch_tokens,
+            resilience=self.resilience.policy("openrouter"),
+            usage=self.usage,
+            cache=(
+                DiskCache(
+                    Path(self.settings.data_dir) / "cache" / "extraction",
+                    max_bytes=self.settings.extraction_cache_max_mb * 1024 * 1024,
+                    suffix=".json",
+                )
+                if self.settings.extraction_cache_max_mb > 0
+                else None
+            ),
         )
+        self.templates = TemplateExtractor() if self.settings.template_extraction else None
         self.guesser = ItemGuesser(
             api_key=self.settings.openrouter_api_key,
             model=self.settings.openrouter_model,
-            corrections=self.storage.load_corrections(),
+            corrections=self.storage.storage.load_corrections(),
+            max_concurrency=self.settings.guess_max_concurrency,
+            timeout=self.settings.guess_timeout_seconds,
+            scheduler=self.scheduler,
+            resilience=self.resilience.policy("openrouter"),
+            usage=self.usage,
         )
         self.sheets_service = SheetsService(
             self.settings.google_credentials_path,
@@ -61,14 +137,19 @@ class ReceiptBot(commands.Bot):
 
     async def setup_hook(self):
         """Setup hook called when bot starts."""
+        # Open the OpenRouter connection now so the first receipt skips TCP/TLS setup
+        await self.ai_extractor.prewarm()
+
         logger.info("Loading cogs...")
 
         # Add cogs with error handling
         cogs_to_load = [
-            ("Receipt", ReceiptCog(self, self.ocr_service, self.storage, self.guesser, self.ai_extractor, self.settings)),
+            ("Receipt", ReceiptCog(self, self.ocr_service, self.storage, self.guesser, self.ai_extractor, self.settings, self.image_index, self.templates)),
             ("Guess", GuessCog(self, self.guesser, self.storage, self.settings)),
             ("Clerk", ClerkCog(self, self.sheets_service, self.storage)),
         ]
+        if self.usage is not None:
+            cogs_to_load.append(("Admin", AdminCog(self, self.usage)))
 
         for name, cog in cogs_to_load:
             try:
@@ -112,7 +193,13 @@ class ReceiptBot(commands.Bot):
         """Cleanup when bot shuts down."""
         await self.ocr_service.close()
         await self.guesser.close()
+        await self.ai_extractor.close()
         await super().close()
+        self.storage.close()
+        if self.image_index is not None:
+            self.image_index.close()
+        if self.usage is not None:
+            self.usage.close()
 
 
 def main():
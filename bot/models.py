@@ -39,7 +39,8 @@ class Receipt(BaseModel):
     datetime: datetime
     processed_at: datetime = Field(default_factory=datetime.now)
     verified: bool = False
-    raw_ocr_text: str
+    raw_ocr_text: Optional[str] = Field(default=None, description="Raw OCR text; None when kept in the blob store and not loaded")
+    raw_ocr_hash: Optional[str] = Field(default=None, description="SHA-256 of the raw OCR text in the blob store")
     items: list[ReceiptItem]
     total: float
     subtotal: Optional[float] = Field(default=None, description="Subtotal before tax")
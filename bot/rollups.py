@@ -0,0 +1,177 @@
+"""Incrementally maintained spending rollups by month, store and category."""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from bot.models import Receipt
+
+
+# Category key for whole-receipt rows (receipt.total, one per receipt)
+ALL_CATEGORIES = "*"
+
+RollupKey = tuple[str, str, str]
+
+
+def receipt_rollup_rows(receipt: Receipt) -> dict[RollupKey, dict]:
+    """
+    Compute the rollup contribution of a single receipt.
+
+    Returns one whole-receipt row under ALL_CATEGORIES plus one row per item
+    category, keyed by (month, store, category). Each row holds the spend
+    total, the number of receipts and the number of items.
+    """
+    month = receipt.datetime.strftime("%Y-%m")
+    rows = {
+        (month, receipt.store, ALL_CATEGORIES): {
+            "total": receipt.total,
+            "receipts": 1,
+            "items": len(receipt.items),
+        }
+    }
+    for item in receipt.items:
+        row = rows.setdefault(
+            (month, receipt.store, item.category),
+            {"total": 0.0, "receipts": 1, "items": 0},
+        )
+        row["total"] += item.price * item.quantity
+        row["items"] += 1
+    return rows
+
+
+def month_bounds(month: str) -> tuple[datetime, datetime]:
+    """Return the first and last instant of a YYYY-MM month."""
+    start = datetime.strptime(month, "%Y-%m")
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month - timedelta(microseconds=1)
+
+
+def range_summary(storage, start: datetime, end: datetime) -> tuple[float, int]:
+    """
+    Total spend and receipt count between two datetimes.
+
+    Whole months inside the range are answered from the rollups; only the
+    partial months at either end are read from the receipts themselves.
+
+    Args:
+        storage: Storage backend with monthly_summary and query_receipts
+        start: Range start (inclusive)
+        end: Range end (inclusive)
+
+    Returns:
+        Tuple of (total spent, receipt count)
+    """
+    total = 0.0
+    count = 0
+
+    month_start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month_start <= end:
+        month = month_start.strftime("%Y-%m")
+        first, last = month_bounds(month)
+
+        if start <= first and last <= end:
+            month_total, month_count, _ = storage.monthly_summary(month)
+        else:
+            receipts = storage.query_receipts(start=max(start, first), end=min(end, last))
+            month_total = sum(receipt.total for receipt in receipts)
+            month_count = len(receipts)
+
+        total += month_total
+        count += month_count
+        month_start = last + timedelta(microseconds=1)
+
+    return total, count
+
+
+class Rollups:
+    """Rollup table persisted as a JSON file, for the JSON storage backend.
+
+    Stored as {month: {"store|category": row}} so a month lookup only touches
+    that month's rows.
+    """
+
+    def __init__(self, path: Path):
+        """Load rollups from disk (an absent file means empty)."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.months: dict[str, dict[str, dict]] = {}
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.months = json.load(f)
+
+    def apply(self, receipt: Receipt, sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) a receipt's contribution and persist."""
+        with self._lock:
+            self._apply(receipt, sign)
+            self._save()
+
+    def rebuild(self, receipts: list[Receipt]) -> None:
+        """Recompute all rollups from scratch and persist."""
+        with self._lock:
+            self.months = {}
+            for receipt in receipts:
+                self._apply(receipt, 1)
+            self._save()
+
+    def month_rows(self, month: str) -> dict[tuple[str, str], dict]:
+        """Return {(store, category): row} for a YYYY-MM month."""
+        with self._lock:
+            rows = self.months.get(month, {})
+            return {tuple(key.split("|", 1)): dict(row) for key, row in rows.items()}
+
+    def _apply(self, receipt: Receipt, sign: int) -> None:
+        """Apply a receipt's rows without locking or saving."""
+        for (month, store, category), delta in receipt_rollup_rows(receipt).items():
+            rows = self.months.setdefault(month, {})
+            row = rows.setdefault(f"{store}|{category}", {"total": 0.0, "receipts": 0, "items": 0})
+            row["total"] = round(row["total"] + sign * delta["total"], 2)
+            row["receipts"] += sign * delta["receipts"]
+            row["items"] += sign * delta["items"]
+
+            if row["receipts"] <= 0:
+                del rows[f"{store}|{category}"]
+            if not rows:
+                del self.months[month]
+
+    def _save(self) -> None:
+        """Write the rollup file atomically."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.months, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def summarize_month_rows(rows: dict[tuple[str, str], dict]) -> tuple[float, int, int]:
+    """Collapse a month's rows into (total, receipt count, item count)."""
+    total = 0.0
+    receipt_count = 0
+    item_count = 0
+    for (store, category), row in rows.items():
+        if category == ALL_CATEGORIES:
+            total += row["total"]
+            receipt_count += row["receipts"]
+            item_count += row["items"]
+    return round(total, 2), receipt_count, item_count
+
+
+def main():
+    """Command-line entry point: python -m bot.rollups rebuild."""
+    from bot.storage import create_storage
+
+    parser = argparse.ArgumentParser(description="Spending rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        storage = create_storage(args.backend, args.data_dir)
+        count = storage.rebuild_rollups()
+        print(f"Rebuilt rollups from {count} receipts")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,521 @@
 """AI-powered receipt data extraction using OpenRouter."""
 
+import asyncio
+import hashlib
 import httpx
 import json
-from typing import Dict, Any
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 from bot.models import Receipt, ReceiptItem
+from bot.services.cache import DiskCache
+from bot.services.ocr_pruning import prune_ocr_text
+from bot.services.resilience import ProviderError, ResiliencePolicy
+from bot.services.scheduler import RequestScheduler, estimate_tokens
+from bot.services.stream_json import ItemStreamParser
+from bot.services.usage import EXTRACTION, UsageTracker, billed_on_failure, usage_tokens
 from datetime import datetime
 
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # Optional dependency (httpx[http2]); HTTP/1.1 keep-alive is used without it
+    HTTP2_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# A batch rejected with these (e.g. too long for the context window) is retried in halves
+BATCH_SPLIT_STATUSES = {400, 413}
+
+
+@dataclass
+class RequestTiming:
+    """Where the time of one HTTP request went, in milliseconds."""
+
+    connect_ms: float = 0.0
+    ttfb_ms: Optional[float] = None
+    total_ms: float = 0.0
+    reused: bool = True
+    http_version: str = ""
+    first_item_ms: Optional[float] = None  # Streaming only: first complete item parsed
+
+    def __str__(self) -> str:
+        ttfb = f"{self.ttfb_ms:.0f}" if self.ttfb_ms is not None else "?"
+        connection = "reused" if self.reused else f"connect {self.connect_ms:.0f} ms"
+        first_item = f", first item {self.first_item_ms:.0f} ms" if self.first_item_ms is not None else ""
+        return (
+            f"{connection}, TTFB {ttfb} ms{first_item}, total {self.total_ms:.0f} ms "
+            f"({self.http_version})"
+        )
+
+
+class _RequestTracer:
+    """httpx `trace` extension callback that fills in a RequestTiming.
+
+    httpcore reports connection setup (TCP, TLS) only when a new
+    connection is opened, so a request on a pooled connection is marked
+    as reused with zero connect time.
+    """
+
+    def __init__(self):
+        self.timing = RequestTiming()
+        self.started = time.perf_counter()
+        self._connect_started: Optional[float] = None
+        self._request_sent: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        now = time.perf_counter()
+        if event_name == "connection.connect_tcp.started":
+            self._connect_started = now
+            self.timing.reused = False
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._connect_started is not None:
+                self.timing.connect_ms = (now - self._connect_started) * 1000
+        elif event_name.endswith("send_request_headers.started"):
+            self._request_sent = now
+        elif event_name.endswith("receive_response_headers.complete") and self._request_sent:
+            self.timing.ttfb_ms = (now - self._request_sent) * 1000
+
+    def finish(self, response: httpx.Response) -> RequestTiming:
+        """Record total time and protocol once the body has been read."""
+        self.timing.total_ms = (time.perf_counter() - self.started) * 1000
+        self.timing.http_version = response.http_version
+        return self.timing
+
+
+def normalize_ocr_text(text: str) -> str:
+    """Canonical form of OCR text for cache keys: whitespace runs and blank lines collapsed."""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _item_guess(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Guessed name and confidence from fused extraction, when well-formed."""
+    guessed_name = item.get("guessed_name")
+    try:
+        confidence = min(1.0, max(0.0, float(item.get("confidence"))))
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(guessed_name, str) or not guessed_name.strip():
+        return {}
+    return {"guessed_name": guessed_name.strip(), "confidence": confidence}
+
 
 class AIExtractor:
     """Extract structured receipt data from OCR text using AI."""
 
-    def __init__(self, api_key: str, model: str = "openai/gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "openai/gpt-4o-mini",
+        max_concurrency: int = 4,
+        scheduler: Optional[RequestScheduler] = None,
+        prune: bool = True,
+        fused: bool = False,
+        resilience: Optional[ResiliencePolicy] = None,
+        cache: Optional[DiskCache] = None,
+        batch_size: int = 4,
+        batch_tokens: int = 6000,
+        usage: Optional[UsageTracker] = None,
+    ):
         """
         Initialize AI extractor with OpenRouter API.
 
         Args:
             api_key: OpenRouter API key
             model: Model to use for extraction (default: openai/gpt-4o-mini)
+            max_concurrency: Maximum extraction requests in flight at once
+            scheduler: Optional rate-limit scheduler requests are submitted through
+            prune: Strip card slips, footers and other boilerplate from the
+                OCR text before it is sent
+            fused: Also ask for each item's full product name and a
+                confidence, so no separate guessing call is needed
+            resilience: Retry/hedging/circuit-breaker policy for OpenRouter
+                (shared with the guesser); a private one by default
+            cache: Optional cache of extraction results keyed by normalized
+                OCR text, model and prompt version
+            batch_size: Most receipts packed into one batch extraction request
+            batch_tokens: Token budget of one batch request, prompt plus
+                expected response
+            usage: Optional tracker each request's tokens, latency and cost
+                are recorded in
         """
         self.api_key = api_key
         self.model = model
+        self.scheduler = scheduler
+        self.prune = prune
+        self.fused = fused
+        self.resilience = resilience or ResiliencePolicy("openrouter")
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.batch_tokens = batch_tokens
+        self.usage = usage
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.last_timing: Optional[RequestTiming] = None
+
+    async def start(self) -> None:
+        """
+        Open the shared HTTP client.
 
-    async def extract_receipt_data(self, ocr_text: str) -> Dict[str, Any]:
+        One client is kept for the extractor's lifetime so requests reuse
+        pooled keep-alive connections (multiplexed over HTTP/2 when h2 is
+        installed) instead of paying TCP and TLS setup every time. Called
+        from the bot's setup hook; extraction also starts it on first use.
+        """
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=OPENROUTER_BASE_URL,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=120.0,
+            ),
+            http2=HTTP2_AVAILABLE,
+        )
+
+    async def prewarm(self) -> None:
+        """Open a connection to OpenRouter ahead of the first extraction."""
+        await self.start()
+        tracer = _RequestTracer()
+        try:
+            response = await self._client.head("/models", extensions={"trace": tracer})
+            logger.info(f"OpenRouter connection warmed: {tracer.finish(response)}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not pre-warm OpenRouter connection: {e}")
+
+    async def extract_receipt_data(
+        self,
+        ocr_text: str,
+        on_item: Optional[Callable[[int, Dict[str, Any]], Awaitable[Any]]] = None,
+    ) -> Dict[str, Any]:
         """
         Extract structured data from OCR text using AI.
 
         Args:
             ocr_text: Raw OCR markdown text
+            on_item: Optional coroutine called with (index, item) as each item
+                arrives; the completion is then streamed. A retried or hedged
+                request repeats indexes, so callers should key on them.
 
         Returns:
             Extracted receipt data as dict matching OCRReceiptData schema
         """
-        prompt = self._build_extraction_prompt(ocr_text)
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "response_format": {"type": "json_object"}
-                }
+        ocr_text = self._prune(ocr_text)
+        cache_key = self._cache_key(ocr_text)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            if on_item:
+                for index, item in enumerate(cached.get("items", [])):
+                    await on_item(index, item)
+            return cached
+
+        extracted = await self._request(self._build_extraction_prompt(ocr_text), on_item)
+        await self._cache_put(cache_key, extracted)
+        return extracted
+
+    async def extract_batch(self, ocr_texts: list[str]) -> list[Union[Dict[str, Any], Exception]]:
+        """
+        Extract several receipts, packing their OCR texts into shared requests.
+
+        Receipts are grouped greedily under `batch_tokens` (prompt plus the
+        expected response) and at most `batch_size` per request, so the
+        instruction block is paid once per group rather than per receipt.
+        When a response lacks some receipts or cannot be parsed, those
+        receipts are split in half and retried; a single receipt goes
+        through the normal single-receipt path.
+
+        Args:
+            ocr_texts: Raw OCR text of each receipt
+
+        Returns:
+            Extracted data (as from extract_receipt_data) or the error that
+            stopped extraction, in the order of ocr_texts
+        """
+        texts = [self._prune(ocr_text) for ocr_text in ocr_texts]
+        results: list[Union[Dict[str, Any], Exception, None]] = [None] * len(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            results[index] = await self._cache_get(self._cache_key(text))
+            if results[index] is None:
+                pending.append(index)
+
+        batches = self._plan_batches(pending, texts)
+        logger.info(
+            f"Batch extraction: {len(texts)} receipts, {len(texts) - len(pending)} cached, "
+            f"{len(batches)} requests"
+        )
+        await asyncio.gather(*(self._extract_group(batch, texts, results) for batch in batches))
+        return results
+
+    def _plan_batches(self, indexes: list[int], texts: list[str]) -> list[list[int]]:
+        """Group receipts greedily under the token budget and batch size."""
+        overhead = estimate_tokens(self._build_batch_prompt({}))
+        batches: list[list[int]] = []
+        used = overhead
+        for index in indexes:
+            # Prompt text plus roughly as many tokens again for its JSON
+            cost = 2 * estimate_tokens(texts[index])
+            if not batches or len(batches[-1]) >= self.batch_size or used + cost > self.batch_tokens:
+                batches.append([])
+                used = overhead
+            batches[-1].append(index)
+            used += cost
+        return batches
+
+    async def _extract_group(
+        self,
+        indexes: list[int],
+        texts: list[str],
+        results: list[Union[Dict[str, Any], Exception, None]],
+    ) -> None:
+        """Extract one group of receipts into `results`, splitting on partial failure."""
+        if len(indexes) == 1:
+            index = indexes[0]
+            try:
+                results[index] = await self._request(self._build_extraction_prompt(texts[index]))
+                await self._cache_put(self._cache_key(texts[index]), results[index])
+            except Exception as e:
+                results[index] = e
+            return
+
+        keys = {f"r{position}": index for position, index in enumerate(indexes, 1)}
+        try:
+            response = await self._request(
+                self._build_batch_prompt({key: texts[index] for key, index in keys.items()}),
+                batch=True,
+            )
+            if not isinstance(response, dict):
+                raise ValueError("response is not a JSON object")
+        except (ValueError, KeyError) as e:
+            # Unparseable (json.JSONDecodeError is a ValueError), e.g. cut off at the output limit
+            logger.warning(f"Batch of {len(indexes)} receipts unparseable ({e}), splitting")
+            missing = indexes
+        except ProviderError as e:
+            if e.status not in BATCH_SPLIT_STATUSES:
+                # Retries are spent, the circuit is open or the key is bad; splitting would not help
+                for index in indexes:
+                    results[index] = e
+                return
+            logger.warning(f"Batch of {len(indexes)} receipts rejected ({e}), splitting")
+            missing = indexes
+        except Exception as e:
+            for index in indexes:
+                results[index] = e
+            return
+        else:
+            missing = []
+            for key, index in keys.items():
+                extracted = response.get(key)
+                if isinstance(extracted, dict) and isinstance(extracted.get("items"), list):
+                    results[index] = extracted
+                    await self._cache_put(self._cache_key(texts[index]), extracted)
+                else:
+                    missing.append(index)
+            if missing:
+                logger.warning(f"Batch response missing {len(missing)}/{len(indexes)} receipts, retrying them")
+
+        if len(missing) > 1:
+            middle = len(missing) // 2
+            await asyncio.gather(
+                self._extract_group(missing[:middle], texts, results),
+                self._extract_group(missing[middle:], texts, results),
             )
+        elif missing:
+            await self._extract_group(missing, texts, results)
+
+    def _prune(self, ocr_text: str) -> str:
+        """Prune OCR text (when enabled), logging the token saving."""
+        if not self.prune:
+            return ocr_text
+        pruned = prune_ocr_text(ocr_text)
+        before, after = estimate_tokens(ocr_text), estimate_tokens(pruned)
+        logger.info(f"Pruned OCR text {before} -> {after} tokens (-{1 - after / before:.0%})")
+        return pruned
+
+    def _cache_key(self, ocr_text: str) -> Optional[str]:
+        """Cache key of (pruned) OCR text: identical normalized text with the same model and prompt hits."""
+        if not self.cache:
+            return None
+        return DiskCache.make_key(self.model, self.prompt_version, normalize_ocr_text(ocr_text))
+
+    async def _cache_get(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a cached extraction, or None (the file read runs in a worker thread)."""
+        if not self.cache:
+            return None
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached is None:
+            return None
+        logger.info(f"Extraction cache hit (hit rate {self.cache.stats()['hit_rate']:.0%})")
+        return json.loads(cached)
+
+    async def _cache_put(self, cache_key: Optional[str], extracted: Dict[str, Any]) -> None:
+        """Store an extraction result (the write and eviction run in a worker thread)."""
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, cache_key, json.dumps(extracted, ensure_ascii=False))
+
+    async def _request(
+        self,
+        prompt: str,
+        on_item: Optional[Callable[[int, Dict[str, Any]], Awaitable[Any]]] = None,
+        batch: bool = False,
+    ) -> Any:
+        """
+        Send one extraction prompt under the scheduler, semaphore and resilience policy.
+
+        Streamed and batch requests are tracked as their own request kinds
+        and never hedged: they run long, and a duplicate doubles their cost.
+        """
+        estimated = estimate_tokens(prompt)
+        kind = f"{EXTRACTION}-batch" if batch else f"{EXTRACTION}-stream" if on_item else EXTRACTION
+
+        await self.start()
+
+        async def acquire() -> None:
+            # Rate-limit token first, then a concurrency slot (released by send), so
+            # slots are held only by requests in flight, not by rate-limit or backoff waits
+            if self.scheduler:
+                await self.scheduler.acquire("openrouter", estimated)
+            await self._semaphore.acquire()
 
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"}
+        }
+
+        async def send() -> tuple[Dict[str, Any], Optional[dict]]:
+            # Every attempt (retry or hedge included) is recorded, billed or not
+            started = time.perf_counter()
+            try:
+                if on_item is None:
+                    extracted, usage = await self._complete(body)
+                else:
+                    extracted, usage = await self._stream(body, on_item)
+            except BaseException as e:
+                spent = {"prompt_tokens": estimated} if billed_on_failure(e) else None
+                self._record_usage(started, spent, None, ok=False)
+                raise
+            finally:
+                self._semaphore.release()
+            self._record_usage(started, usage, extracted)
+            return extracted, usage
+
+        extracted, usage = await self.resilience.call(
+            send, acquire, kind=kind, hedge=kind == EXTRACTION
+        )
+        if self.scheduler and usage:
+            self.scheduler.settle("openrouter", estimated, usage["total_tokens"])
+        return extracted
+
+    def _record_usage(self, started: float, usage: Optional[dict], extracted: Any, ok: bool = True) -> None:
+        """Record a request attempt with the usage tracker; a batch response has no single store."""
+        if not self.usage:
+            return
+        prompt_tokens, completion_tokens, cost = usage_tokens(usage)
+        store = extracted.get("store_name") if isinstance(extracted, dict) else None
+        self.usage.record(
+            EXTRACTION, "openrouter", self.model,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost,
+            store=store if isinstance(store, str) else None,
+            ok=ok,
+        )
+
+    async def _complete(self, body: dict) -> tuple[Dict[str, Any], Optional[dict]]:
+        """Send a completion request and return (parsed JSON content, usage)."""
+        tracer = _RequestTracer()
+        response = await self._client.post("/chat/completions", json=body, extensions={"trace": tracer})
+        self.last_timing = tracer.finish(response)
+        logger.info(f"Extraction request: {self.last_timing}")
+        if response.status_code != 200:
+            raise ProviderError.from_response("openrouter", response)
+
+        result = response.json()
+        extracted_json = result["choices"][0]["message"]["content"]
+        return json.loads(extracted_json), result.get("usage")
+
+    async def _stream(
+        self,
+        body: dict,
+        on_item: Callable[[int, Dict[str, Any]], Awaitable[Any]],
+    ) -> tuple[Dict[str, Any], Optional[dict]]:
+        """Stream a completion over SSE, reporting items as they close."""
+        tracer = _RequestTracer()
+        parser = ItemStreamParser("items")
+        usage = None
+        body = {**body, "stream": True, "stream_options": {"include_usage": True}}
+
+        async with self._client.stream(
+            "POST", "/chat/completions", json=body, extensions={"trace": tracer}
+        ) as response:
             if response.status_code != 200:
-                raise Exception(f"AI extraction failed: {response.status_code} - {response.text}")
+                await response.aread()
+                raise ProviderError.from_response("openrouter", response)
 
-            result = response.json()
-            extracted_json = result["choices"][0]["message"]["content"]
-            return json.loads(extracted_json)
+            async for line in response.aiter_lines():
+                # Skip blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
 
-    def _build_extraction_prompt(self, ocr_text: str) -> str:
-        """Build extraction prompt for AI."""
-        return f"""You are a receipt data extractor. Analyze this OCR text from a grocery receipt and extract structured data.
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    code = chunk["error"].get("code")
+                    raise ProviderError(
+                        "openrouter", code if isinstance(code, int) else None,
+                        chunk["error"].get("message", "stream error"),
+                    )
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if not content:
+                        continue
+                    for index, item in parser.feed(content):
+                        if tracer.timing.first_item_ms is None:
+                            tracer.timing.first_item_ms = (time.perf_counter() - tracer.started) * 1000
+                        await on_item(index, item)
 
-OCR Text:
-{ocr_text}
+        self.last_timing = tracer.finish(response)
+        logger.info(f"Streamed extraction request: {self.last_timing}, {parser.count} items")
+        return parser.result(), usage
 
-Extract the following information in JSON format:
-- store_name: Store name from header
+    async def close(self) -> None:
+        """Close the shared HTTP client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def prompt_version(self) -> str:
+        """Hash of the prompt template; any wording change gives a new version."""
+        return hashlib.sha256(self._build_extraction_prompt("").encode("utf-8")).hexdigest()[:12]
+
+    def _extraction_spec(self) -> str:
+        """Fields and rules shared by the single and batch extraction prompts."""
+        guess_fields = ""
+        guess_rules = ""
+        if self.fused:
+            guess_fields = """
+  - guessed_name: Full product name the item name abbreviates (e.g. "TradWmealBread750g" -> "Traditional Wholemeal Bread 750g")
+  - confidence: How sure you are of guessed_name, 0.0 to 1.0"""
+            guess_rules = """
+7. Keep raw_name exactly as printed; expand abbreviations only in guessed_name"""
+
+        return f"""- store_name: Store name from header
 - store_location: Store branch or address (if visible)
 - date: Transaction date in YYYY-MM-DD format
 - time: Transaction time in HH:MM format (if visible)
@@ -73,7 +526,7 @@ Extract the following information in JSON format:
   - price: Item price as shown (final price after discount)
   - discount: Discount amount from separate column (0 if none)
   - sku: Product SKU/barcode if visible
-  - category: Product category (e.g., "Produce", "Meat", "Dairy", "Bakery", "Pantry", "Frozen", "Beverage", "Household", "Other")
+  - category: Product category (e.g., "Produce", "Meat", "Dairy", "Bakery", "Pantry", "Frozen", "Beverage", "Household", "Other"){guess_fields}
 - subtotal: Subtotal before tax (if shown)
 - tax: Tax amount (GST, VAT, sales tax)
 - discount_total: Total discount amount (if shown)
@@ -86,10 +539,35 @@ Important:
 3. Price should be the final price customer pays
 4. Discount is a separate field (0 if no discount column)
 5. Preserve original language for item names (Korean, Chinese, etc.)
-6. Categorize each item based on the product name
+6. Categorize each item based on the product name{guess_rules}"""
+
+    def _build_extraction_prompt(self, ocr_text: str) -> str:
+        """Build extraction prompt for AI."""
+        return f"""You are a receipt data extractor. Analyze this OCR text from a grocery receipt and extract structured data.
+
+OCR Text:
+{ocr_text}
+
+Extract the following information in JSON format:
+{self._extraction_spec()}
 
 Return ONLY valid JSON, no markdown formatting."""
 
+    def _build_batch_prompt(self, ocr_texts: Dict[str, str]) -> str:
+        """Build one prompt extracting several receipts, keyed by receipt ID."""
+        sections = "\n\n".join(
+            f"Receipt {key}:\n{ocr_text}" for key, ocr_text in ocr_texts.items()
+        )
+        keys = ", ".join(f'"{key}"' for key in ocr_texts)
+        return f"""You are a receipt data extractor. Analyze the OCR text of these {len(ocr_texts)} grocery receipts and extract structured data from each.
+
+{sections}
+
+For each receipt, extract the following information in JSON format:
+{self._extraction_spec()}
+
+Return ONLY valid JSON, no markdown formatting: one object with a key per receipt ({keys}), each holding that receipt's data."""
+
     def convert_to_receipt(self, extracted_data: Dict[str, Any], raw_ocr_text: str) -> Receipt:
         """
         Convert extracted data to Receipt model.
@@ -110,7 +588,8 @@ Return ONLY valid JSON, no markdown formatting."""
                 price=item.get("price", 0.0),
                 discount=item.get("discount", 0.0),
                 sku=item.get("sku"),
-                category=item.get("category", "Other")
+                category=item.get("category", "Other"),
+                **_item_guess(item),
             )
             for item in extracted_data.get("items", [])
         ]
@@ -0,0 +1,114 @@
+"""Disk-backed text cache with size-bounded LRU eviction."""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """Caches text values as files, evicting least recently used past a size limit.
+
+    Keys are hex digests (see `make_key`); each entry is one file under
+    `root`. Recency is tracked in memory and seeded from file mtimes on
+    startup, so the LRU order survives restarts.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 64 * 1024 * 1024, suffix: str = ".txt"):
+        """
+        Initialize the cache and index existing entries.
+
+        Args:
+            root: Cache directory
+            max_bytes: Total size of cached values before eviction starts
+            suffix: File extension for entries
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # key -> size in bytes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        files = sorted(self.root.glob(f"*{suffix}"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.name[: -len(suffix)]] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(*parts: Union[str, bytes]) -> str:
+        """Build a cache key from the SHA-256 of the given parts."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for a key, or None on a miss."""
+        path = self._path(key)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                text = path.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                # Removed behind our back
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value, evicting old entries if the cache is over its size limit."""
+        path = self._path(key)
+        data = value.encode("utf-8")
+        with self._lock:
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under the size limit."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._path(key).unlink(missing_ok=True)
+            logger.debug(f"Evicted {key} from {self.root}")
+
+    def _path(self, key: str) -> Path:
+        """Path of the file for a key."""
+        return self.root / f"{key}{self.suffix}"
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
@@ -2,14 +2,33 @@
 
 from openrouter import OpenRouter
 from bot.models import GuessResult, ReceiptItem
-from typing import Dict, List
+from bot.services.resilience import ResiliencePolicy
+from bot.services.scheduler import RequestScheduler, estimate_tokens
+from bot.services.usage import GUESSING, UsageTracker, billed_on_failure, usage_tokens
+from typing import Dict, List, Optional
+import asyncio
 import json
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
 
 
 class ItemGuesser:
     """Service for guessing full product names from receipt abbreviations."""
 
-    def __init__(self, api_key: str, model: str, corrections: Dict[str, str] = None):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        corrections: Dict[str, str] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+        usage: Optional[UsageTracker] = None,
+        max_concurrency: int = 4,
+        timeout: float = 30.0,
+    ):
         """
         Initialize guesser with OpenRouter SDK.
 
@@ -17,16 +36,36 @@ class ItemGuesser:
             api_key: OpenRouter API key
             model: Model to use (e.g., "openai/gpt-4o-mini")
             corrections: Dictionary of manual corrections {raw_name|store: actual_name}
+            scheduler: Optional rate-limit scheduler requests are submitted through
+            resilience: Retry/hedging/circuit-breaker policy for OpenRouter
+                (shared with the extractor); a private one by default
+            usage: Optional tracker each request's tokens, latency and cost
+                are recorded in
+            max_concurrency: Maximum guessing requests in flight at once
+            timeout: Seconds one request may take before it is abandoned
+                (and retried under the resilience policy)
         """
         self.api_key = api_key
         self.model = model
         self.corrections = corrections or {}
+        self.scheduler = scheduler
+        self.resilience = resilience or ResiliencePolicy("openrouter")
+        self.usage = usage
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
         self.client = OpenRouter(api_key=api_key)
 
     def update_corrections(self, corrections: Dict[str, str]) -> None:
         """Update the corrections dictionary."""
         self.corrections = corrections
 
+    def correction(self, raw_name: str, store: str) -> Optional[GuessResult]:
+        """Return the manual correction for an item as a certain guess, if any."""
+        actual_name = self.corrections.get(f"{raw_name}|{store}")
+        if actual_name is None:
+            return None
+        return GuessResult(product_name=actual_name, confidence=1.0)
+
     async def guess_batch(
         self, items: List[ReceiptItem], store: str
     ) -> List[GuessResult]:
@@ -46,15 +85,10 @@ class ItemGuesser:
 
         # Check corrections first for each item
         for idx, item in enumerate(items):
-            key = f"{item.raw_name}|{store}"
-            if key in self.corrections:
+            correction = self.correction(item.raw_name, store)
+            if correction:
                 # Use cached correction
-                results.append(
-                    GuessResult(
-                        product_name=self.corrections[key],
-                        confidence=1.0
-                    )
-                )
+                results.append(correction)
             else:
                 # Need to call API
                 items_to_guess.append(item)
@@ -68,23 +102,35 @@ class ItemGuesser:
 
         # Build batch prompt for all items needing guessing
         prompt = self._build_batch_prompt(items_to_guess, store)
+        estimated = estimate_tokens(prompt)
+
+        async def acquire() -> None:
+            # Rate-limit token first, then a concurrency slot (released by send), so
+            # slots are held only by requests in flight, not by rate-limit or backoff waits
+            if self.scheduler:
+                await self.scheduler.acquire("openrouter", estimated)
+            await self._semaphore.acquire()
+
+        async def send():
+            # Call OpenRouter API with batch request; a stalled request times out and is retried.
+            # Every attempt (retry or hedge included) is recorded, billed or not
+            started = time.perf_counter()
+            try:
+                response = await self._send(prompt)
+            except BaseException as e:
+                spent = {"prompt_tokens": estimated} if billed_on_failure(e) else None
+                self._record_usage(started, spent, store, ok=False)
+                raise
+            finally:
+                self._semaphore.release()
+            self._record_usage(started, getattr(response, "usage", None), store)
+            return response
 
         try:
-            # Call OpenRouter API with batch request
-            response = self.client.chat.send(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a grocery item identifier. Respond only with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"}  # Ensure JSON response
-            )
+            response = await self.resilience.call(send, acquire, kind=GUESSING)
+
+            if self.scheduler and getattr(response, "usage", None):
+                self.scheduler.settle("openrouter", estimated, response.usage.total_tokens)
 
             # Parse batch response
             content = response.choices[0].message.content
@@ -101,7 +147,9 @@ class ItemGuesser:
                 results[items_to_guess_indices[idx]] = guess_result
 
         except Exception as e:
-            # If API fails, return raw names with low confidence
+            # Guessing is optional: once retries are exhausted, return raw
+            # names with zero confidence so the items are flagged for review
+            logger.warning(f"Item guessing failed, flagging {len(items_to_guess)} items for review: {e}")
             for idx, item in enumerate(items_to_guess):
                 guess_result = GuessResult(
                     product_name=item.raw_name,
@@ -111,6 +159,41 @@ class ItemGuesser:
 
         return results
 
+    async def _send(self, prompt: str):
+        """Send one guessing request, abandoning it after `timeout` seconds."""
+        return await asyncio.wait_for(
+            self.client.chat.send_async(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a grocery item identifier. Respond only with valid JSON."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                response_format={"type": "json_object"}  # Ensure JSON response
+            ),
+            self.timeout,
+        )
+
+    def _record_usage(self, started: float, usage, store: str, ok: bool = True) -> None:
+        """Record a guessing request attempt with the usage tracker."""
+        if not self.usage:
+            return
+        prompt_tokens, completion_tokens, cost = usage_tokens(usage)
+        self.usage.record(
+            GUESSING, "openrouter", self.model,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost,
+            store=store,
+            ok=ok,
+        )
+
     def _build_batch_prompt(self, items: List[ReceiptItem], store: str) -> str:
         """Build prompt for batch item guessing."""
         items_text = "\n".join([f"- {item.raw_name}" for item in items])
@@ -1,81 +1,99 @@
-"""Mistral OCR service using official mistralai package."""
+"""OCR service: caching, preprocessing and concurrency around an OCR backend."""
 
-import base64
-from mistralai import Mistral
+import asyncio
+import logging
+from typing import Optional
+from bot.services.cache import DiskCache
+from bot.services.ocr_backends import MistralOCRBackend, OCRBackend, RequestSlots
+from bot.services.preprocess import preprocess_image
+from bot.services.resilience import ProviderError
 
 
-class OCRService:
-    """Service for processing receipt images with Mistral OCR API."""
+logger = logging.getLogger(__name__)
+
 
-    def __init__(self, api_key: str, model: str = "mistral-ocr-latest"):
+class OCRService:
+    """Service for processing receipt images with a pluggable OCR backend."""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "mistral-ocr-latest",
+        cache: Optional[DiskCache] = None,
+        max_concurrency: int = 4,
+        preprocess: bool = True,
+        target_dpi: int = 300,
+        backend: Optional[OCRBackend] = None,
+    ):
         """
-        Initialize OCR service with Mistral AI client.
+        Initialize OCR service.
 
         Args:
             api_key: Mistral API key
             model: OCR model to use (default: mistral-ocr-latest)
+            cache: Optional cache of OCR output keyed by image hash and model
+            max_concurrency: Maximum OCR requests in flight at once
+            preprocess: Shrink photos (grayscale, crop, downsample) before upload
+            target_dpi: Receipt resolution after preprocessing
+            backend: OCR engine; defaults to Mistral with api_key and model
         """
         self.api_key = api_key
         self.model = model
-        self.client = Mistral(api_key=api_key)
-
-    async def process_image(self, image_bytes: bytes) -> str:
+        self.backend = backend or MistralOCRBackend(api_key, model)
+        self.cache = cache
+        self.preprocess = preprocess
+        self.target_dpi = target_dpi
+
+        # Bounded pool of in-flight requests, taken by the backend once it is
+        # ready to send (after rate-limit waits), with queue-depth metrics
+        self.max_concurrency = max_concurrency
+        self.slots = RequestSlots(max_concurrency)
+
+    async def prepare(self, image_bytes: bytes) -> bytes:
+        """Preprocess an image for upload (unchanged when preprocessing is off)."""
+        if not self.preprocess:
+            return image_bytes
+        # Decoding and resizing is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(preprocess_image, image_bytes, self.target_dpi)
+
+    async def process_image(self, image_bytes: bytes, prepared: bool = False) -> str:
         """
         Process receipt image and return OCR text.
 
         Args:
             image_bytes: Raw image bytes
+            prepared: The bytes already came from `prepare`, skip preprocessing
 
         Returns:
             Extracted markdown text from receipt
         """
-        # Detect MIME type
-        mime_type = self._detect_mime_type(image_bytes)
-
-        # Encode image to base64 data URI
-        base64_image = base64.standard_b64encode(image_bytes).decode("utf-8")
-        image_url = f"data:{mime_type};base64,{base64_image}"
+        # Re-uploads of the same photo are served from the cache
+        cache_key = DiskCache.make_key(self.backend.name, image_bytes) if self.cache else None
+        if self.cache:
+            # File reads (and eviction on put) stay off the event loop
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit (hit rate {self.cache.stats()['hit_rate']:.0%})")
+                return cached
+
+        if not prepared:
+            image_bytes = await self.prepare(image_bytes)
 
-        # Basic OCR extraction
         try:
-            response = self.client.ocr.process(
-                model=self.model,
-                document={
-                    "type": "image_url",
-                    "image_url": image_url,
-                }
-            )
-
-            # Extract markdown text from pages
-            if response.pages:
-                return response.pages[0].markdown
-            else:
-                raise Exception("No pages returned from OCR")
-
+            markdown = await self.backend.recognize(image_bytes, self.slots)
+        except ProviderError:
+            raise
         except Exception as e:
             raise Exception(f"OCR API error: {e}") from e
 
-    def _detect_mime_type(self, image_bytes: bytes) -> str:
-        """
-        Detect MIME type from image bytes.
-
-        Args:
-            image_bytes: Raw image bytes
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, cache_key, markdown)
+        return markdown
 
-        Returns:
-            MIME type string
-        """
-        if image_bytes.startswith(b'\xff\xd8\xff'):
-            return 'image/jpeg'
-        elif image_bytes.startswith(b'\x89PNG'):
-            return 'image/png'
-        elif image_bytes[:4] == b'ftyp' or image_bytes[4:12] == b'ftypheic':
-            return 'image/heic'
-        else:
-            return 'image/jpeg'  # Default fallback
+    def stats(self) -> dict:
+        """Return concurrency and queue-depth metrics."""
+        return self.slots.stats()
 
     async def close(self) -> None:
-        """Close the Mistral client."""
-        # Mistral SDK may not need explicit close
-        # Keep for compatibility with existing code
-        pass
+        """Close the OCR backend."""
+        await self.backend.close()
@@ -0,0 +1,362 @@
+"""Interchangeable OCR engines: Mistral (remote) and Tesseract (local)."""
+
+import asyncio
+import base64
+import contextlib
+import logging
+import shutil
+import time
+from typing import Optional, Protocol
+from mistralai import Mistral
+from bot.services.resilience import ResiliencePolicy
+from bot.services.scheduler import RequestScheduler
+from bot.services.usage import OCR, UsageTracker, billed_on_failure
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestSlots:
+    """Bounded pool of in-flight OCR requests, with queue-depth metrics.
+
+    A backend takes a slot only for the request itself (after any
+    rate-limit wait) and gives it back before retry backoff, so the limit
+    caps requests in flight rather than requests queued.
+    """
+
+    def __init__(self, max_concurrency: int):
+        """
+        Initialize the pool.
+
+        Args:
+            max_concurrency: Maximum requests in flight at once
+        """
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+
+    async def acquire(self) -> None:
+        """Wait for a free slot, tracking queue depth."""
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        if self._semaphore.locked():
+            logger.info(f"OCR queue depth {self.queued} ({self.in_flight} in flight)")
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+
+    def release(self) -> None:
+        """Give a slot back."""
+        self.in_flight -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    @contextlib.asynccontextmanager
+    async def hold(self):
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """Return concurrency and queue-depth metrics."""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+class OCRBackend(Protocol):
+    """An engine that turns a receipt image into text.
+
+    `name` identifies the engine and its configuration; it is part of the
+    OCR cache key, so two backends must not share a name unless they
+    produce the same text.
+    """
+
+    name: str
+
+    async def recognize(self, image_bytes: bytes, slots: Optional[RequestSlots] = None) -> str:
+        """
+        Return the text of an image (markdown for Mistral, plain for Tesseract).
+
+        When `slots` is given, the engine holds one while its request (or
+        subprocess) runs.
+        """
+        ...
+
+    async def close(self) -> None:
+        """Release any resources held by the engine."""
+        ...
+
+
+def detect_mime_type(image_bytes: bytes) -> str:
+    """
+    Detect MIME type from image bytes.
+
+    Args:
+        image_bytes: Raw image bytes
+
+    Returns:
+        MIME type string
+    """
+    if image_bytes.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    elif image_bytes.startswith(b'\x89PNG'):
+        return 'image/png'
+    elif image_bytes[:4] == b'ftyp' or image_bytes[4:12] == b'ftypheic':
+        return 'image/heic'
+    else:
+        return 'image/jpeg'  # Default fallback
+
+
+class MistralOCRBackend:
+    """Remote OCR through the Mistral OCR API."""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "mistral-ocr-latest",
+        scheduler: Optional[RequestScheduler] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+        usage: Optional[UsageTracker] = None,
+    ):
+        """
+        Initialize the Mistral client.
+
+        Args:
+            api_key: Mistral API key
+            model: OCR model to use
+            scheduler: Optional rate-limit scheduler requests are submitted through
+            resilience: Retry/hedging/circuit-breaker policy; a private one by default
+            usage: Optional tracker each request's pages, latency and cost are
+                recorded in
+        """
+        self.model = model
+        self.name = model
+        self.client = Mistral(api_key=api_key)
+        self.scheduler = scheduler
+        self.resilience = resilience or ResiliencePolicy("mistral")
+        self.usage = usage
+
+    async def recognize(self, image_bytes: bytes, slots: Optional[RequestSlots] = None) -> str:
+        """Send the image as a base64 data URI and return the first page's markdown."""
+        base64_image = base64.standard_b64encode(image_bytes).decode("utf-8")
+        image_url = f"data:{detect_mime_type(image_bytes)};base64,{base64_image}"
+
+        async def acquire() -> None:
+            # Rate-limit token first, then a slot (released by send), so slots are
+            # held only by requests in flight, not by rate-limit or backoff waits
+            if self.scheduler:
+                await self.scheduler.acquire("mistral")
+            if slots:
+                await slots.acquire()
+
+        async def send():
+            # Every attempt (retry or hedge included) is recorded, billed or not
+            started = time.perf_counter()
+            try:
+                response = await self.client.ocr.process_async(
+                    model=self.model,
+                    document={
+                        "type": "image_url",
+                        "image_url": image_url,
+                    }
+                )
+            except BaseException as e:
+                self._record_usage(started, 1 if billed_on_failure(e) else 0, ok=False)
+                raise
+            finally:
+                if slots:
+                    slots.release()
+            usage_info = getattr(response, "usage_info", None)
+            self._record_usage(started, getattr(usage_info, "pages_processed", None) or len(response.pages))
+            return response
+
+        response = await self.resilience.call(send, acquire, kind=OCR)
+
+        # Extract markdown text from pages
+        if not response.pages:
+            raise Exception("No pages returned from OCR")
+        return response.pages[0].markdown
+
+    def _record_usage(self, started: float, pages: int, ok: bool = True) -> None:
+        """Record an OCR request attempt with the usage tracker (the store is not known yet)."""
+        if self.usage:
+            self.usage.record(
+                OCR, "mistral", self.model,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                pages=pages,
+                ok=ok,
+            )
+
+    async def close(self) -> None:
+        """Close the Mistral client."""
+        # Mistral SDK may not need explicit close
+        pass
+
+
+class TesseractOCRBackend:
+    """Local OCR by running the `tesseract` command-line tool.
+
+    Runs fully offline. The image is piped to a subprocess, so the event
+    loop is never blocked and no Python binding is required. Tesseract
+    cannot read HEIC; use it with preprocessing (and pillow-heif) enabled so
+    photos arrive as JPEG.
+    """
+
+    def __init__(
+        self,
+        command: str = "tesseract",
+        lang: str = "eng",
+        psm: int = 4,
+        timeout: float = 60.0,
+    ):
+        """
+        Initialize the backend.
+
+        Args:
+            command: Tesseract executable name or path
+            lang: Tesseract language code(s)
+            psm: Page segmentation mode; 4 reads a single column of
+                variable-size text, which suits receipts
+            timeout: Seconds a run may take before the process is killed
+        """
+        self.command = command
+        self.lang = lang
+        self.psm = psm
+        self.timeout = timeout
+        self.name = f"tesseract-{lang}-psm{psm}"
+
+    @staticmethod
+    def available(command: str = "tesseract") -> bool:
+        """Whether the tesseract executable is on PATH."""
+        return shutil.which(command) is not None
+
+    async def recognize(self, image_bytes: bytes, slots: Optional[RequestSlots] = None) -> str:
+        """Run tesseract on the image and return its text output."""
+        if slots:
+            async with slots.hold():
+                return await self._run(image_bytes)
+        return await self._run(image_bytes)
+
+    async def _run(self, image_bytes: bytes) -> str:
+        """Run one tesseract subprocess, killing it after `timeout` seconds."""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.command, "stdin", "stdout", "-l", self.lang, "--psm", str(self.psm),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            raise Exception(f"{self.command} is not installed") from e
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(image_bytes), self.timeout)
+        except asyncio.TimeoutError:
+            # A hung tesseract would otherwise hold an OCR slot forever
+            process.kill()
+            await process.wait()
+            raise Exception(f"tesseract timed out after {self.timeout:.0f}s")
+        if process.returncode != 0:
+            raise Exception(f"tesseract failed: {stderr.decode('utf-8', 'replace').strip()}")
+        return stdout.decode("utf-8")
+
+    async def close(self) -> None:
+        """Nothing to release; each call is its own process."""
+        pass
+
+
+class LocalFirstOCRBackend:
+    """Try a local engine first and fall back to a remote one on poor output.
+
+    Local output is accepted when it has at least `min_lines` non-empty
+    lines; otherwise (or if the local engine fails) the remote engine is
+    used. Counters record how often each path is taken.
+    """
+
+    def __init__(self, local: OCRBackend, remote: OCRBackend, min_lines: int = 8):
+        """
+        Initialize the policy.
+
+        Args:
+            local: Engine tried first
+            remote: Engine used when local output is too short or fails
+            min_lines: Non-empty lines local output needs to be accepted
+        """
+        self.local = local
+        self.remote = remote
+        self.min_lines = min_lines
+        self.name = f"{local.name}+{remote.name}"
+        self.local_accepted = 0
+        self.fallbacks = 0
+
+    async def recognize(self, image_bytes: bytes, slots: Optional[RequestSlots] = None) -> str:
+        """Return local text when it looks complete, else remote text."""
+        reason: Optional[str] = None
+        try:
+            text = await self.local.recognize(image_bytes, slots)
+            lines = sum(1 for line in text.splitlines() if line.strip())
+            if lines >= self.min_lines:
+                self.local_accepted += 1
+                return text
+            reason = f"{lines} lines"
+        except Exception as e:
+            reason = str(e)
+
+        self.fallbacks += 1
+        logger.info(f"Local OCR ({self.local.name}) rejected ({reason}), using {self.remote.name}")
+        return await self.remote.recognize(image_bytes, slots)
+
+    async def close(self) -> None:
+        """Close both engines."""
+        await self.local.close()
+        await self.remote.close()
+
+
+def create_ocr_backend(
+    backend: str,
+    api_key: str,
+    model: str = "mistral-ocr-latest",
+    min_lines: int = 8,
+    scheduler: Optional[RequestScheduler] = None,
+    resilience: Optional[ResiliencePolicy] = None,
+    usage: Optional[UsageTracker] = None,
+) -> OCRBackend:
+    """
+    Create an OCR backend by name.
+
+    Args:
+        backend: "mistral", "tesseract" or "local-first"
+        api_key: Mistral API key (unused for "tesseract")
+        model: Mistral OCR model
+        min_lines: Lines local output needs before "local-first" accepts it
+        scheduler: Optional rate-limit scheduler for Mistral requests
+        resilience: Optional retry/circuit-breaker policy for Mistral requests
+        usage: Optional tracker Mistral requests are recorded in
+
+    Returns:
+        An OCR backend
+    """
+    if backend == "mistral":
+        return MistralOCRBackend(api_key, model, scheduler, resilience, usage)
+    if backend == "tesseract":
+        return TesseractOCRBackend()
+    if backend == "local-first":
+        return LocalFirstOCRBackend(
+            TesseractOCRBackend(),
+            MistralOCRBackend(api_key, model, scheduler, resilience, usage),
+            min_lines=min_lines,
+        )
+    raise ValueError(f"Unknown OCR backend: {backend}")
@@ -0,0 +1,150 @@
+"""Prune OCR text before LLM extraction so prompts carry only receipt content."""
+
+import re
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PruneRules:
+    """Lines to drop and where the receipt content ends.
+
+    `footer` patterns mark the start of trailing boilerplate (card slips,
+    thank-you notes, marketing). They only take effect after a total line,
+    so a store name or greeting at the top is never mistaken for a footer;
+    everything from the first match onwards is removed. `drop` patterns
+    remove single lines anywhere.
+    """
+
+    footer: list[re.Pattern] = field(default_factory=list)
+    drop: list[re.Pattern] = field(default_factory=list)
+
+
+def _patterns(*expressions: str) -> list[re.Pattern]:
+    """Compile case-insensitive line patterns."""
+    return [re.compile(expression, re.IGNORECASE) for expression in expressions]
+
+
+# A line that carries a total; footers are only looked for after one
+TOTAL_LINE = re.compile(r"\btotal\b.*\d+\.\d{2}", re.IGNORECASE)
+
+PRICE = re.compile(r"\d+\.\d{2}\b")
+
+GENERIC_RULES = PruneRules(
+    footer=_patterns(
+        r"^thank you\b",
+        r"^eftpos from\b",
+        r"^(customer|merchant) copy\b",
+        r"^please retain\b",
+        r"^(mid|tid)\s*:",
+    ),
+    drop=_patterns(
+        # Business registration and contact details
+        r"^a\.?b\.?n\.?\s*:?\s*[\d ]+$",
+        r"^(ph|tel|phone)\s*[:.]",
+        r"(https?://|www\.)\S+",
+        r"^!\[[^\]]*\]\([^)]*\)$",  # markdown image reference
+        # Separators and barcode residue
+        r"^[=\-_*#~.]{3,}$",
+        r"^(\S\s){2,}\S$",
+        # Card terminal metadata
+        r"^(aid|tc|atc|arqc|apsn|rrn|stan|auth|batch|inv|inv/roc no|tran|pos ref|terminal id)\b\s*[:#]?\s*\S+",
+        r"^(acct|account|trans) type\b",
+        r"^pan seq no\b",
+        r"^approv(ed|al code)\b",
+        r"^a0{5,}\d+$",
+        r"^#{4,}\d+",
+        r"^version\s*:",
+    ),
+)
+
+# Per-store rules, chosen by a pattern matched against the first lines
+STORE_RULES: list[tuple[re.Pattern, PruneRules]] = [
+    (
+        re.compile(r"^(#\s*)?BUNNINGS\b", re.IGNORECASE),
+        PruneRules(
+            footer=_patterns(r"^supercharge your shop\b", r"^have your say\b"),
+            drop=_patterns(
+                r'^"\*" indicates non taxable',
+                r"^\$\d+ R\d+ P\d+ C\d+ #[\d-]+$",  # transaction reference
+            ),
+        ),
+    ),
+    (
+        re.compile(r"^ALDI STORES\b"),
+        PruneRules(drop=_patterns(r"^a limited partnership$")),
+    ),
+    (
+        re.compile(r"^MEAT MASTER\b"),
+        PruneRules(
+            drop=_patterns(
+                r"^preset tare \d+ grams removed$",
+                r"^(wechat|cashier|register)\s*:",
+            ),
+        ),
+    ),
+]
+
+# Lines searched for a store's rules
+HEADER_LINES = 5
+
+
+def _store_rules(lines: list[str]) -> PruneRules:
+    """Return the rules of the store whose header appears in the first lines."""
+    header = [line.strip() for line in lines if line.strip()][:HEADER_LINES]
+    for pattern, rules in STORE_RULES:
+        if any(pattern.search(line) for line in header):
+            return rules
+    return PruneRules()
+
+
+def prune_ocr_text(text: str) -> str:
+    """
+    Remove lines an extraction prompt does not need.
+
+    Drops card-terminal slips, footers and marketing after the totals,
+    contact and registration lines, and separators; collapses runs of
+    whitespace and blank lines; and removes repeated lines in the header
+    (before the first price) and after the total. Item lines between them
+    are never de-duplicated, since the same item can be bought twice and its
+    name and SKU lines must stay with each price line.
+
+    Args:
+        text: OCR text (plain or markdown)
+
+    Returns:
+        The pruned text
+    """
+    lines = text.splitlines()
+    store = _store_rules(lines)
+    footer = GENERIC_RULES.footer + store.footer
+    drop = GENERIC_RULES.drop + store.drop
+
+    kept: list[str] = []
+    seen: set[str] = set()
+    after_total = False
+    in_items = False
+    for raw in lines:
+        line = re.sub(r"[ \t]+", " ", raw).strip()
+        if not line:
+            # Keep at most one blank line; it separates multi-line items
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+
+        if after_total and any(pattern.search(line) for pattern in footer):
+            break
+        if TOTAL_LINE.search(line):
+            after_total = True
+        if any(pattern.search(line) for pattern in drop):
+            continue
+
+        if PRICE.search(line):
+            in_items = not after_total
+        elif not in_items or after_total:
+            key = line.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+
+    return "\n".join(kept).strip()
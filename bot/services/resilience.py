@@ -0,0 +1,407 @@
+"""Retries, request hedging and circuit breaking for external API calls."""
+
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limited or a server-side failure
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Which attempt of a call a request is, so each attempt can be accounted for
+FIRST = "first"
+RETRY = "retry"
+HEDGE = "hedge"
+
+_current_attempt: contextvars.ContextVar[str] = contextvars.ContextVar("attempt", default=FIRST)
+
+
+def current_attempt() -> str:
+    """Return FIRST, RETRY or HEDGE for the request the running task is sending."""
+    return _current_attempt.get()
+
+
+class ProviderError(Exception):
+    """An API provider rejected or failed a request."""
+
+    def __init__(
+        self,
+        provider: str,
+        status: Optional[int],
+        message: str,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        Record the failure.
+
+        Args:
+            provider: Provider name (e.g. "openrouter")
+            status: HTTP status, or None for network errors
+            message: Response body or error description
+            retry_after: Seconds the provider asked us to wait, if any
+        """
+        super().__init__(f"{provider} request failed: {status or 'network error'} - {message}")
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, provider: str, response: httpx.Response) -> "ProviderError":
+        """Build an error from a non-success HTTP response."""
+        try:
+            retry_after = float(response.headers.get("retry-after", ""))
+        except ValueError:
+            retry_after = None
+        return cls(provider, response.status_code, response.text, retry_after)
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        """Record how long until the provider is tried again."""
+        super().__init__(provider, None, f"unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient: a network failure, timeout, 429 or 5xx."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    # ProviderError, and SDK errors (Mistral, OpenRouter) that carry a status
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(error, ProviderError) and status is None:
+        return True
+    return isinstance(status, int) and status in RETRYABLE_STATUSES
+
+
+class LatencyTracker:
+    """Rolling window of request latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Latest latencies kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        """Record one latency."""
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which `fraction` of requests finished, or None if too few."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated transient failures.
+
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures the circuit opens and calls fail fast for `reset_seconds`.
+    Then it is half-open: one trial call is let through, and its outcome
+    closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            provider: Provider name, for errors and logs
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open
+        """
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_in_flight = False
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.state == self.CLOSED:
+            return
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        raise CircuitOpenError(self.provider, max(0.0, remaining))
+
+    def record_success(self) -> None:
+        """A call succeeded: close the circuit."""
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """A call failed transiently: open the circuit at the threshold."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self.trips += 1
+                self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """A call ended without a verdict on the provider (e.g. a 400)."""
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        """Change state and log the transition."""
+        logger.warning(f"{self.provider} circuit {self.state} -> {state} ({self.failures} failures)")
+        self.state = state
+
+
+class ResiliencePolicy:
+    """Retry, hedging and circuit-breaker policy for one provider.
+
+    Transient failures (network errors, timeouts, 429 and 5xx) are retried
+    with jittered exponential backoff, honouring Retry-After. Latencies are
+    tracked per request kind, and once enough are known, a request still
+    running at its kind's p95 latency is hedged: a duplicate is sent and
+    whichever finishes first wins. Only use it for idempotent requests, and
+    turn hedging off per call for long ones (streams, batches) where a
+    duplicate doubles the spend.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        hedge: bool = True,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            provider: Provider name, for errors, logs and metrics
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff before the first retry (doubles each retry)
+            max_delay: Longest backoff between attempts
+            hedge: Send a duplicate request when one exceeds the p95 latency
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long an open circuit fails fast
+        """
+        self.provider = provider
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(provider, failure_threshold, reset_seconds)
+        self.latencies: dict[str, LatencyTracker] = {}
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.rejected = 0
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        acquire: Optional[Callable[[], Awaitable[None]]] = None,
+        kind: str = "request",
+        hedge: bool = True,
+    ) -> Any:
+        """
+        Await `func()` under the policy and return its result.
+
+        Args:
+            func: Sends one request; raises on failure
+            acquire: Awaited before each request (e.g. a rate-limit slot);
+                its wait does not count towards latency or hedging
+            kind: Request kind whose latencies this call is tracked with and
+                hedged against, so short and long requests do not mix
+            hedge: Allow hedging this call (when the policy hedges at all)
+
+        Raises:
+            CircuitOpenError: The provider's circuit is open
+            The last error, once it is not retryable or attempts run out
+        """
+        self.calls += 1
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.breaker.check()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            try:
+                result = await self._hedged(
+                    func, acquire, self.latency(kind), hedge and self.hedge,
+                    FIRST if attempt == 1 else RETRY,
+                )
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_attempts or self.breaker.state == CircuitBreaker.OPEN:
+                    self.failures += 1
+                    raise
+                delay = self._backoff(attempt, getattr(e, "retry_after", None))
+                self.retries += 1
+                logger.warning(
+                    f"{self.provider} attempt {attempt}/{self.max_attempts} failed ({e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled mid-request: no verdict on the provider, so free a half-open trial
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, at least the provider's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    def latency(self, kind: str) -> LatencyTracker:
+        """Return the latency tracker of a request kind, creating it if needed."""
+        if kind not in self.latencies:
+            self.latencies[kind] = LatencyTracker()
+        return self.latencies[kind]
+
+    async def _timed(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        acquire: Optional[Callable[[], Awaitable[None]]],
+        latency: LatencyTracker,
+        started: asyncio.Event,
+        attempt: str,
+    ) -> Any:
+        """Acquire, then send one request (tagged with its attempt) and record its latency."""
+        if acquire:
+            await acquire()
+        started.set()
+        token = _current_attempt.set(attempt)
+        try:
+            began = time.perf_counter()
+            result = await func()
+            latency.add(time.perf_counter() - began)
+            return result
+        finally:
+            _current_attempt.reset(token)
+
+    async def _hedged(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        acquire: Optional[Callable[[], Awaitable[None]]],
+        latency: LatencyTracker,
+        hedge: bool,
+        attempt: str,
+    ) -> Any:
+        """Send a request, adding a duplicate if it outlives the p95 latency."""
+        p95 = latency.percentile(0.95) if hedge else None
+        started = asyncio.Event()
+        if p95 is None:
+            return await self._timed(func, acquire, latency, started, attempt)
+
+        tasks = [asyncio.ensure_future(self._timed(func, acquire, latency, started, attempt))]
+        try:
+            # The hedge timer starts once the request is actually sent
+            waiter = asyncio.ensure_future(started.wait())
+            await asyncio.wait([tasks[0], waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            done, _ = await asyncio.wait(tasks, timeout=p95)
+            if done:
+                return tasks[0].result()
+
+            self.hedges += 1
+            logger.info(f"{self.provider} request exceeded p95 {p95:.2f}s, sending hedge")
+            tasks.append(asyncio.ensure_future(self._timed(func, acquire, latency, asyncio.Event(), HEDGE)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Return call, retry and hedge counts, latency per kind and circuit state."""
+        latency = {}
+        for kind, tracker in self.latencies.items():
+            p50 = tracker.percentile(0.5)
+            p95 = tracker.percentile(0.95)
+            latency[kind] = {
+                "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            }
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": latency,
+        }
+
+
+class ResilienceRegistry:
+    """One shared ResiliencePolicy per provider, created on first use."""
+
+    def __init__(self, **options):
+        """
+        Initialize the registry.
+
+        Args:
+            **options: ResiliencePolicy keyword arguments used for every provider
+        """
+        self.options = options
+        self.policies: dict[str, ResiliencePolicy] = {}
+
+    def policy(self, provider: str) -> ResiliencePolicy:
+        """Return the provider's policy, creating it if needed."""
+        if provider not in self.policies:
+            self.policies[provider] = ResiliencePolicy(provider, **self.options)
+        return self.policies[provider]
+
+    def stats(self) -> dict[str, dict]:
+        """Return every provider's policy metrics."""
+        return {provider: policy.stats() for provider, policy in self.policies.items()}
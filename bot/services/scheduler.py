@@ -0,0 +1,246 @@
+"""Rate-limit aware scheduler for outgoing API requests."""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: interactive requests are always granted before backfill
+INTERACTIVE = 0
+BACKFILL = 1
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """Who a request is for: the guild it is queued under and its lane."""
+
+    guild_id: Optional[int] = None
+    priority: int = INTERACTIVE
+
+
+_request_context: contextvars.ContextVar[RequestContext] = contextvars.ContextVar(
+    "request_context", default=RequestContext()
+)
+
+
+@contextlib.contextmanager
+def request_context(guild_id: Optional[int] = None, priority: int = INTERACTIVE):
+    """
+    Tag every request made inside the block with a guild and priority.
+
+    The context is a contextvar, so tasks started inside the block (for
+    example by asyncio.gather) inherit it.
+    """
+    token = _request_context.set(RequestContext(guild_id, priority))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def current_context() -> RequestContext:
+    """Return the request context of the running task."""
+    return _request_context.get()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Continuously refilling token bucket.
+
+    Holds at most `capacity` tokens, refilled at `per_minute` per minute. A
+    request larger than the capacity is let through once the bucket is
+    full, leaving it in deficit.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Sustained rate
+            capacity: Burst size; defaults to ten seconds' worth
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 6)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` tokens can be taken (0 if they can be now)."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Remove tokens; may leave the bucket negative."""
+        self._refill()
+        self.tokens -= amount
+
+
+class _ProviderQueue:
+    """Waiting requests for one provider, by lane and then by guild."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        # lane -> guild -> waiting (future, tokens); guild order is the round-robin order
+        self.lanes: dict[int, OrderedDict[Optional[int], deque]] = {
+            INTERACTIVE: OrderedDict(),
+            BACKFILL: OrderedDict(),
+        }
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.granted = 0
+
+    def waiting(self, lane: int) -> int:
+        """Number of requests queued in a lane."""
+        return sum(len(entries) for entries in self.lanes[lane].values())
+
+    def peek(self) -> Optional[tuple[int, Optional[int]]]:
+        """Return (lane, guild) of the next request to grant, dropping cancelled ones."""
+        for lane in sorted(self.lanes):
+            guilds = self.lanes[lane]
+            while guilds:
+                guild_id, entries = next(iter(guilds.items()))
+                while entries and entries[0][0].done():
+                    entries.popleft()
+                if entries:
+                    return lane, guild_id
+                del guilds[guild_id]
+        return None
+
+    def pop(self, lane: int, guild_id: Optional[int]) -> tuple[asyncio.Future, int]:
+        """Remove the head request of a guild and send the guild to the back."""
+        guilds = self.lanes[lane]
+        entry = guilds[guild_id].popleft()
+        if guilds[guild_id]:
+            guilds.move_to_end(guild_id)
+        else:
+            del guilds[guild_id]
+        return entry
+
+    def delay(self, tokens: int) -> float:
+        """Seconds until a request of `tokens` fits both buckets."""
+        delays = [0.0]
+        if self.requests:
+            delays.append(self.requests.delay(1))
+        if self.tokens and tokens:
+            delays.append(self.tokens.delay(tokens))
+        return max(delays)
+
+    def take(self, tokens: int) -> None:
+        """Charge a granted request to both buckets."""
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens and tokens:
+            self.tokens.take(tokens)
+
+
+class RequestScheduler:
+    """Grants API requests under per-provider rate limits.
+
+    Each provider has a requests-per-minute and a tokens-per-minute bucket
+    (0 disables either). Waiting requests are granted interactive lane
+    first, then backfill; within a lane, guilds take turns so one busy
+    server cannot starve the others. The guild and lane come from
+    `request_context`.
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, int]]):
+        """
+        Initialize the scheduler.
+
+        Args:
+            limits: {provider: (requests per minute, tokens per minute)}
+        """
+        self._queues = {
+            provider: _ProviderQueue(rpm, tpm) for provider, (rpm, tpm) in limits.items()
+        }
+
+    async def acquire(self, provider: str, tokens: int = 0) -> None:
+        """
+        Wait until a request to `provider` may be sent.
+
+        Args:
+            provider: Provider name as given in `limits`; unknown providers
+                are not limited
+            tokens: Estimated tokens the request will use
+        """
+        queue = self._queues.get(provider)
+        if queue is None:
+            return
+
+        context = current_context()
+        future = asyncio.get_running_loop().create_future()
+        lane = queue.lanes[context.priority]
+        lane.setdefault(context.guild_id, deque()).append((future, tokens))
+
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = asyncio.create_task(self._dispatch(provider, queue))
+        await future
+
+    async def submit(
+        self,
+        provider: str,
+        func: Callable[[], Awaitable[Any]],
+        tokens: int = 0,
+    ) -> Any:
+        """Wait for a slot, then await `func()` and return its result."""
+        await self.acquire(provider, tokens)
+        return await func()
+
+    def settle(self, provider: str, estimated: int, actual: int) -> None:
+        """Correct the tokens-per-minute bucket once a request's real usage is known."""
+        queue = self._queues.get(provider)
+        if queue and queue.tokens:
+            queue.tokens.take(actual - estimated)
+
+    async def _dispatch(self, provider: str, queue: _ProviderQueue) -> None:
+        """Grant queued requests as the buckets allow, until the queue is empty."""
+        while True:
+            head = queue.peek()
+            if head is None:
+                return
+            lane, guild_id = head
+            tokens = queue.lanes[lane][guild_id][0][1]
+
+            # Re-pick after sleeping: a higher-priority request may have arrived
+            delay = queue.delay(tokens)
+            if delay > 0:
+                logger.debug(f"{provider}: rate limited, next request in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            future, tokens = queue.pop(lane, guild_id)
+            queue.take(tokens)
+            queue.granted += 1
+            future.set_result(None)
+
+    def stats(self) -> dict[str, dict]:
+        """Return queue lengths, grants and bucket levels per provider."""
+        return {
+            provider: {
+                "interactive_waiting": queue.waiting(INTERACTIVE),
+                "backfill_waiting": queue.waiting(BACKFILL),
+                "granted": queue.granted,
+                "request_tokens": round(queue.requests.tokens, 1) if queue.requests else None,
+                "token_budget": round(queue.tokens.tokens) if queue.tokens else None,
+            }
+            for provider, queue in self._queues.items()
+        }
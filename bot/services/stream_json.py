@@ -0,0 +1,101 @@
+"""Incremental parsing of a streamed JSON completion."""
+
+import json
+import logging
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class ItemStreamParser:
+    """Pulls complete objects out of a JSON array while the text is still arriving.
+
+    Feed the completion text chunk by chunk; each call returns the objects
+    of the top-level `key` array (e.g. "items") that have just been closed.
+    The scanner tracks strings, escapes and nesting, so braces inside item
+    names do not confuse it, and it ignores anything outside the top-level
+    object such as markdown code fences. An item that fails to parse is
+    skipped rather than failing the stream; the final `result` is still
+    parsed from the full text.
+    """
+
+    def __init__(self, key: str = "items"):
+        """
+        Initialize the parser.
+
+        Args:
+            key: Top-level key of the array whose elements are emitted
+        """
+        self.key = key
+        self.text = ""
+        self.count = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> list[tuple[int, dict]]:
+        """
+        Add text and return the newly completed array elements.
+
+        Returns:
+            (index, object) pairs, index counting from 0 across all calls
+        """
+        self.text += chunk
+        completed = []
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start:pos]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = pos + 1
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._last_key == self.key:
+                    self._in_array = True
+                elif char == "{" and self._in_array and self._depth == 3:
+                    self._item_start = pos
+            elif char in "}]":
+                if char == "}" and self._in_array and self._depth == 3 and self._item_start is not None:
+                    item = self._parse(text[self._item_start:pos + 1])
+                    self._item_start = None
+                    if item is not None:
+                        completed.append((self.count, item))
+                        self.count += 1
+                elif char == "]" and self._in_array and self._depth == 2:
+                    self._in_array = False
+                self._depth -= 1
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _parse(fragment: str) -> Optional[dict]:
+        """Parse one element, or None if it is not a valid object."""
+        try:
+            item = json.loads(fragment)
+        except json.JSONDecodeError:
+            logger.debug(f"Skipping unparseable streamed item: {fragment[:80]}")
+            return None
+        return item if isinstance(item, dict) else None
+
+    def result(self) -> Any:
+        """Parse the complete text, tolerating a markdown code fence around it."""
+        text = self.text.strip()
+        start, end = text.find("{"), text.rfind("}")
+        if start > 0 or (end != -1 and end < len(text) - 1):
+            text = text[start:end + 1]
+        return json.loads(text)
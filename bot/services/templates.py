@@ -0,0 +1,208 @@
+"""Store templates that extract receipts with fixed layouts without an LLM call."""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+from bot.models import Receipt, ReceiptItem
+
+
+logger = logging.getLogger(__name__)
+
+# Lines searched for a template's header
+HEADER_LINES = 5
+
+PRICE = re.compile(r"\d+\.\d{2}\b")
+
+
+@dataclass
+class StoreTemplate:
+    """Line grammar of one store's receipt layout.
+
+    Every line between the header and the total line that carries a price
+    must match `item`, so an unexpected line (a multi-buy, a weighed item, a
+    voucher) makes the template decline rather than silently drop money.
+    """
+
+    store: str
+    header: re.Pattern
+    item: re.Pattern  # Named groups: name, price; optional sku
+    total: re.Pattern  # Named group: total
+    datetime: re.Pattern  # Named groups: date, time
+    datetime_format: str
+    tax: Optional[re.Pattern] = None  # Named group: tax
+    payment: list[tuple[re.Pattern, str]] = field(default_factory=list)
+
+
+ALDI = StoreTemplate(
+    store="ALDI",
+    header=re.compile(r"^ALDI STORES\b"),
+    # 399365 TradWmealBread750g 3.69 A
+    item=re.compile(r"^(?P<sku>\d{5,7})\s+(?P<name>\S.*?)\s+(?P<price>\d+\.\d{2})\s+[A-Z]$"),
+    # Total (INCL GST) $ 24.05
+    total=re.compile(r"^Total \(INCL GST\)\s+\$\s*(?P<total>\d+\.\d{2})$"),
+    # *2380 G541/009/805 30.12.25 18:18
+    datetime=re.compile(r"\s(?P<date>\d{2}\.\d{2}\.\d{2})\s+(?P<time>\d{2}:\d{2})$"),
+    datetime_format="%d.%m.%y %H:%M",
+    # A 00.0% Net 24.05 GST 0.00
+    tax=re.compile(r"\bGST\s+(?P<tax>\d+\.\d{2})$"),
+    payment=[
+        (re.compile(r"^Card Sales\b"), "Card"),
+        (re.compile(r"^Cash\b"), "Cash"),
+    ],
+)
+
+DEFAULT_TEMPLATES = [ALDI]
+
+
+def _clean_line(line: str) -> str:
+    """Strip the markdown decoration OCR output may add around a line."""
+    return line.strip().lstrip("#").strip().strip("*").strip()
+
+
+class TemplateExtractor:
+    """Fast-path extraction for stores with known receipt layouts.
+
+    The template is chosen by matching the first lines of the OCR text.
+    A parsed receipt is only returned when it passes validation, so callers
+    can fall back to the LLM on None. Counters record the hit rate.
+    """
+
+    def __init__(self, templates: Optional[list[StoreTemplate]] = None):
+        """
+        Initialize the extractor.
+
+        Args:
+            templates: Store templates to try (defaults to DEFAULT_TEMPLATES)
+        """
+        self.templates = templates if templates is not None else DEFAULT_TEMPLATES
+        self.attempts = 0
+        self.hits = 0
+        self.declined: dict[str, int] = {}
+
+    def match(self, lines: list[str]) -> Optional[StoreTemplate]:
+        """Return the template whose header appears in the first lines."""
+        for template in self.templates:
+            if any(template.header.search(line) for line in lines[:HEADER_LINES]):
+                return template
+        return None
+
+    def extract(
+        self,
+        ocr_text: str,
+        validate: Optional[Callable[[Receipt], list[str]]] = None,
+    ) -> Optional[Receipt]:
+        """
+        Extract a receipt with the matching store template.
+
+        Args:
+            ocr_text: Raw OCR text
+            validate: Returns the issues found in a receipt; any issue
+                rejects the template result
+
+        Returns:
+            The receipt, or None when no template matches, the layout
+            deviates from the template or validation fails
+        """
+        self.attempts += 1
+        lines = [_clean_line(line) for line in ocr_text.splitlines()]
+        lines = [line for line in lines if line]
+
+        template = self.match(lines)
+        if template is None:
+            return None
+
+        try:
+            receipt = self._parse(template, lines, ocr_text)
+        except ValueError as e:
+            return self._decline(template, str(e))
+
+        if validate:
+            issues = validate(receipt)
+            if issues:
+                return self._decline(template, "; ".join(issues))
+
+        self.hits += 1
+        logger.info(
+            f"Extracted {template.store} receipt from template "
+            f"(hit rate {self.hits}/{self.attempts}, {self.hit_rate:.0%})"
+        )
+        return receipt
+
+    def _decline(self, template: StoreTemplate, reason: str) -> None:
+        """Count a template that matched the header but not the receipt."""
+        self.declined[template.store] = self.declined.get(template.store, 0) + 1
+        logger.info(f"{template.store} template declined: {reason}")
+        return None
+
+    def _parse(self, template: StoreTemplate, lines: list[str], ocr_text: str) -> Receipt:
+        """Apply a template's grammar; raises ValueError where the layout differs."""
+        items: list[ReceiptItem] = []
+        total: Optional[float] = None
+        for line in lines:
+            if total is None:
+                total_match = template.total.search(line)
+                if total_match:
+                    total = float(total_match.group("total"))
+                    continue
+                item_match = template.item.match(line)
+                if item_match:
+                    items.append(ReceiptItem(
+                        raw_name=item_match.group("name"),
+                        price=float(item_match.group("price")),
+                        sku=item_match.groupdict().get("sku"),
+                    ))
+                elif PRICE.search(line):
+                    raise ValueError(f"unrecognised line: {line!r}")
+
+        if total is None:
+            raise ValueError("no total line")
+
+        when: Optional[datetime] = None
+        tax: Optional[float] = None
+        payment: Optional[str] = None
+        for line in lines:
+            if when is None:
+                date_match = template.datetime.search(line)
+                if date_match:
+                    when = datetime.strptime(
+                        f"{date_match.group('date')} {date_match.group('time')}",
+                        template.datetime_format,
+                    )
+            if tax is None and template.tax:
+                tax_match = template.tax.search(line)
+                if tax_match:
+                    tax = float(tax_match.group("tax"))
+            if payment is None:
+                payment = next(
+                    (method for pattern, method in template.payment if pattern.search(line)), None
+                )
+        if when is None:
+            raise ValueError("no date line")
+
+        return Receipt(
+            filename="",
+            store=template.store,
+            datetime=when,
+            raw_ocr_text=ocr_text,
+            items=items,
+            total=total,
+            tax=tax,
+            payment_method=payment,
+            verified=False,
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of receipts extracted without the LLM."""
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    def stats(self) -> dict:
+        """Return attempt, hit and per-store decline counts."""
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "declined": dict(self.declined),
+        }
@@ -0,0 +1,311 @@
+"""Token, latency and cost accounting for OCR and LLM calls."""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+import httpx
+from bot.services.resilience import current_attempt
+from bot.services.scheduler import current_context
+
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages calls are tagged with
+OCR = "ocr"
+EXTRACTION = "extraction"
+GUESSING = "guessing"
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """List price of a model in USD."""
+
+    prompt_per_million: float = 0.0
+    completion_per_million: float = 0.0
+    per_page: float = 0.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int, pages: int) -> float:
+        """Estimated cost of one call."""
+        return (
+            prompt_tokens * self.prompt_per_million / 1_000_000
+            + completion_tokens * self.completion_per_million / 1_000_000
+            + pages * self.per_page
+        )
+
+
+# Used when the provider does not report the cost itself (OpenRouter reports
+# it in the usage block; Mistral OCR reports only pages)
+MODEL_PRICES: dict[str, ModelPrice] = {
+    "openai/gpt-4o-mini": ModelPrice(prompt_per_million=0.15, completion_per_million=0.60),
+    "openai/gpt-4o": ModelPrice(prompt_per_million=2.50, completion_per_million=10.00),
+    "mistral-ocr-latest": ModelPrice(per_page=0.001),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    timestamp TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    store TEXT,
+    guild_id INTEGER,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    cost REAL,
+    ok INTEGER NOT NULL,
+    attempt TEXT NOT NULL DEFAULT 'first'
+);
+
+CREATE INDEX IF NOT EXISTS idx_calls_timestamp ON calls(timestamp);
+"""
+
+COLUMNS = [
+    "timestamp", "stage", "provider", "model", "store", "guild_id", "prompt_tokens",
+    "completion_tokens", "pages", "latency_ms", "cost", "ok", "attempt",
+]
+
+# Length of the timestamp prefix that identifies each rollup period
+PERIODS = {"day": len("YYYY-MM-DD"), "month": len("YYYY-MM")}
+
+
+def usage_tokens(usage: Any) -> tuple[int, int, Optional[float]]:
+    """
+    Read (prompt tokens, completion tokens, reported cost) from a usage block.
+
+    Accepts the dict of a raw OpenAI-style response or an SDK object with
+    the same fields; missing values count as zero (cost as None).
+    """
+    if usage is None:
+        return 0, 0, None
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    cost = get("cost")
+    return int(get("prompt_tokens") or 0), int(get("completion_tokens") or 0), (
+        float(cost) if isinstance(cost, (int, float)) else None
+    )
+
+
+def billed_on_failure(error: BaseException) -> bool:
+    """
+    Whether a failed attempt was likely billed anyway.
+
+    An attempt cut off after its request went out (a cancelled hedge loser
+    or a timeout) is still billed by the provider; error responses and
+    failed connections are not.
+    """
+    return isinstance(error, (asyncio.CancelledError, asyncio.TimeoutError, httpx.ReadTimeout))
+
+
+class UsageTracker:
+    """Records every OCR and LLM request attempt in a local SQLite database.
+
+    Each attempt is stored with its stage, model, store and guild (taken
+    from the scheduler's request context), whether it was the first try, a
+    retry or a hedge (from the resilience policy), token counts, latency
+    and cost: the provider-reported cost where there is one, otherwise an
+    estimate from MODEL_PRICES. Rows are buffered and written in batches;
+    when recorded from the event loop, the write runs in a worker thread so
+    a slow disk never stalls the bot.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        prices: Optional[dict[str, ModelPrice]] = None,
+        flush_every: int = 20,
+    ):
+        """
+        Open (or create) the usage database.
+
+        Args:
+            path: SQLite file (e.g. data/usage.db)
+            prices: Model prices for cost estimates (defaults to MODEL_PRICES)
+            flush_every: Buffered calls that trigger a write
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.prices = prices if prices is not None else MODEL_PRICES
+        self.flush_every = flush_every
+        self._pending: list[tuple] = []
+        self._flushes: set[asyncio.Task] = set()
+        self._unpriced: set[str] = set()
+
+        # One shared connection; the lock serialises access across threads
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(calls)")}
+        if "attempt" not in columns:
+            # Databases from before retries and hedges were recorded separately
+            self.conn.execute("ALTER TABLE calls ADD COLUMN attempt TEXT NOT NULL DEFAULT 'first'")
+        self.conn.commit()
+
+    def record(
+        self,
+        stage: str,
+        provider: str,
+        model: str,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        pages: int = 0,
+        cost: Optional[float] = None,
+        store: Optional[str] = None,
+        ok: bool = True,
+        attempt: Optional[str] = None,
+    ) -> None:
+        """
+        Record one request attempt.
+
+        Args:
+            stage: Pipeline stage (OCR, EXTRACTION or GUESSING)
+            provider: Provider name (e.g. "openrouter")
+            model: Model the call used
+            latency_ms: Time the attempt took, rate-limit waits excluded
+            prompt_tokens: Prompt tokens billed
+            completion_tokens: Completion tokens billed
+            pages: Pages billed (OCR)
+            cost: Cost reported by the provider, in USD; estimated when None
+            store: Store the receipt is from, when known
+            ok: Whether the attempt succeeded
+            attempt: FIRST, RETRY or HEDGE; taken from the resilience policy when None
+        """
+        if cost is None:
+            cost = self._estimate(model, prompt_tokens, completion_tokens, pages)
+        row = (
+            datetime.now().isoformat(timespec="seconds"), stage, provider, model, store,
+            current_context().guild_id, prompt_tokens, completion_tokens, pages,
+            round(latency_ms, 1), cost, int(ok), attempt or current_attempt(),
+        )
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) < self.flush_every:
+                return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a worker thread or synchronous code
+            self.flush()
+            return
+        task = loop.create_task(asyncio.to_thread(self.flush))
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        """Forget a finished background write, logging its failure."""
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Could not write usage records: {task.exception()}")
+
+    def _estimate(self, model: str, prompt_tokens: int, completion_tokens: int, pages: int) -> Optional[float]:
+        """Cost from the price table, or None (logged once) for an unknown model."""
+        price = self.prices.get(model)
+        if price is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"No price known for {model}; its calls are recorded without cost")
+            return None
+        return price.cost(prompt_tokens, completion_tokens, pages)
+
+    def flush(self) -> None:
+        """Write buffered calls to the database."""
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            placeholders = ", ".join("?" for _ in COLUMNS)
+            self.conn.executemany(
+                f"INSERT INTO calls ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+            )
+            self.conn.commit()
+
+    def rollup(
+        self,
+        period: str = "day",
+        count: int = 7,
+        guild_id: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Totals per period, stage and model, newest period first.
+
+        Args:
+            period: "day" or "month"
+            count: Number of periods back from today to include
+            guild_id: Only count this guild's calls
+
+        Returns:
+            Rows with period, stage, model, calls (attempts), failures,
+            retries, hedges, prompt_tokens, completion_tokens, pages, cost
+            and avg_latency_ms
+        """
+        self.flush()
+        where, params = self._filter(period, count, guild_id)
+        with self._lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT substr(timestamp, 1, ?) AS period, stage, model,
+                       COUNT(*) AS calls, SUM(ok = 0) AS failures,
+                       SUM(attempt = 'retry') AS retries, SUM(attempt = 'hedge') AS hedges,
+                       SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens,
+                       SUM(pages) AS pages, COALESCE(SUM(cost), 0) AS cost,
+                       AVG(latency_ms) AS avg_latency_ms
+                FROM calls WHERE {where}
+                GROUP BY period, stage, model
+                ORDER BY period DESC, cost DESC
+                """,
+                [PERIODS[period], *params],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def top_stores(
+        self,
+        period: str = "day",
+        count: int = 7,
+        guild_id: Optional[int] = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Most expensive stores over the same window as `rollup` (store None when unknown)."""
+        self.flush()
+        where, params = self._filter(period, count, guild_id)
+        with self._lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT store, COUNT(*) AS calls, COALESCE(SUM(cost), 0) AS cost
+                FROM calls WHERE {where}
+                GROUP BY store ORDER BY cost DESC LIMIT ?
+                """,
+                [*params, limit],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _filter(period: str, count: int, guild_id: Optional[int]) -> tuple[str, list]:
+        """WHERE clause selecting the last `count` periods (and a guild)."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period} (use 'day' or 'month')")
+        today = datetime.now().date()
+        if period == "day":
+            since = (today - timedelta(days=count - 1)).isoformat()
+        else:
+            month = today.year * 12 + today.month - 1 - (count - 1)
+            since = f"{month // 12:04d}-{month % 12 + 1:02d}"
+        where, params = "timestamp >= ?", [since]
+        if guild_id is not None:
+            where += " AND guild_id = ?"
+            params.append(guild_id)
+        return where, params
+
+    def close(self) -> None:
+        """Write any buffered calls and close the database."""
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,506 @@
+"""SQLite storage backend with indexed receipts and items."""
+
+import argparse
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from bot.blobs import BlobStore
+from bot.models import Receipt, ReceiptItem
+from bot.rollups import range_summary, receipt_rollup_rows, summarize_month_rows
+from bot.storage import FilenameIndex, Storage, make_receipt_filename
+
+
+RECEIPTS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    store TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    processed_at TEXT NOT NULL,
+    verified INTEGER NOT NULL DEFAULT 0,
+    raw_ocr_text TEXT,
+    raw_ocr_hash TEXT,
+    total REAL NOT NULL,
+    subtotal REAL,
+    tax REAL,
+    discount_total REAL,
+    payment_method TEXT
+);
+"""
+
+SCHEMA = RECEIPTS_TABLE.format(name="receipts") + """
+CREATE TABLE IF NOT EXISTS items (
+    receipt_id TEXT NOT NULL REFERENCES receipts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    raw_name TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    unit TEXT NOT NULL,
+    price REAL NOT NULL,
+    discount REAL NOT NULL,
+    sku TEXT,
+    category TEXT NOT NULL,
+    language TEXT,
+    guessed_name TEXT,
+    confidence REAL,
+    confirmed_name TEXT,
+    needs_review INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (receipt_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    month TEXT NOT NULL,
+    store TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total REAL NOT NULL,
+    receipts INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    PRIMARY KEY (month, store, category)
+);
+
+CREATE TABLE IF NOT EXISTS corrections (
+    key TEXT PRIMARY KEY,
+    actual_name TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_receipts_datetime ON receipts(datetime);
+CREATE INDEX IF NOT EXISTS idx_receipts_store ON receipts(store COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_receipts_verified ON receipts(verified, datetime);
+"""
+
+RECEIPT_COLUMNS = [
+    "id", "filename", "store", "datetime", "processed_at", "verified",
+    "raw_ocr_text", "raw_ocr_hash", "total", "subtotal", "tax", "discount_total",
+    "payment_method",
+]
+
+# Columns read back when loading receipts; raw OCR text is loaded lazily
+LOADED_RECEIPT_COLUMNS = [col for col in RECEIPT_COLUMNS if col != "raw_ocr_text"]
+
+ITEM_COLUMNS = [
+    "raw_name", "quantity", "unit", "price", "discount", "sku", "category",
+    "language", "guessed_name", "confidence", "confirmed_name", "needs_review",
+]
+
+
+class SQLiteStorage:
+    """Receipt storage backed by a single SQLite database.
+
+    Implements the same API as the JSON `Storage` class, plus query methods
+    that push their filters down into SQL.
+    """
+
+    def __init__(self, data_dir: str = "data", db_name: str = "receipts.db"):
+        """Initialize storage and create the schema if needed."""
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / db_name
+
+        # One shared connection; the lock serialises access across threads
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._upgrade_schema()
+
+        # Raw OCR text lives in the blob store, not in the receipts table
+        self.blobs = BlobStore(self.data_dir / "blobs" / "ocr")
+
+        # Sorted filenames for pagination and autocomplete
+        self.index = FilenameIndex(self.list_receipts())
+
+        # Databases created before rollups existed get them built once
+        has_rollups = self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone()
+        has_receipts = self.conn.execute("SELECT 1 FROM receipts LIMIT 1").fetchone()
+        if has_receipts and not has_rollups:
+            self.rebuild_rollups()
+
+    def _upgrade_schema(self) -> None:
+        """Bring databases created by older versions up to the current schema."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(receipts)")}
+        if "raw_ocr_hash" in columns:
+            return
+
+        # Rebuild receipts so raw_ocr_text becomes nullable and raw_ocr_hash
+        # exists; foreign keys are off so dropping the old table keeps items
+        old_columns = ", ".join(col for col in RECEIPT_COLUMNS if col != "raw_ocr_hash")
+        self.conn.execute("PRAGMA foreign_keys = OFF")
+        self.conn.executescript(
+            "BEGIN;"
+            + RECEIPTS_TABLE.format(name="receipts_new")
+            + f"INSERT INTO receipts_new ({old_columns}) SELECT {old_columns} FROM receipts;"
+            + "DROP TABLE receipts;"
+            + "ALTER TABLE receipts_new RENAME TO receipts;"
+            + "COMMIT;"
+        )
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self.conn.close()
+
+    def save_receipt(self, receipt: Receipt) -> str:
+        """Save receipt and return its filename."""
+        filename = receipt.filename or make_receipt_filename(receipt)
+        receipt.filename = filename
+
+        if receipt.raw_ocr_text is not None:
+            receipt.raw_ocr_hash = self.blobs.put_text(receipt.raw_ocr_text)
+        data = receipt.model_dump(mode="json")
+        data["raw_ocr_text"] = None
+        receipt_row = [data[col] for col in RECEIPT_COLUMNS]
+        item_rows = [
+            [receipt.id, position] + [item[col] for col in ITEM_COLUMNS]
+            for position, item in enumerate(data["items"])
+        ]
+
+        with self._lock, self.conn:
+            # Same filename overwrites, matching the JSON backend
+            previous = self._select_receipts(
+                "r.id = ? OR r.filename = ?", [receipt.id, filename]
+            )
+            for old_receipt in previous:
+                self._apply_rollups(old_receipt, sign=-1)
+                self.index.remove(old_receipt.filename)
+            self.conn.execute(
+                "DELETE FROM receipts WHERE id = ? OR filename = ?",
+                (receipt.id, filename),
+            )
+            self.conn.execute(
+                f"INSERT INTO receipts ({', '.join(RECEIPT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(RECEIPT_COLUMNS))})",
+                receipt_row,
+            )
+            self.conn.executemany(
+                f"INSERT INTO items (receipt_id, position, {', '.join(ITEM_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(ITEM_COLUMNS) + 2))})",
+                item_rows,
+            )
+            self._apply_rollups(receipt)
+            self.index.add(filename)
+
+        return filename
+
+    def load_receipt(self, filename: str) -> Optional[Receipt]:
+        """Load receipt by filename."""
+        receipts = self._select_receipts("r.filename = ?", [filename])
+        return receipts[0] if receipts else None
+
+    def list_receipts(self) -> list[str]:
+        """List all receipt filenames."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT filename FROM receipts ORDER BY filename"
+            ).fetchall()
+        return [row["filename"] for row in rows]
+
+    def delete_receipt(self, filename: str) -> bool:
+        """Delete a receipt and its items."""
+        with self._lock, self.conn:
+            for old_receipt in self._select_receipts("r.filename = ?", [filename]):
+                self._apply_rollups(old_receipt, sign=-1)
+                self.index.remove(filename)
+            cursor = self.conn.execute(
+                "DELETE FROM receipts WHERE filename = ?", (filename,)
+            )
+        return cursor.rowcount > 0
+
+    def query_receipts(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        verified: Optional[bool] = None,
+        store: Optional[str] = None,
+    ) -> list[Receipt]:
+        """
+        Load receipts matching the given filters.
+
+        Args:
+            start: Only receipts at or after this datetime
+            end: Only receipts at or before this datetime
+            verified: Only receipts with this verified flag
+            store: Only receipts from this store (case-insensitive)
+
+        Returns:
+            Matching receipts in filename order
+        """
+        clauses, params = self._filter_clauses(start, end, verified, store)
+        return self._select_receipts(" AND ".join(clauses) or "1", params)
+
+    def iter_receipts(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        verified: Optional[bool] = None,
+        store: Optional[str] = None,
+    ) -> tuple[list[Receipt], Optional[str]]:
+        """
+        Return one page of receipts in filename order.
+
+        Args:
+            cursor: Filename after which the page starts (None for the first page)
+            limit: Maximum receipts per page
+            start, end, verified, store: Same filters as query_receipts
+
+        Returns:
+            Tuple of (receipts, cursor for the next page or None if this is the last)
+        """
+        clauses, params = self._filter_clauses(start, end, verified, store)
+        if cursor:
+            clauses.append("r.filename > ?")
+            params.append(cursor)
+
+        # Fetch one extra row to know whether another page exists
+        receipts = self._select_receipts(" AND ".join(clauses) or "1", params, limit + 1)
+        if len(receipts) > limit:
+            return receipts[:limit], receipts[limit - 1].filename
+        return receipts, None
+
+    def complete_filenames(self, query: str, limit: int = 25) -> list[str]:
+        """Return filenames matching a partial name, for autocomplete."""
+        return self.index.complete(query, limit)
+
+    def count_receipts(self) -> int:
+        """Number of stored receipts, from the in-memory index."""
+        return len(self.index)
+
+    def _filter_clauses(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        verified: Optional[bool],
+        store: Optional[str],
+    ) -> tuple[list[str], list]:
+        """Build WHERE clauses and parameters for the query filters."""
+        clauses = []
+        params = []
+        if start:
+            clauses.append("r.datetime >= ?")
+            params.append(start.isoformat())
+        if end:
+            clauses.append("r.datetime <= ?")
+            params.append(end.isoformat())
+        if verified is not None:
+            clauses.append("r.verified = ?")
+            params.append(int(verified))
+        if store:
+            clauses.append("r.store = ? COLLATE NOCASE")
+            params.append(store)
+        return clauses, params
+
+    def item_spending(self, product: str, month: Optional[str] = None) -> tuple[float, int]:
+        """
+        Sum spending on items whose name contains a product string.
+
+        Args:
+            product: Case-insensitive substring of the item name
+            month: Optional YYYY-MM (or YYYY) prefix to filter receipts by
+
+        Returns:
+            Tuple of (total spent, number of matching purchases)
+        """
+        sql = (
+            "SELECT COALESCE(SUM(i.price * i.quantity), 0) AS total, COUNT(*) AS count "
+            "FROM items i JOIN receipts r ON r.id = i.receipt_id "
+            "WHERE instr(lower(COALESCE(i.confirmed_name, i.guessed_name, i.raw_name)), ?) > 0"
+        )
+        params = [product.lower()]
+        if month:
+            sql += " AND substr(r.datetime, 1, 7) LIKE ? || '%'"
+            params.append(month)
+
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+        return row["total"], row["count"]
+
+    def monthly_summary(self, month: str) -> tuple[float, int, int]:
+        """Return (total, receipt count, item count) for a YYYY-MM month from the rollups."""
+        return summarize_month_rows(self.month_breakdown(month))
+
+    def month_breakdown(self, month: str) -> dict[tuple[str, str], dict]:
+        """Return the rollup rows {(store, category): row} for a YYYY-MM month."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT store, category, total, receipts, items FROM rollups WHERE month = ?",
+                (month,),
+            ).fetchall()
+        return {
+            (row["store"], row["category"]): {
+                "total": row["total"],
+                "receipts": row["receipts"],
+                "items": row["items"],
+            }
+            for row in rows
+        }
+
+    def range_summary(self, start: datetime, end: datetime) -> tuple[float, int]:
+        """Return (total, receipt count) between two datetimes."""
+        return range_summary(self, start, end)
+
+    def rebuild_rollups(self) -> int:
+        """Recompute rollups from every stored receipt; returns the receipt count."""
+        with self._lock, self.conn:
+            receipts = self.query_receipts()
+            self.conn.execute("DELETE FROM rollups")
+            for receipt in receipts:
+                self._apply_rollups(receipt)
+        return len(receipts)
+
+    def _apply_rollups(self, receipt: Receipt, sign: int = 1) -> None:
+        """Add or remove a receipt's rollup rows; caller holds the lock and transaction."""
+        for (month, store, category), delta in receipt_rollup_rows(receipt).items():
+            self.conn.execute(
+                "INSERT INTO rollups (month, store, category, total, receipts, items) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(month, store, category) DO UPDATE SET "
+                "total = round(total + excluded.total, 2), "
+                "receipts = receipts + excluded.receipts, "
+                "items = items + excluded.items",
+                (
+                    month, store, category,
+                    round(sign * delta["total"], 2),
+                    sign * delta["receipts"],
+                    sign * delta["items"],
+                ),
+            )
+        self.conn.execute("DELETE FROM rollups WHERE receipts <= 0")
+
+    def _select_receipts(self, where: str, params: list, limit: int = -1) -> list[Receipt]:
+        """Load receipts (with items) matching a WHERE clause on alias `r`, in filename order."""
+        selected = f"FROM receipts r WHERE {where} ORDER BY r.filename LIMIT ?"
+        with self._lock:
+            receipt_rows = self.conn.execute(
+                f"SELECT {', '.join('r.' + col for col in LOADED_RECEIPT_COLUMNS)} {selected}",
+                params + [limit],
+            ).fetchall()
+            item_rows = self.conn.execute(
+                f"SELECT i.* FROM items i WHERE i.receipt_id IN (SELECT r.id {selected}) "
+                f"ORDER BY i.receipt_id, i.position",
+                params + [limit],
+            ).fetchall()
+
+        items_by_receipt: dict[str, list[ReceiptItem]] = {}
+        for row in item_rows:
+            item = {col: row[col] for col in ITEM_COLUMNS}
+            item["needs_review"] = bool(item["needs_review"])
+            items_by_receipt.setdefault(row["receipt_id"], []).append(ReceiptItem(**item))
+
+        receipts = []
+        for row in receipt_rows:
+            data = {col: row[col] for col in LOADED_RECEIPT_COLUMNS}
+            data["verified"] = bool(data["verified"])
+            data["items"] = items_by_receipt.get(row["id"], [])
+            receipts.append(Receipt(**data))
+        return receipts
+
+    def load_ocr_text(self, receipt: Receipt) -> Optional[str]:
+        """Load a receipt's raw OCR text, reading the blob store only when needed."""
+        if receipt.raw_ocr_text is not None:
+            return receipt.raw_ocr_text
+        if receipt.raw_ocr_hash:
+            return self.blobs.get_text(receipt.raw_ocr_hash)
+
+        # Rows written before the blob store keep their text inline
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT raw_ocr_text FROM receipts WHERE id = ?", (receipt.id,)
+            ).fetchone()
+        return row["raw_ocr_text"] if row else None
+
+    def externalize_ocr_text(self) -> int:
+        """Move inline raw OCR text of older rows into the blob store."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT filename FROM receipts WHERE raw_ocr_text IS NOT NULL"
+            ).fetchall()
+
+        count = 0
+        for row in rows:
+            receipt = self.load_receipt(row["filename"])
+            if receipt:
+                receipt.raw_ocr_text = self.load_ocr_text(receipt)
+                self.save_receipt(receipt)
+                count += 1
+        return count
+
+    def load_corrections(self) -> dict[str, str]:
+        """Load item name corrections."""
+        with self._lock:
+            rows = self.conn.execute("SELECT key, actual_name FROM corrections").fetchall()
+        return {row["key"]: row["actual_name"] for row in rows}
+
+    def save_correction(self, raw_name: str, store: str, actual_name: str) -> None:
+        """Save a correction mapping."""
+        key = f"{raw_name}|{store}"
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO corrections (key, actual_name) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET actual_name = excluded.actual_name",
+                (key, actual_name),
+            )
+
+    def delete_correction(self, raw_name: str, store: str) -> bool:
+        """Delete a correction mapping."""
+        key = f"{raw_name}|{store}"
+        with self._lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM corrections WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+
+def migrate_json_to_sqlite(data_dir: str = "data") -> tuple[int, int]:
+    """
+    One-shot migration from the JSON layout into receipts.db.
+
+    Reads receipts and corrections through the JSON `Storage`, so the JSON
+    data is brought up to date on the way: receipts still in the flat
+    `receipts/*.json` layout are moved into their `YYYY/MM` shards, and the
+    manifest, rollups and corrections journal are written if missing. No
+    JSON data is deleted, so `STORAGE_BACKEND=json` keeps working.
+
+    Args:
+        data_dir: Base data directory
+
+    Returns:
+        Tuple of (receipts migrated, corrections migrated)
+    """
+    json_storage = Storage(data_dir)
+    storage = SQLiteStorage(data_dir)
+
+    receipt_count = 0
+    for filename in json_storage.list_receipts():
+        receipt = json_storage.load_receipt(filename)
+        if receipt:
+            storage.save_receipt(receipt)
+            receipt_count += 1
+
+    corrections = json_storage.load_corrections()
+    for key, actual_name in corrections.items():
+        raw_name, store = key.rsplit("|", 1)
+        storage.save_correction(raw_name, store, actual_name)
+
+    storage.close()
+    return receipt_count, len(corrections)
+
+
+def main():
+    """Command-line entry point: python -m bot.sqlite_storage migrate."""
+    parser = argparse.ArgumentParser(description="SQLite storage maintenance")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        receipts, corrections = migrate_json_to_sqlite(args.data_dir)
+        print(f"Migrated {receipts} receipts and {corrections} corrections")
+
+
+if __name__ == "__main__":
+    main()
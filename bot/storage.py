@@ -1,91 +1,540 @@
 """JSON file storage operations."""
 
+import bisect
 import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
-from bot.models import Receipt
+from bot.blobs import BlobStore
+from bot.journal import KeyedJournal
+from bot.models import Receipt, ReceiptItem
+from bot.rollups import Rollups, range_summary, summarize_month_rows
+
+
+logger = logging.getLogger(__name__)
+
+def make_receipt_filename(receipt: Receipt) -> str:
+    """
+    Build the storage filename for a receipt: YYYY-MM-DD_HHMM_store_<id>.json.
+
+    The first 8 hex digits of Receipt.id keep two receipts from the same
+    store in the same minute from overwriting each other.
+    """
+    dt = receipt.datetime
+    store_name = receipt.store.lower().replace(" ", "_").replace("/", "_")
+    return f"{dt.strftime('%Y-%m-%d_%H%M')}_{store_name}_{receipt.id[:8]}.json"
+
+
+def item_display_name(item: ReceiptItem) -> str:
+    """Best known name for an item: confirmed, then guessed, then raw."""
+    return item.confirmed_name or item.guessed_name or item.raw_name
+
+
+def manifest_matches(
+    entry: dict,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    verified: Optional[bool] = None,
+    store: Optional[str] = None,
+) -> bool:
+    """Check a manifest entry against the optional query filters."""
+    # ISO datetimes compare correctly as strings
+    if start and entry["datetime"] < start.isoformat():
+        return False
+    if end and entry["datetime"] > end.isoformat():
+        return False
+    if verified is not None and entry["verified"] != verified:
+        return False
+    if store and entry["store"].lower() != store.lower():
+        return False
+    return True
+
+
+def receipt_matches(
+    receipt: Receipt,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    verified: Optional[bool] = None,
+    store: Optional[str] = None,
+) -> bool:
+    """Check a receipt against the optional query filters."""
+    if start and receipt.datetime < start:
+        return False
+    if end and receipt.datetime > end:
+        return False
+    if verified is not None and receipt.verified != verified:
+        return False
+    if store and receipt.store.lower() != store.lower():
+        return False
+    return True
+
+
+class FilenameIndex:
+    """In-memory sorted index of receipt filenames.
+
+    Serves keyset pagination and autocomplete without touching the disk;
+    lookups are a bisect for prefixes plus a bounded substring scan.
+    """
+
+    def __init__(self, filenames: list[str]):
+        """Build the index from existing filenames."""
+        self._names = sorted(filenames)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of indexed filenames."""
+        return len(self._names)
+
+    def add(self, filename: str) -> None:
+        """Insert a filename, keeping the index sorted."""
+        with self._lock:
+            position = bisect.bisect_left(self._names, filename)
+            if position == len(self._names) or self._names[position] != filename:
+                self._names.insert(position, filename)
+
+    def remove(self, filename: str) -> None:
+        """Remove a filename if present."""
+        with self._lock:
+            position = bisect.bisect_left(self._names, filename)
+            if position < len(self._names) and self._names[position] == filename:
+                del self._names[position]
+
+    def after(self, cursor: Optional[str] = None) -> list[str]:
+        """Return all filenames sorted after the cursor (or all if None)."""
+        with self._lock:
+            start = bisect.bisect_right(self._names, cursor) if cursor else 0
+            return self._names[start:]
+
+    def complete(self, query: str, limit: int = 25) -> list[str]:
+        """
+        Return up to `limit` filenames matching a query.
+
+        Prefix matches come first (found by bisect), followed by filenames
+        containing the query elsewhere.
+        """
+        query = query.lower()
+        with self._lock:
+            start = bisect.bisect_left(self._names, query)
+            matches = []
+            for name in self._names[start:]:
+                if not name.startswith(query) or len(matches) == limit:
+                    break
+                matches.append(name)
+
+            if len(matches) < limit and query:
+                seen = set(matches)
+                for name in self._names:
+                    if query in name and name not in seen:
+                        matches.append(name)
+                        if len(matches) == limit:
+                            break
+            return matches
+
+
+def create_storage(backend: str = "json", data_dir: str = "data"):
+    """
+    Create a storage backend by name.
+
+    Args:
+        backend: "json" (one file per receipt) or "sqlite"
+        data_dir: Base data directory
+
+    Returns:
+        Storage or SQLiteStorage instance
+    """
+    if backend == "json":
+        return Storage(data_dir)
+    if backend == "sqlite":
+        from bot.sqlite_storage import SQLiteStorage
+
+        return SQLiteStorage(data_dir)
+    raise ValueError(f"Unknown storage backend: {backend}")
 
 
 class Storage:
-    """Handles storage and retrieval of receipt data."""
+    """Handles storage and retrieval of receipt data.
+
+    Receipts are sharded by month as `receipts/YYYY/MM/<filename>.json`. A
+    manifest journal (`manifest.jsonl`) records id, datetime, store, total,
+    verified flag and path per receipt, so listing and filtered queries only
+    open the files they return.
+    """
 
-    def __init__(self, data_dir: str = "data"):
-        """Initialize storage with data directory."""
+    def __init__(self, data_dir: str = "data", cache_size: int = 1024):
+        """
+        Initialize storage with data directory.
+
+        Args:
+            data_dir: Base data directory
+            cache_size: Max parsed receipts kept in the in-process LRU cache
+        """
         self.data_dir = Path(data_dir)
         self.receipts_dir = self.data_dir / "receipts"
-        self.corrections_file = self.data_dir / "corrections.json"
+        self.corrections_file = self.data_dir / "corrections.jsonl"
+        legacy_corrections_file = self.data_dir / "corrections.json"
+
+        # filename -> ((mtime_ns, size), Receipt), most recently used last
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[tuple[int, int], Receipt]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Serialises read-modify-write of receipt files and rollups across threads
+        self._write_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         # Create directories if they don't exist
         self.receipts_dir.mkdir(parents=True, exist_ok=True)
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize corrections file
-        if not self.corrections_file.exists():
-            self._save_json(self.corrections_file, {})
+        # Corrections journal; import the old single-file format once
+        # An empty journal next to the old file is a previously interrupted import
+        journal_empty = not self.corrections_file.exists() or self.corrections_file.stat().st_size == 0
+        if journal_empty and legacy_corrections_file.exists():
+            legacy = self._load_json(legacy_corrections_file)
+            self.corrections = KeyedJournal.create(self.corrections_file, legacy)
+        else:
+            self.corrections = KeyedJournal(self.corrections_file)
+
+        # Receipt manifest; built from the files (and flat layout sharded) once
+        # (also rebuilt if an interrupted build left it empty with receipts on disk)
+        manifest_file = self.data_dir / "manifest.jsonl"
+        if manifest_file.exists():
+            self.manifest = KeyedJournal(manifest_file)
+            if not self.manifest.data and any(self.receipts_dir.rglob("*.json")):
+                self.rebuild_manifest()
+        else:
+            self.manifest = KeyedJournal.create(manifest_file, self._scan_receipts())
+
+        # Sorted filenames for pagination and autocomplete
+        self.index = FilenameIndex(list(self.manifest.snapshot()))
+
+        # Raw OCR text lives outside the receipt files
+        self.blobs = BlobStore(self.data_dir / "blobs" / "ocr")
+
+        # Spending rollups by (month, store, category); built once for existing data
+        self.rollups = Rollups(self.data_dir / "rollups.json")
+        if not self.rollups.path.exists() and self.list_receipts():
+            self.rebuild_rollups()
 
     def _save_json(self, path: Path, data: dict) -> None:
-        """Save data to JSON file."""
-        with open(path, "w", encoding="utf-8") as f:
+        """Save data to JSON file atomically (readers never see a partial file)."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
 
     def _load_json(self, path: Path) -> dict:
         """Load data from JSON file."""
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def receipt_path(self, filename: str) -> Path:
+        """Path of a receipt file, from the manifest or the month shard in its name."""
+        entry = self.manifest.get(filename)
+        if entry:
+            return self.receipts_dir / entry["path"]
+        return self._shard_path(filename)
+
+    def _shard_path(self, filename: str) -> Path:
+        """Month shard path for a receipt filename."""
+        name = Path(filename).name
+        match = re.match(r"(\d{4})-(\d{2})-", name)
+        if match:
+            return self.receipts_dir / match[1] / match[2] / name
+        return self.receipts_dir / name
+
+    def _scan_receipts(self) -> dict[str, dict]:
+        """
+        Build manifest entries by scanning receipt files.
+
+        Files still in the old flat `receipts/*.json` layout are moved into
+        their month shard first. Unreadable files are logged and skipped.
+        """
+        for path in list(self.receipts_dir.glob("*.json")):
+            target = self._shard_path(path.name)
+            if target != path:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+
+        entries = {}
+        for path in self.receipts_dir.rglob("*.json"):
+            try:
+                receipt = Receipt(**self._load_json(path))
+            except Exception as e:
+                logger.error(f"Skipping unreadable receipt {path}: {e}")
+                continue
+            entries[path.name] = self._manifest_entry(receipt, path)
+        return entries
+
+    def rebuild_manifest(self) -> int:
+        """
+        Rebuild the manifest by scanning receipt files.
+
+        Returns:
+            Number of receipts in the manifest
+        """
+        entries = self._scan_receipts()
+        self.manifest.compact(entries)
+        return len(entries)
+
+    def _manifest_entry(self, receipt: Receipt, path: Path) -> dict:
+        """Summary of a receipt kept in the manifest."""
+        return {
+            "id": receipt.id,
+            "datetime": receipt.datetime.isoformat(),
+            "store": receipt.store,
+            "total": receipt.total,
+            "verified": receipt.verified,
+            "path": path.relative_to(self.receipts_dir).as_posix(),
+        }
+
+    def _matching_filenames(self, **filters) -> list[str]:
+        """Filenames whose manifest entries match the query filters, sorted."""
+        entries = self.manifest.snapshot()
+        return sorted(
+            filename for filename, entry in entries.items() if manifest_matches(entry, **filters)
+        )
+
     def save_receipt(self, receipt: Receipt) -> str:
-        """Save receipt to file and return filename."""
-        # Generate filename: YYYY-MM-DD_HHMM_store.json
-        dt = receipt.datetime
-        store_name = receipt.store.lower().replace(" ", "_")
-        filename = f"{dt.strftime('%Y-%m-%d_%H%M')}_{store_name}.json"
+        """Save receipt to its month shard and return the filename."""
+        filename = receipt.filename or make_receipt_filename(receipt)
         receipt.filename = filename
 
-        filepath = self.receipts_dir / filename
-        receipt_dict = receipt.model_dump(mode="json")
-        self._save_json(filepath, receipt_dict)
+        filepath = self.receipt_path(filename)
+        if receipt.raw_ocr_text is not None:
+            receipt.raw_ocr_hash = self.blobs.put_text(receipt.raw_ocr_text)
+        receipt_dict = receipt.model_dump(mode="json", exclude={"raw_ocr_text"})
+
+        with self._write_lock:
+            # Read the previous version from disk, not the shared cached copy
+            previous = Receipt(**self._load_json(filepath)) if filepath.exists() else None
+
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            self._save_json(filepath, receipt_dict)
+            self._invalidate(filename)
+            self.manifest.set(filename, self._manifest_entry(receipt, filepath))
+            self.index.add(filename)
+
+            if previous:
+                self.rollups.apply(previous, sign=-1)
+            self.rollups.apply(receipt)
 
         return filename
 
     def load_receipt(self, filename: str) -> Optional[Receipt]:
-        """Load receipt from file."""
-        filepath = self.receipts_dir / filename
-        if not filepath.exists():
+        """
+        Load receipt from file, served from the LRU cache when unchanged.
+
+        Cached receipts are shared between callers; call save_receipt to
+        persist any change made to a returned receipt.
+        """
+        filepath = self.receipt_path(filename)
+        try:
+            stat = filepath.stat()
+        except FileNotFoundError:
+            self._invalidate(filename)
             return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._cache_lock:
+            cached = self._cache.get(filename)
+            if cached and cached[0] == signature:
+                self._cache.move_to_end(filename)
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
 
         data = self._load_json(filepath)
-        return Receipt(**data)
+        receipt = Receipt(**data)
+
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[filename] = (signature, receipt)
+                self._cache.move_to_end(filename)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return receipt
+
+    def load_ocr_text(self, receipt: Receipt) -> Optional[str]:
+        """Load a receipt's raw OCR text, reading the blob store only when needed."""
+        if receipt.raw_ocr_text is not None:
+            return receipt.raw_ocr_text
+        if receipt.raw_ocr_hash:
+            return self.blobs.get_text(receipt.raw_ocr_hash)
+        return None
+
+    def externalize_ocr_text(self) -> int:
+        """Move inline raw OCR text of older receipt files into the blob store."""
+        count = 0
+        for filename in self.list_receipts():
+            receipt = self.load_receipt(filename)
+            if receipt and receipt.raw_ocr_text is not None:
+                self.save_receipt(receipt)
+                count += 1
+        return count
+
+    def cache_info(self) -> dict[str, int]:
+        """Return receipt cache hit/miss counters and current size."""
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+            }
+
+    def _invalidate(self, filename: str) -> None:
+        """Drop a receipt from the cache."""
+        with self._cache_lock:
+            self._cache.pop(filename, None)
 
     def list_receipts(self) -> list[str]:
-        """List all receipt filenames."""
-        return sorted([f.name for f in self.receipts_dir.glob("*.json")])
+        """List all receipt filenames (from the manifest, without touching the files)."""
+        return self.index.after()
 
     def delete_receipt(self, filename: str) -> bool:
         """Delete a receipt file."""
-        filepath = self.receipts_dir / filename
-        if filepath.exists():
-            filepath.unlink()
-            return True
-        return False
+        filepath = self.receipt_path(filename)
+        with self._write_lock:
+            self._invalidate(filename)
+            self.manifest.delete(filename)
+            self.index.remove(filename)
+            if filepath.exists():
+                previous = Receipt(**self._load_json(filepath))
+                filepath.unlink()
+                self.rollups.apply(previous, sign=-1)
+                return True
+            return False
+
+    def query_receipts(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        verified: Optional[bool] = None,
+        store: Optional[str] = None,
+    ) -> list[Receipt]:
+        """
+        Load receipts matching the given filters.
+
+        Args:
+            start: Only receipts at or after this datetime
+            end: Only receipts at or before this datetime
+            verified: Only receipts with this verified flag
+            store: Only receipts from this store (case-insensitive)
+
+        Returns:
+            Matching receipts in filename order
+        """
+        filenames = self._matching_filenames(start=start, end=end, verified=verified, store=store)
+        receipts = []
+        for filename in filenames:
+            receipt = self.load_receipt(filename)
+            if receipt and receipt_matches(receipt, start, end, verified, store):
+                receipts.append(receipt)
+        return receipts
+
+    def iter_receipts(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        verified: Optional[bool] = None,
+        store: Optional[str] = None,
+    ) -> tuple[list[Receipt], Optional[str]]:
+        """
+        Return one page of receipts in filename order.
+
+        Args:
+            cursor: Filename after which the page starts (None for the first page)
+            limit: Maximum receipts per page
+            start, end, verified, store: Same filters as query_receipts
+
+        Returns:
+            Tuple of (receipts, cursor for the next page or None if this is the last)
+        """
+        page = []
+        last_filename = None
+        for filename in self.index.after(cursor):
+            entry = self.manifest.get(filename)
+            if not entry or not manifest_matches(entry, start, end, verified, store):
+                continue
+            receipt = self.load_receipt(filename)
+            if not receipt or not receipt_matches(receipt, start, end, verified, store):
+                continue
+            if len(page) == limit:
+                return page, last_filename
+            page.append(receipt)
+            last_filename = filename
+        return page, None
+
+    def complete_filenames(self, query: str, limit: int = 25) -> list[str]:
+        """Return filenames matching a partial name, for autocomplete."""
+        return self.index.complete(query, limit)
+
+    def count_receipts(self) -> int:
+        """Number of stored receipts, from the in-memory index."""
+        return len(self.index)
+
+    def item_spending(self, product: str, month: Optional[str] = None) -> tuple[float, int]:
+        """
+        Sum spending on items whose name contains a product string.
+
+        Args:
+            product: Case-insensitive substring of the item name
+            month: Optional YYYY-MM (or YYYY) prefix to filter receipts by
+
+        Returns:
+            Tuple of (total spent, number of matching purchases)
+        """
+        total = 0.0
+        count = 0
+        needle = product.lower()
+
+        for receipt in self.query_receipts():
+            if month and not receipt.datetime.strftime("%Y-%m").startswith(month):
+                continue
+            for item in receipt.items:
+                if needle in item_display_name(item).lower():
+                    total += item.price * item.quantity
+                    count += 1
+
+        return total, count
+
+    def monthly_summary(self, month: str) -> tuple[float, int, int]:
+        """Return (total, receipt count, item count) for a YYYY-MM month from the rollups."""
+        return summarize_month_rows(self.rollups.month_rows(month))
+
+    def month_breakdown(self, month: str) -> dict[tuple[str, str], dict]:
+        """Return the rollup rows {(store, category): row} for a YYYY-MM month."""
+        return self.rollups.month_rows(month)
+
+    def range_summary(self, start: datetime, end: datetime) -> tuple[float, int]:
+        """Return (total, receipt count) between two datetimes."""
+        return range_summary(self, start, end)
+
+    def rebuild_rollups(self) -> int:
+        """Recompute rollups from every stored receipt; returns the receipt count."""
+        receipts = self.query_receipts()
+        self.rollups.rebuild(receipts)
+        return len(receipts)
 
     def load_corrections(self) -> dict[str, str]:
         """Load item name corrections."""
-        return self._load_json(self.corrections_file)
+        return self.corrections.snapshot()
 
     def save_correction(self, raw_name: str, store: str, actual_name: str) -> None:
         """Save a correction mapping."""
-        corrections = self.load_corrections()
         key = f"{raw_name}|{store}"
-        corrections[key] = actual_name
-        self._save_json(self.corrections_file, corrections)
+        self.corrections.set(key, actual_name)
 
     def delete_correction(self, raw_name: str, store: str) -> bool:
         """Delete a correction mapping."""
-        corrections = self.load_corrections()
         key = f"{raw_name}|{store}"
-        if key in corrections:
-            del corrections[key]
-            self._save_json(self.corrections_file, corrections)
-            return True
-        return False
+        return self.corrections.delete(key)
@@ -0,0 +1,134 @@
+"""Benchmark OCR backends against the reference OCR text in data/test_output.
+
+For every data/test_output/<name>_ocr.txt with a matching image in
+data/receipts, each available backend (Tesseract if installed, Mistral if
+MISTRAL_API_KEY is set, and local-first when both are) is timed on the
+preprocessed image. Field recall is the share of the reference's prices,
+long numbers (SKUs, ABNs, dates) and words that appear in the backend's
+output.
+
+Usage: python tests/bench_ocr_backends.py [--min-lines 8]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Load environment variables
+load_dotenv()
+
+from bot.services.ocr_backends import LocalFirstOCRBackend, MistralOCRBackend, TesseractOCRBackend
+from bot.services.preprocess import preprocess_image
+
+
+FIELD_PATTERNS = {
+    "prices": re.compile(r"\d+\.\d{2}"),
+    "numbers": re.compile(r"\d{4,}"),
+    "words": re.compile(r"[A-Za-z]{3,}"),
+}
+
+
+def extract_fields(text: str) -> dict[str, Counter]:
+    """Count the prices, long numbers and words in OCR text."""
+    return {
+        field: Counter(match.upper() for match in pattern.findall(text))
+        for field, pattern in FIELD_PATTERNS.items()
+    }
+
+
+def field_recall(reference: str, candidate: str) -> dict[str, float]:
+    """Share of each reference field type found in the candidate text."""
+    expected = extract_fields(reference)
+    found = extract_fields(candidate)
+    return {
+        field: sum((expected[field] & found[field]).values()) / max(1, sum(expected[field].values()))
+        for field in FIELD_PATTERNS
+    }
+
+
+def find_image(stem: str) -> Path | None:
+    """Locate the receipt image a reference text was produced from."""
+    for path in Path("data/receipts").glob(f"{stem}.*"):
+        return path
+    return None
+
+
+async def main():
+    """Run every available backend over every reference receipt."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-lines", type=int, default=8)
+    args = parser.parse_args()
+
+    backends = []
+    tesseract = TesseractOCRBackend() if TesseractOCRBackend.available() else None
+    api_key = os.getenv("MISTRAL_API_KEY")
+    mistral = MistralOCRBackend(api_key, os.getenv("MISTRAL_OCR_MODEL", "mistral-ocr-latest")) if api_key else None
+
+    if tesseract:
+        backends.append(("tesseract", tesseract))
+    else:
+        print("ℹ️  tesseract not found on PATH, skipping local OCR")
+    if mistral:
+        backends.append(("mistral", mistral))
+    else:
+        print("ℹ️  MISTRAL_API_KEY not set, skipping Mistral OCR")
+    if tesseract and mistral:
+        backends.append(("local-first", LocalFirstOCRBackend(tesseract, mistral, min_lines=args.min_lines)))
+    if not backends:
+        print("❌ No OCR backend available")
+        return
+
+    references = sorted(Path("data/test_output").glob("*_ocr.txt"))
+    samples = []
+    for reference_path in references:
+        image_path = find_image(reference_path.name[: -len("_ocr.txt")])
+        if image_path:
+            image_bytes = preprocess_image(image_path.read_bytes())
+            samples.append((image_path.name, reference_path.read_text(encoding="utf-8"), image_bytes))
+    if not samples:
+        print("❌ No reference OCR text with a matching image in data/receipts")
+        return
+
+    print(f"\n{'Backend':<12} {'Image':<16} {'Latency':>8} {'Prices':>7} {'Numbers':>8} {'Words':>6}")
+    print(f"{'-'*12} {'-'*16} {'-'*8} {'-'*7} {'-'*8} {'-'*6}")
+
+    for name, backend in backends:
+        latencies = []
+        recalls = []
+        for image_name, reference, image_bytes in samples:
+            started = time.perf_counter()
+            try:
+                text = await backend.recognize(image_bytes)
+            except Exception as e:
+                print(f"{name:<12} {image_name:<16} ❌ {e}")
+                continue
+            latencies.append(time.perf_counter() - started)
+            recall = field_recall(reference, text)
+            recalls.append(recall)
+            print(
+                f"{name:<12} {image_name:<16} {latencies[-1]:>7.2f}s "
+                f"{recall['prices']:>7.0%} {recall['numbers']:>8.0%} {recall['words']:>6.0%}"
+            )
+
+        if recalls:
+            mean = {field: sum(r[field] for r in recalls) / len(recalls) for field in FIELD_PATTERNS}
+            print(
+                f"{name:<12} {'MEAN':<16} {sum(latencies) / len(latencies):>7.2f}s "
+                f"{mean['prices']:>7.0%} {mean['numbers']:>8.0%} {mean['words']:>6.0%}"
+            )
+        if isinstance(backend, LocalFirstOCRBackend):
+            print(f"{'':<12} local accepted {backend.local_accepted}, fell back {backend.fallbacks}")
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Compare extraction on full and pruned OCR text from data/test_output.
+
+For every data/test_output/<name>_ocr.txt the estimated prompt tokens are
+shown before and after pruning. When OPENROUTER_API_KEY is set, each text
+is also extracted both ways and the store, date, total and item prices are
+compared.
+
+Usage: python tests/bench_ocr_pruning.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Load environment variables
+load_dotenv()
+
+from bot.services.ai_extractor import AIExtractor
+from bot.services.ocr_pruning import prune_ocr_text
+from bot.services.scheduler import estimate_tokens
+
+
+def key_fields(data: dict) -> dict:
+    """Fields extraction must agree on for the pruned text to be equivalent."""
+    return {
+        "store": (data.get("store_name") or "").upper(),
+        "date": data.get("date"),
+        "total": data.get("total"),
+        "prices": sorted(item.get("price") for item in data.get("items", [])),
+    }
+
+
+async def main():
+    """Show token savings and, with an API key, extraction parity."""
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    model = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
+    if not api_key:
+        print("ℹ️  OPENROUTER_API_KEY not set, showing token counts only")
+
+    full_extractor = AIExtractor(api_key or "", model, prune=False)
+    pruned_extractor = AIExtractor(api_key or "", model, prune=True)
+
+    print(f"\n{'Receipt':<20} {'Tokens':>7} {'Pruned':>7} {'Saved':>6}  Parity")
+    print(f"{'-'*20} {'-'*7} {'-'*7} {'-'*6}  {'-'*6}")
+
+    totals = [0, 0]
+    for path in sorted(Path("data/test_output").glob("*_ocr.txt")):
+        text = path.read_text(encoding="utf-8")
+        before = estimate_tokens(full_extractor._build_extraction_prompt(text))
+        after = estimate_tokens(full_extractor._build_extraction_prompt(prune_ocr_text(text)))
+        totals[0] += before
+        totals[1] += after
+
+        parity = ""
+        if api_key:
+            full, pruned = await asyncio.gather(
+                full_extractor.extract_receipt_data(text),
+                pruned_extractor.extract_receipt_data(text),
+            )
+            differences = {
+                field: (value, key_fields(pruned)[field])
+                for field, value in key_fields(full).items()
+                if key_fields(pruned)[field] != value
+            }
+            parity = "✅" if not differences else f"❌ {differences}"
+
+        print(f"{path.name:<20} {before:>7} {after:>7} {1 - after / before:>6.0%}  {parity}")
+
+    print(f"{'TOTAL':<20} {totals[0]:>7} {totals[1]:>7} {1 - totals[1] / totals[0]:>6.0%}")
+    await full_extractor.close()
+    await pruned_extractor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
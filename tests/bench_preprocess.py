@@ -0,0 +1,97 @@
+"""Benchmark image preprocessing on the sample receipts in data/receipts.
+
+Reports upload payload size before and after preprocessing. When
+MISTRAL_API_KEY is set, each image is also sent through OCR both ways to
+measure the latency saved.
+
+Usage: python tests/bench_preprocess.py [--dpi 300]
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Load environment variables
+load_dotenv()
+
+from bot.services.preprocess import pillow_heif, preprocess_image
+
+
+async def time_ocr(client, model: str, image_bytes: bytes, mime_type: str) -> float:
+    """Return seconds taken by one OCR call."""
+    image_url = f"data:{mime_type};base64,{base64.standard_b64encode(image_bytes).decode('utf-8')}"
+    started = time.perf_counter()
+    await client.ocr.process_async(
+        model=model,
+        document={"type": "image_url", "image_url": image_url},
+    )
+    return time.perf_counter() - started
+
+
+async def main():
+    """Run the benchmark over every HEIC receipt."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    receipt_files = sorted(Path("data/receipts").glob("*.HEIC"))
+    if not receipt_files:
+        print("❌ No HEIC receipts found in data/receipts")
+        return
+    if not pillow_heif:
+        print("⚠️  pillow-heif is not installed; HEIC images cannot be decoded and pass through unchanged")
+
+    client = None
+    api_key = os.getenv("MISTRAL_API_KEY")
+    model = os.getenv("MISTRAL_OCR_MODEL", "mistral-ocr-latest")
+    if api_key:
+        from mistralai import Mistral
+        client = Mistral(api_key=api_key)
+    else:
+        print("ℹ️  MISTRAL_API_KEY not set, measuring payload size only")
+
+    print(f"\n{'Image':<16} {'Original':>10} {'Processed':>10} {'Saved':>7} {'Prep ms':>8} {'OCR s':>7} {'OCR s (prep)':>13}")
+    print(f"{'-'*16} {'-'*10} {'-'*10} {'-'*7} {'-'*8} {'-'*7} {'-'*13}")
+
+    total_original = total_processed = 0
+    ocr_saved = 0.0
+    for path in receipt_files:
+        original = path.read_bytes()
+        started = time.perf_counter()
+        processed = preprocess_image(original, target_dpi=args.dpi)
+        prep_ms = (time.perf_counter() - started) * 1000
+
+        total_original += len(original)
+        total_processed += len(processed)
+        saved = 1 - len(processed) / len(original)
+
+        ocr_columns = f"{'-':>7} {'-':>13}"
+        if client:
+            before = await time_ocr(client, model, original, "image/heic")
+            after = await time_ocr(client, model, processed, "image/jpeg")
+            ocr_saved += before - after - prep_ms / 1000
+            ocr_columns = f"{before:>7.2f} {after:>13.2f}"
+
+        print(
+            f"{path.name:<16} {len(original) / 1024:>8.0f}KB {len(processed) / 1024:>8.0f}KB "
+            f"{saved:>7.0%} {prep_ms:>8.0f} {ocr_columns}"
+        )
+
+    print(
+        f"\nTotal payload: {total_original / 1024 / 1024:.2f} MB -> {total_processed / 1024 / 1024:.2f} MB "
+        f"({1 - total_processed / total_original:.0%} smaller, before base64)"
+    )
+    if client:
+        print(f"OCR latency saved (net of preprocessing): {ocr_saved:.2f}s over {len(receipt_files)} images")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
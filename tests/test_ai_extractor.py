@@ -0,0 +1,279 @@
+"""Tests for the AI extractor's shared HTTP client."""
+
+import asyncio
+import json
+import re
+import pytest
+from bot.services import ai_extractor
+from bot.services.ai_extractor import AIExtractor
+
+
+async def start_openrouter_stub(connections: list):
+    """Serve canned chat completions over HTTP/1.1 keep-alive on localhost."""
+    body = json.dumps({
+        "choices": [{"message": {"content": json.dumps({"store_name": "ALDI", "total": 2.5})}}],
+        "usage": {"total_tokens": 100},
+    }).encode()
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while True:
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+
+    async def handle_safely(reader, writer):
+        try:
+            await handle(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle_safely, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_requests_reuse_one_connection(monkeypatch):
+    """Test that sequential extractions share a pooled connection and are timed."""
+    connections = []
+    server, port = await start_openrouter_stub(connections)
+    monkeypatch.setattr(ai_extractor, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(ai_extractor, "HTTP2_AVAILABLE", False)
+
+    extractor = AIExtractor(api_key="test")
+    try:
+        await extractor.start()
+        first = await extractor.extract_receipt_data("ALDI\nMILK 2.50")
+        first_timing = extractor.last_timing
+        await extractor.extract_receipt_data("ALDI\nBREAD 1.99")
+        second_timing = extractor.last_timing
+    finally:
+        await extractor.close()
+        server.close()
+
+    assert first == {"store_name": "ALDI", "total": 2.5}
+    assert len(connections) == 1
+    assert not first_timing.reused
+    assert second_timing.reused and second_timing.connect_ms == 0
+    assert second_timing.ttfb_ms is not None
+    assert second_timing.total_ms >= second_timing.ttfb_ms
+    assert second_timing.http_version == "HTTP/1.1"
+
+
+@pytest.mark.asyncio
+async def test_close_releases_client():
+    """Test that close is idempotent and extraction can restart the client."""
+    extractor = AIExtractor(api_key="test")
+    await extractor.start()
+    client = extractor._client
+    await extractor.start()
+    assert extractor._client is client
+
+    await extractor.close()
+    await extractor.close()
+    assert extractor._client is None and client.is_closed
+
+
+def test_fused_prompt_and_guesses():
+    """Test that fused mode asks for guesses and keeps only well-formed ones."""
+    plain = AIExtractor(api_key="test")
+    fused = AIExtractor(api_key="test", fused=True)
+    assert "guessed_name" not in plain._build_extraction_prompt("OCR")
+    assert "guessed_name" in fused._build_extraction_prompt("OCR")
+
+    receipt = fused.convert_to_receipt({
+        "store_name": "ALDI",
+        "total": 6.0,
+        "items": [
+            {"raw_name": "MLK", "price": 2.5, "guessed_name": " Milk ", "confidence": 1.4},
+            {"raw_name": "BRD", "price": 1.5, "guessed_name": "Bread", "confidence": "high"},
+            {"raw_name": "EGG", "price": 2.0, "guessed_name": "", "confidence": 0.8},
+        ],
+    }, "OCR")
+
+    assert [(item.guessed_name, item.confidence) for item in receipt.items] == [
+        ("Milk", 1.0), (None, None), (None, None),
+    ]
+
+
+async def start_sse_stub(content: str, chunk_size: int, delay: float):
+    """Stream a completion as OpenRouter-style SSE events, one chunk per `delay`."""
+
+    async def handle(reader, writer):
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = next(
+            int(line.split(b":")[1]) for line in headers.split(b"\r\n")
+            if line.lower().startswith(b"content-length:")
+        )
+        await reader.readexactly(length)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n"
+            b": OPENROUTER PROCESSING\n\n"
+        )
+        for start in range(0, len(content), chunk_size):
+            event = {"choices": [{"delta": {"content": content[start:start + chunk_size]}}]}
+            writer.write(f"data: {json.dumps(event)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(delay)
+        usage = {"choices": [], "usage": {"total_tokens": 250}}
+        writer.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode())
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_streamed_items_arrive_before_completion(monkeypatch):
+    """Test that streaming reports items long before the completion ends."""
+    data = {
+        "store_name": "ALDI",
+        "items": [{"raw_name": f"ITEM{i}", "price": 1.0 + i} for i in range(5)],
+        "total": 15.0,
+    }
+    content = json.dumps(data)
+    server, port = await start_sse_stub(content, chunk_size=12, delay=0.01)
+    monkeypatch.setattr(ai_extractor, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(ai_extractor, "HTTP2_AVAILABLE", False)
+
+    arrivals = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def on_item(index, item):
+        arrivals.append((index, item["raw_name"], loop.time() - started))
+
+    extractor = AIExtractor(api_key="test", prune=False)
+    try:
+        result = await extractor.extract_receipt_data("ALDI", on_item=on_item)
+    finally:
+        await extractor.close()
+        server.close()
+
+    assert result == data
+    assert [(index, name) for index, name, _ in arrivals] == [(i, f"ITEM{i}") for i in range(5)]
+    timing = extractor.last_timing
+    assert timing.first_item_ms is not None
+    assert timing.first_item_ms < timing.total_ms / 2
+
+
+@pytest.mark.asyncio
+async def test_extraction_cache(tmp_path):
+    """Test that equivalent OCR text is extracted once per model and prompt version."""
+    from bot.services.cache import DiskCache
+
+    cache = DiskCache(tmp_path, suffix=".json")
+    calls = []
+
+    async def complete(body):
+        calls.append(body)
+        return {"store_name": "ALDI", "items": [{"raw_name": "MILK", "price": 2.5}], "total": 2.5}, None
+
+    extractor = AIExtractor(api_key="test", cache=cache)
+    extractor._complete = complete
+
+    first = await extractor.extract_receipt_data("ALDI STORES\nMILK   2.50\n")
+    items = []
+
+    async def on_item(index, item):
+        items.append((index, item["raw_name"]))
+
+    second = await extractor.extract_receipt_data("  ALDI STORES\n\n MILK 2.50", on_item=on_item)
+
+    assert first == second
+    assert len(calls) == 1
+    assert items == [(0, "MILK")]
+
+    # A different prompt (fused mode) or model misses the cache
+    fused = AIExtractor(api_key="test", cache=cache, fused=True)
+    fused._complete = complete
+    other_model = AIExtractor(api_key="test", model="other/model", cache=cache)
+    other_model._complete = complete
+    assert fused.prompt_version != extractor.prompt_version
+    await fused.extract_receipt_data("ALDI STORES\nMILK 2.50")
+    await other_model.extract_receipt_data("ALDI STORES\nMILK 2.50")
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_extraction_cache_io_runs_off_the_event_loop(tmp_path):
+    """Test that cache reads and writes happen in worker threads."""
+    import threading
+    from bot.services.cache import DiskCache
+
+    class RecordingCache(DiskCache):
+        threads = []
+
+        def get(self, key):
+            self.threads.append(threading.current_thread())
+            return super().get(key)
+
+        def put(self, key, value):
+            self.threads.append(threading.current_thread())
+            super().put(key, value)
+
+    async def complete(body):
+        return {"store_name": "ALDI", "items": [], "total": 2.5}, None
+
+    extractor = AIExtractor(api_key="test", cache=RecordingCache(tmp_path, suffix=".json"))
+    extractor._complete = complete
+    await extractor.extract_receipt_data("ALDI STORES\nMILK 2.50")
+
+    assert len(RecordingCache.threads) == 2
+    assert threading.main_thread() not in RecordingCache.threads
+
+
+@pytest.mark.asyncio
+async def test_batch_extraction_packs_and_splits():
+    """Test that receipts share requests and ones missing from a response are retried."""
+    requests = []
+
+    async def complete(body):
+        prompt = body["messages"][0]["content"]
+        requests.append(prompt)
+        stores = re.findall(r"^(STORE\d)$", prompt, re.MULTILINE)
+        if "Receipt r1:" not in prompt:
+            return {"store_name": stores[0], "items": []}, None
+        # The model drops the last receipt of every batch
+        keys = re.findall(r"^Receipt (r\d+):$", prompt, re.MULTILINE)
+        return {key: {"store_name": store, "items": []} for key, store in zip(keys[:-1], stores)}, None
+
+    extractor = AIExtractor(api_key="test", prune=False, batch_size=3)
+    extractor._complete = complete
+
+    texts = [f"STORE{i}\nMILK 2.50" for i in range(5)]
+    results = await extractor.extract_batch(texts)
+
+    assert [result["store_name"] for result in results] == [f"STORE{i}" for i in range(5)]
+    # Batches of 3 and 2, then the receipt each one dropped on its own
+    assert len(requests) == 4
+    assert sum("Receipt r1:" in prompt for prompt in requests) == 2
+    assert requests[0].count("Extract the following") == 0
+    assert requests[0].count("- store_name:") == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_extraction_token_budget_and_errors():
+    """Test that the token budget limits a batch and failures are returned per receipt."""
+    extractor = AIExtractor(api_key="test", prune=False, batch_size=10, batch_tokens=1000)
+    overhead = ai_extractor.estimate_tokens(extractor._build_batch_prompt({}))
+    text = "x" * 4 * ((1000 - overhead) // 6)  # Costs a third of the budget, plus a little
+    assert extractor._plan_batches([0, 1, 2, 3], [text] * 4) == [[0, 1], [2, 3]]
+
+    async def complete(body):
+        if "Receipt r1:" in body["messages"][0]["content"]:
+            return "not an object", None
+        raise ai_extractor.ProviderError("openrouter", 401, "bad key")
+
+    extractor._complete = complete
+    results = await extractor.extract_batch(["A\n1.00", "B\n2.00"])
+    assert all(isinstance(result, ai_extractor.ProviderError) for result in results)
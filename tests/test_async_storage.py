@@ -0,0 +1,66 @@
+"""Tests for the async storage facade."""
+
+import asyncio
+import time
+import pytest
+from datetime import datetime
+from bot.async_storage import AsyncStorage
+from bot.storage import Storage
+from bot.models import Receipt, ReceiptItem
+
+
+def make_receipt(store: str, minute: int) -> Receipt:
+    """Build a one-item receipt."""
+    return Receipt(
+        filename="",
+        store=store,
+        datetime=datetime(2025, 12, 30, 18, minute),
+        raw_ocr_text="test text",
+        items=[ReceiptItem(raw_name="Item 1", price=5.99)],
+        total=5.99,
+    )
+
+
+@pytest.mark.asyncio
+async def test_round_trip_and_batched_load(tmp_path):
+    """Test that the facade mirrors Storage and batch loads keep order."""
+    storage = AsyncStorage(Storage(str(tmp_path)), max_workers=2, batch_size=3)
+
+    filenames = [await storage.save_receipt(make_receipt(f"Store {i}", i)) for i in range(7)]
+    assert await storage.list_receipts() == sorted(filenames)
+
+    loaded = await storage.load_receipts(filenames + ["missing.json"])
+    assert [r.store for r in loaded[:-1]] == [f"Store {i}" for i in range(7)]
+    assert loaded[-1] is None
+
+    assert await storage.monthly_summary("2025-12") == (41.93, 7, 7)
+    assert await storage.delete_receipt(filenames[0]) is True
+
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive(tmp_path):
+    """Test that slow storage calls do not block other coroutines."""
+
+    class SlowStorage(Storage):
+        def list_receipts(self):
+            time.sleep(0.3)
+            return super().list_receipts()
+
+    storage = AsyncStorage(SlowStorage(str(tmp_path)))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await storage.list_receipts()
+    task.cancel()
+
+    # A blocked loop would not have ticked at all during the 300 ms call
+    assert ticks >= 10
+    storage.close()
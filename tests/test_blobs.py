@@ -0,0 +1,142 @@
+"""Tests for the raw OCR text blob store."""
+
+import json
+import sqlite3
+import pytest
+from datetime import datetime
+from bot.blobs import BlobStore
+from bot.storage import Storage
+from bot.sqlite_storage import SQLiteStorage
+from bot.models import Receipt, ReceiptItem
+
+
+OCR_TEXT = "ALDI STORES\n399365 TradWmealBread750g 3.69 A\n" * 20
+
+
+def make_receipt() -> Receipt:
+    """Build a receipt carrying raw OCR text."""
+    return Receipt(
+        filename="",
+        store="Aldi",
+        datetime=datetime(2025, 12, 30, 18, 18),
+        raw_ocr_text=OCR_TEXT,
+        items=[ReceiptItem(raw_name="TradWmealBread750g", price=3.69)],
+        total=3.69,
+    )
+
+
+@pytest.mark.parametrize("compression", ["zstd", "gzip"])
+def test_put_and_get(tmp_path, compression):
+    """Test content addressing and compression round trip."""
+    blobs = BlobStore(tmp_path, compression=compression)
+
+    digest = blobs.put_text(OCR_TEXT)
+    assert blobs.put_text(OCR_TEXT) == digest
+    assert blobs.get_text(digest) == OCR_TEXT
+    assert blobs.get_text("0" * 64) is None
+
+    stored = list(tmp_path.rglob(f"{digest}*"))
+    assert len(stored) == 1
+    assert stored[0].stat().st_size < len(OCR_TEXT)
+
+
+def test_concurrent_puts_of_same_text(tmp_path):
+    """Test that threads storing the same text at once all succeed."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    blobs = BlobStore(tmp_path, compression="gzip")
+    text = OCR_TEXT * 500  # Slow enough to compress that the writers overlap
+    start = threading.Barrier(8)
+
+    def put(_):
+        start.wait()
+        return blobs.put_text(text)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        digests = set(pool.map(put, range(8)))
+
+    assert len(digests) == 1
+    assert blobs.get_text(digests.pop()) == text
+    assert not list(tmp_path.rglob("*.tmp"))
+
+@pytest.mark.parametrize("storage_class", [Storage, SQLiteStorage], ids=["json", "sqlite"])
+def test_receipts_load_without_ocr_text(tmp_path, storage_class):
+    """Test that receipts load without OCR text and fetch it lazily."""
+    storage = storage_class(str(tmp_path))
+    filename = storage.save_receipt(make_receipt())
+
+    loaded = storage.load_receipt(filename)
+    assert loaded.raw_ocr_text is None
+    assert loaded.raw_ocr_hash is not None
+    assert storage.load_ocr_text(loaded) == OCR_TEXT
+
+    # Re-saving a receipt loaded without its text keeps the reference
+    loaded.verified = True
+    storage.save_receipt(loaded)
+    assert storage.load_ocr_text(storage.load_receipt(filename)) == OCR_TEXT
+
+
+def test_json_file_has_no_inline_text(tmp_path):
+    """Test that receipt JSON files only carry the blob hash."""
+    storage = Storage(str(tmp_path))
+    filename = storage.save_receipt(make_receipt())
+
+    data = json.loads(storage.receipt_path(filename).read_text())
+    assert "raw_ocr_text" not in data
+    assert data["raw_ocr_hash"]
+
+
+def test_externalize_legacy_json(tmp_path):
+    """Test moving inline text from older receipt files into blobs."""
+    receipt = make_receipt()
+    receipt.filename = "2025-12-30_1818_aldi.json"
+    (tmp_path / "receipts").mkdir()
+    (tmp_path / "receipts" / receipt.filename).write_text(receipt.model_dump_json())
+
+    storage = Storage(str(tmp_path))
+
+    assert storage.load_ocr_text(storage.load_receipt(receipt.filename)) == OCR_TEXT
+    assert storage.externalize_ocr_text() == 1
+    assert storage.externalize_ocr_text() == 0
+
+    loaded = storage.load_receipt(receipt.filename)
+    assert loaded.raw_ocr_text is None
+    assert storage.load_ocr_text(loaded) == OCR_TEXT
+
+
+def test_sqlite_upgrades_pre_blob_schema(tmp_path):
+    """Test that databases from before the blob store are upgraded in place."""
+    conn = sqlite3.connect(tmp_path / "receipts.db")
+    conn.executescript("""
+        CREATE TABLE receipts (
+            id TEXT PRIMARY KEY, filename TEXT NOT NULL UNIQUE, store TEXT NOT NULL,
+            datetime TEXT NOT NULL, processed_at TEXT NOT NULL,
+            verified INTEGER NOT NULL DEFAULT 0, raw_ocr_text TEXT NOT NULL,
+            total REAL NOT NULL, subtotal REAL, tax REAL, discount_total REAL,
+            payment_method TEXT
+        );
+        CREATE TABLE items (
+            receipt_id TEXT NOT NULL REFERENCES receipts(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL, raw_name TEXT NOT NULL, quantity REAL NOT NULL,
+            unit TEXT NOT NULL, price REAL NOT NULL, discount REAL NOT NULL, sku TEXT,
+            category TEXT NOT NULL, language TEXT, guessed_name TEXT, confidence REAL,
+            confirmed_name TEXT, needs_review INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (receipt_id, position)
+        );
+        INSERT INTO receipts VALUES ('r1', '2025-12-30_1818_aldi.json', 'Aldi',
+            '2025-12-30T18:18:00', '2025-12-30T18:20:00', 0, 'old text', 3.69,
+            NULL, NULL, NULL, NULL);
+        INSERT INTO items VALUES ('r1', 0, 'Bread', 1, 'ea', 3.69, 0, NULL, 'Bakery',
+            'en', NULL, NULL, NULL, 0);
+    """)
+    conn.close()
+
+    storage = SQLiteStorage(str(tmp_path))
+    loaded = storage.load_receipt("2025-12-30_1818_aldi.json")
+    assert [item.raw_name for item in loaded.items] == ["Bread"]
+    assert storage.load_ocr_text(loaded) == "old text"
+
+    assert storage.externalize_ocr_text() == 1
+    assert storage.load_ocr_text(storage.load_receipt(loaded.filename)) == "old text"
+    assert storage.monthly_summary("2025-12") == (3.69, 1, 1)
@@ -0,0 +1,48 @@
+"""Tests for the disk-backed text cache."""
+
+import pytest
+from bot.services.cache import DiskCache
+
+
+def test_get_put_and_stats(tmp_path):
+    """Test basic caching and hit/miss accounting."""
+    cache = DiskCache(tmp_path)
+    key = DiskCache.make_key("mistral-ocr-latest", b"image bytes")
+
+    assert cache.get(key) is None
+    cache.put(key, "# ALDI STORES")
+    assert cache.get(key) == "# ALDI STORES"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_key_depends_on_every_part(tmp_path):
+    """Test that model name and content both feed the key."""
+    assert DiskCache.make_key("model-a", b"img") != DiskCache.make_key("model-b", b"img")
+    assert DiskCache.make_key("model-a", b"img") != DiskCache.make_key("model-a", b"img2")
+    assert DiskCache.make_key("ab", b"c") != DiskCache.make_key("a", b"bc")
+
+
+def test_lru_eviction_by_size(tmp_path):
+    """Test that the least recently used entries are evicted past the size limit."""
+    cache = DiskCache(tmp_path, max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+    assert cache.stats()["bytes"] == 20
+
+
+def test_persists_across_instances(tmp_path):
+    """Test that entries and sizes are re-indexed on startup."""
+    DiskCache(tmp_path).put("a", "cached text")
+
+    cache = DiskCache(tmp_path)
+    assert cache.stats()["bytes"] == len("cached text")
+    assert cache.get("a") == "cached text"
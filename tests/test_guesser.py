@@ -1,7 +1,12 @@
 """Tests for item guesser."""
 
+import asyncio
+import json
+import time
 import pytest
+from types import SimpleNamespace
 from bot.services.guesser import ItemGuesser
+from bot.services.resilience import ResiliencePolicy
 from bot.models import ReceiptItem
 
 
@@ -54,3 +59,102 @@ async def test_guess_batch_all_corrections():
     assert results[0].confidence == 1.0
     assert results[1].product_name == "Boneless Chicken Breast"
     assert results[1].confidence == 1.0
+
+
+class SlowChat:
+    """OpenRouter chat stand-in whose completions take `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+
+    async def send_async(self, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        content = json.dumps({"GV MLK": {"product_name": "Great Value Milk", "confidence": 0.9}})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None
+        )
+
+
+def slow_guesser(delay: float, **kwargs) -> tuple[ItemGuesser, SlowChat]:
+    """A guesser whose API calls go to a SlowChat."""
+    guesser = ItemGuesser(api_key="test", model="openai/gpt-4o-mini", **kwargs)
+    chat = SlowChat(delay)
+    guesser.client = SimpleNamespace(chat=chat)
+    return guesser, chat
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_slow_guess():
+    """Test that other tasks keep running while a guess waits on the API."""
+    guesser, _ = slow_guesser(0.5)
+    gaps = []
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(heartbeat())
+    results = await guesser.guess_batch([ReceiptItem(raw_name="GV MLK", price=3.49)], "Walmart")
+    ticker.cancel()
+
+    assert results[0].product_name == "Great Value Milk"
+    assert len(gaps) > 20
+    assert max(gaps) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_guess_concurrency_limit_and_timeout():
+    """Test that requests are capped in flight and a stalled one gives up."""
+    guesser, chat = slow_guesser(0.1, max_concurrency=2)
+    items = [ReceiptItem(raw_name="GV MLK", price=3.49)]
+    await asyncio.gather(*(guesser.guess_batch(items, "Walmart") for _ in range(5)))
+    assert chat.peak == 2
+
+    stalled, _ = slow_guesser(
+        10.0, timeout=0.1, resilience=ResiliencePolicy("openrouter", max_attempts=2, base_delay=0.01)
+    )
+    started = time.perf_counter()
+    results = await stalled.guess_batch(items, "Walmart")
+    assert time.perf_counter() - started < 1.0
+    # Flagged for review rather than failing the receipt
+    assert results[0].product_name == "GV MLK"
+    assert results[0].confidence == 0.0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_wait_does_not_hold_a_slot():
+    """Test that a request waiting on the rate limiter leaves its slot to others."""
+    released = asyncio.Event()
+
+    class Scheduler:
+        calls = 0
+
+        async def acquire(self, provider, tokens=0):
+            # The first request is rate-limited until released
+            Scheduler.calls += 1
+            if Scheduler.calls == 1:
+                await released.wait()
+
+        def settle(self, provider, estimated, actual):
+            pass
+
+    guesser, chat = slow_guesser(0.01, max_concurrency=1, scheduler=Scheduler())
+    items = [ReceiptItem(raw_name="GV MLK", price=3.49)]
+    waiting = asyncio.create_task(guesser.guess_batch(items, "Walmart"))
+    await asyncio.sleep(0.01)
+
+    results = await asyncio.wait_for(guesser.guess_batch(items, "Walmart"), 1.0)
+    assert results[0].product_name == "Great Value Milk"
+    released.set()
+    assert (await waiting)[0].product_name == "Great Value Milk"
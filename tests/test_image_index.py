@@ -0,0 +1,101 @@
+"""Tests for perceptual hashing and the duplicate photo index."""
+
+import io
+import random
+import time
+import pytest
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageOps
+from bot.image_index import HammingIndex, ImageHashIndex, dhash, hamming
+from bot.services.preprocess import pillow_heif
+
+
+def make_receipt_photo() -> Image.Image:
+    """A white receipt with text lines on a dark background."""
+    rng = random.Random(0)
+    image = Image.new("L", (1200, 1600), 60)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((300, 50, 900, 1550), fill=245)
+    for y in range(100, 1500, 35):
+        draw.rectangle((330, y, 330 + rng.randint(80, 540), y + 15), fill=20)
+    return image
+
+
+def encode(image: Image.Image, quality: int = 90) -> bytes:
+    """JPEG-encode an image."""
+    output = io.BytesIO()
+    image.convert("RGB").save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def test_dhash_matches_copies():
+    """Test that re-encoded, resized and shifted copies hash close together."""
+    photo = make_receipt_photo()
+    original = dhash(encode(photo))
+
+    assert hamming(original, dhash(encode(photo.resize((600, 800)), quality=60))) <= 4
+    assert hamming(original, dhash(encode(photo.crop((20, 30, 1200, 1600))))) <= 10
+
+
+@pytest.mark.skipif(pillow_heif is None, reason="pillow-heif not installed")
+def test_dhash_separates_sample_receipts():
+    """Test on the sample photos: copies match, different receipts do not."""
+    photos = [
+        ImageOps.exif_transpose(Image.open(path))
+        for path in sorted(Path("data/receipts").glob("*.HEIC"))
+    ]
+    hashes = [dhash(encode(photo)) for photo in photos]
+
+    for photo, photo_hash in zip(photos, hashes):
+        width, height = photo.size
+        smaller = photo.resize((width // 3, height // 3))
+        assert hamming(photo_hash, dhash(encode(smaller, quality=70))) <= 4
+
+    for i, first in enumerate(hashes):
+        for second in hashes[i + 1:]:
+            assert hamming(first, second) > 10
+
+
+def test_hamming_index_matches_brute_force():
+    """Test that multi-index search finds exactly the hashes within the radius."""
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(5000)]
+    index = HammingIndex(max_distance=10)
+    for i, value in enumerate(hashes):
+        index.add(value, i)
+
+    for _ in range(50):
+        base = hashes[rng.randrange(len(hashes))]
+        query = base ^ sum(1 << bit for bit in rng.sample(range(64), rng.randint(0, 14)))
+        expected = sorted(i for i, value in enumerate(hashes) if hamming(value, query) <= 10)
+        assert sorted(value for _, value in index.search(query)) == expected
+
+
+def test_lookup_is_sub_millisecond():
+    """Test lookup latency with 20k indexed photos."""
+    rng = random.Random(1)
+    index = HammingIndex(max_distance=10)
+    for i in range(20000):
+        index.add(rng.getrandbits(64), i)
+
+    queries = [rng.getrandbits(64) for _ in range(200)]
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query)
+    assert (time.perf_counter() - started) / len(queries) < 0.001
+
+
+def test_index_persists_and_forgets_removed(tmp_path):
+    """Test journal persistence and removal."""
+    path = tmp_path / "image_hashes.jsonl"
+    index = ImageHashIndex(path)
+    index.add(0xFFFF0000FFFF0000, "a.json")
+    index.add(0x0123456789ABCDEF, "b.json")
+    index.remove("b.json")
+    index.close()
+
+    reopened = ImageHashIndex(path)
+    assert len(reopened) == 1
+    # Three bits away from a.json
+    assert reopened.find(0xFFFF0000FFFF0007) == ("a.json", 3)
+    assert reopened.find(0x0123456789ABCDEF) is None
@@ -0,0 +1,114 @@
+"""Tests for the append-only key/value journal."""
+
+import json
+import pytest
+from bot.journal import KeyedJournal
+from bot.storage import Storage
+
+
+def test_replay_after_reopen(tmp_path):
+    """Test that state survives closing and reopening the journal."""
+    path = tmp_path / "corrections.jsonl"
+    journal = KeyedJournal(path)
+    journal.set("GV MLK|Walmart", "Great Value Milk")
+    journal.set("BNS CHKN|Walmart", "Boneless Chicken")
+    assert journal.delete("BNS CHKN|Walmart") is True
+    assert journal.delete("missing") is False
+    journal.close()
+
+    reopened = KeyedJournal(path)
+    assert reopened.snapshot() == {"GV MLK|Walmart": "Great Value Milk"}
+
+
+def test_torn_final_record_is_skipped(tmp_path):
+    """Test recovery from a crash in the middle of an append."""
+    path = tmp_path / "corrections.jsonl"
+    journal = KeyedJournal(path)
+    journal.set("a", "1")
+    journal.close()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "set", "key": "b", "val')
+
+    assert KeyedJournal(path).snapshot() == {"a": "1"}
+
+
+def test_compaction(tmp_path):
+    """Test that compaction rewrites the log to one record per key."""
+    path = tmp_path / "corrections.jsonl"
+    journal = KeyedJournal(path, compact_threshold=10**6)
+    for i in range(20):
+        journal.set("key", str(i))
+    assert len(path.read_text().splitlines()) == 20
+
+    journal.compact()
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [{"op": "set", "key": "key", "value": "19"}]
+
+    # Appends continue to the compacted file
+    journal.set("other", "x")
+    journal.close()
+    assert KeyedJournal(path).snapshot() == {"key": "19", "other": "x"}
+
+
+def test_legacy_corrections_import(tmp_path):
+    """Test one-time import of the old corrections.json file."""
+    (tmp_path / "corrections.json").write_text(json.dumps({"GV MLK|Walmart": "Great Value Milk"}))
+
+    storage = Storage(str(tmp_path))
+    assert storage.load_corrections() == {"GV MLK|Walmart": "Great Value Milk"}
+
+    storage.delete_correction("GV MLK", "Walmart")
+    storage.corrections.close()
+
+    # The old file is not imported again once the journal exists
+    assert Storage(str(tmp_path)).load_corrections() == {}
+
+
+def test_write_after_torn_record_survives_reopen(tmp_path):
+    """Test that a write made after recovering from a torn tail is not lost."""
+    path = tmp_path / "corrections.jsonl"
+    journal = KeyedJournal(path)
+    journal.set("a", "1")
+    journal.close()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "set", "key": "b", "val')
+
+    recovered = KeyedJournal(path)
+    recovered.set("c", "3")
+    recovered.close()
+
+    assert KeyedJournal(path).snapshot() == {"a": "1", "c": "3"}
+
+
+def test_unterminated_complete_record_is_kept(tmp_path):
+    """Test that a complete final record missing its newline is kept and terminated."""
+    path = tmp_path / "corrections.jsonl"
+    path.write_text('{"op": "set", "key": "a", "value": "1"}')
+
+    journal = KeyedJournal(path)
+    journal.set("b", "2")
+    journal.close()
+
+    assert KeyedJournal(path).snapshot() == {"a": "1", "b": "2"}
+
+
+def test_interrupted_legacy_import_is_retried(tmp_path):
+    """Test that an empty journal left by an interrupted import does not hide the old file."""
+    (tmp_path / "corrections.json").write_text(json.dumps({"GV MLK|Walmart": "Great Value Milk"}))
+    (tmp_path / "corrections.jsonl").touch()
+
+    storage = Storage(str(tmp_path))
+    assert storage.load_corrections() == {"GV MLK|Walmart": "Great Value Milk"}
+
+
+def test_create_is_atomic(tmp_path):
+    """Test that create() writes the initial contents before the file appears."""
+    path = tmp_path / "manifest.jsonl"
+    journal = KeyedJournal.create(path, {"a": 1, "b": 2})
+    journal.set("c", 3)
+    journal.close()
+
+    assert KeyedJournal(path).snapshot() == {"a": 1, "b": 2, "c": 3}
+    assert not path.with_name(path.name + ".tmp").exists()
@@ -16,7 +16,7 @@ async def test_ocr_service_initialization():
 
     assert service.api_key == "test_key"
     assert service.model == "mistral-ocr-latest"
-    assert service.client is not None
+    assert service.backend.client is not None
 
     await service.close()
 
@@ -133,3 +133,61 @@ async def test_ocr_with_mock_receipt():
     assert isinstance(img_bytes, bytes)
 
     await service.close()
+
+
+@pytest.mark.asyncio
+async def test_ocr_cache_skips_api_call(tmp_path):
+    """Test that re-uploading the same image is served from the OCR cache."""
+    from types import SimpleNamespace
+    from bot.services.cache import DiskCache
+
+    calls = []
+
+    async def fake_process(model, document):
+        calls.append(model)
+        return SimpleNamespace(pages=[SimpleNamespace(markdown="ALDI STORES")])
+
+    service = OCRService(api_key="test_key", cache=DiskCache(tmp_path))
+    service.backend.client = SimpleNamespace(ocr=SimpleNamespace(process_async=fake_process))
+
+    image_bytes = b"\xff\xd8\xff" + b"receipt photo"
+    assert await service.process_image(image_bytes) == "ALDI STORES"
+    assert await service.process_image(image_bytes) == "ALDI STORES"
+    assert len(calls) == 1
+
+    # A different image still goes to the API
+    await service.process_image(image_bytes + b"!")
+    assert len(calls) == 2
+    assert service.cache.stats()["hits"] == 1
+
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_ocr_requests_run_concurrently_within_limit():
+    """Test that OCR calls overlap up to max_concurrency and queue beyond it."""
+    import asyncio
+    import time
+    from types import SimpleNamespace
+
+    peak_in_flight = 0
+
+    async def slow_process(model, document):
+        nonlocal peak_in_flight
+        peak_in_flight = max(peak_in_flight, service.slots.in_flight)
+        await asyncio.sleep(0.1)
+        return SimpleNamespace(pages=[SimpleNamespace(markdown="text")])
+
+    service = OCRService(api_key="test_key", max_concurrency=2)
+    service.backend.client = SimpleNamespace(ocr=SimpleNamespace(process_async=slow_process))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(service.process_image(bytes([i])) for i in range(4)))
+    elapsed = time.perf_counter() - started
+
+    # Four 100 ms calls, two at a time: about 200 ms rather than 400 ms
+    assert peak_in_flight == 2
+    assert elapsed < 0.35
+    assert service.stats()["peak_queued"] == 2
+    assert service.stats()["completed"] == 4
+    assert service.stats()["in_flight"] == 0
@@ -0,0 +1,155 @@
+"""Tests for OCR backends and the local-first selection policy."""
+
+import io
+import time
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from bot.services.ocr import OCRService
+from bot.services.ocr_backends import (
+    LocalFirstOCRBackend,
+    MistralOCRBackend,
+    TesseractOCRBackend,
+    create_ocr_backend,
+)
+
+
+class FakeBackend:
+    """Backend returning fixed text, or raising when text is None."""
+
+    def __init__(self, name: str, text):
+        self.name = name
+        self.text = text
+        self.calls = 0
+
+    async def recognize(self, image_bytes: bytes, slots=None) -> str:
+        self.calls += 1
+        if self.text is None:
+            raise Exception(f"{self.name} unavailable")
+        return self.text
+
+    async def close(self) -> None:
+        pass
+
+
+RECEIPT_TEXT = "\n".join(f"ITEM {i} {i}.99" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_local_first_accepts_complete_local_text():
+    """Test that local output with enough lines skips the remote call."""
+    local, remote = FakeBackend("local", RECEIPT_TEXT), FakeBackend("remote", "REMOTE")
+    backend = LocalFirstOCRBackend(local, remote, min_lines=8)
+
+    assert await backend.recognize(b"image") == RECEIPT_TEXT
+    assert remote.calls == 0
+    assert backend.local_accepted == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("local_text", ["ALDI\n\n\nTOTAL 3.69\n", None])
+async def test_local_first_falls_back_to_remote(local_text):
+    """Test fallback when local output is too short or the local engine fails."""
+    local, remote = FakeBackend("local", local_text), FakeBackend("remote", "REMOTE")
+    backend = LocalFirstOCRBackend(local, remote, min_lines=8)
+
+    assert await backend.recognize(b"image") == "REMOTE"
+    assert backend.fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_service_uses_injected_backend_and_caches_by_backend(tmp_path):
+    """Test that OCRService runs the given backend and keys its cache on the backend name."""
+    from bot.services.cache import DiskCache
+
+    cache = DiskCache(tmp_path)
+    first = FakeBackend("engine-a", "A")
+    service = OCRService(api_key="test_key", cache=cache, backend=first)
+    assert await service.process_image(b"image") == "A"
+
+    # Same image through a different engine is not served from the cache
+    second = FakeBackend("engine-b", "B")
+    service = OCRService(api_key="test_key", cache=cache, backend=second)
+    assert await service.process_image(b"image") == "B"
+    assert await service.process_image(b"image") == "B"
+    assert (first.calls, second.calls) == (1, 1)
+
+
+def test_create_ocr_backend():
+    """Test backend construction by name."""
+    assert isinstance(create_ocr_backend("mistral", "key"), MistralOCRBackend)
+    assert isinstance(create_ocr_backend("tesseract", "key"), TesseractOCRBackend)
+
+    backend = create_ocr_backend("local-first", "key", min_lines=5)
+    assert isinstance(backend, LocalFirstOCRBackend)
+    assert backend.min_lines == 5
+    assert backend.name == "tesseract-eng-psm4+mistral-ocr-latest"
+
+    with pytest.raises(ValueError):
+        create_ocr_backend("unknown", "key")
+
+
+@pytest.mark.asyncio
+async def test_missing_tesseract_binary():
+    """Test that a missing executable surfaces as a clear error."""
+    backend = TesseractOCRBackend(command="tesseract-does-not-exist")
+    with pytest.raises(Exception, match="not installed"):
+        await backend.recognize(b"image")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_wait_does_not_hold_an_ocr_slot():
+    """Test that a Mistral request waiting on the rate limiter leaves its slot to others."""
+    import asyncio
+    from types import SimpleNamespace
+
+    released = asyncio.Event()
+
+    class Scheduler:
+        calls = 0
+
+        async def acquire(self, provider, tokens=0):
+            # The first request is rate-limited until released
+            Scheduler.calls += 1
+            if Scheduler.calls == 1:
+                await released.wait()
+
+    async def process(model, document):
+        return SimpleNamespace(pages=[SimpleNamespace(markdown="text")])
+
+    backend = MistralOCRBackend("test_key", scheduler=Scheduler())
+    backend.client = SimpleNamespace(ocr=SimpleNamespace(process_async=process))
+    service = OCRService(api_key="test_key", max_concurrency=1, preprocess=False, backend=backend)
+
+    waiting = asyncio.create_task(service.process_image(b"first"))
+    await asyncio.sleep(0.01)
+    assert await asyncio.wait_for(service.process_image(b"second"), 1.0) == "text"
+    released.set()
+    assert await waiting == "text"
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hung_tesseract_is_killed(tmp_path):
+    """Test that a tesseract run past the timeout is killed and reported."""
+    command = tmp_path / "tesseract"
+    command.write_text("#!/bin/sh\nexec sleep 10\n")
+    command.chmod(0o755)
+    backend = TesseractOCRBackend(command=str(command), timeout=0.2)
+
+    started = time.perf_counter()
+    with pytest.raises(Exception, match="timed out"):
+        await backend.recognize(b"image")
+    assert time.perf_counter() - started < 2.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not TesseractOCRBackend.available(), reason="tesseract not installed")
+async def test_tesseract_reads_rendered_text():
+    """Test local OCR on a rendered receipt line."""
+    image = Image.new("L", (900, 120), 255)
+    ImageDraw.Draw(image).text((20, 30), "TOTAL 24.05", fill=0, font=ImageFont.load_default(size=48))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+
+    text = await TesseractOCRBackend().recognize(output.getvalue())
+    assert "24.05" in text
@@ -0,0 +1,102 @@
+"""Tests for OCR text pruning before extraction."""
+
+import re
+from pathlib import Path
+import pytest
+from bot.services.ocr_pruning import prune_ocr_text
+from bot.services.scheduler import estimate_tokens
+from bot.services.templates import TemplateExtractor
+
+
+SAMPLES = Path(__file__).parent.parent / "data" / "test_output"
+
+# Lines extraction needs from each sample: store, date, items and totals
+REQUIRED = {
+    "IMG_4006_ocr.txt": [
+        "ALDI STORES", "399365 TradWmealBread750g 3.69 A", "494093 YogMngBlood0rg700g 4.89 A",
+        "Total (INCL GST) $ 24.05", "Card Sales $ 24.05", "A 00.0% Net 24.05 GST 0.00",
+        "*2380 G541/009/805 30.12.25 18:18",
+    ],
+    "IMG_4008_ocr.txt": [
+        "# BUNNINGS warehouse", "RYDALMERE", "Fri 02/01/2026 03:48:51 PM",
+        "3017618 INSECTICIDE GARDEN RICHURO", "1L BEAT A BUG RTU CB80010 $14.03",
+        "Total $14.03", "GST INCLUDED IN THE TOTAL $1.28", "EFT $14.03",
+    ],
+    "IMG_4073_ocr.txt": [
+        "IGA MEADOWBANK", "03/01/2026 11:25am Saturday", "LACASA FRMG MASCARPONE 250GM $5.67",
+        "Total (1 item) $5.67", "EFTPOS $5.67",
+    ],
+    "IMG_4108_ocr.txt": [
+        "MEAT MASTER", "Date: 04/01/2026", "Pork Neck", "4.200kg NET X $13.99/kg = $58.76",
+        "Pork American Ribs", "1.130kg NET X $21.99/kg = $24.85", "SUB TOTAL: $83.61",
+        "ROUNDING: -0.01", "TOTAL: $83.60", "CASH: $83.60",
+    ],
+}
+
+
+@pytest.mark.parametrize("name", sorted(REQUIRED))
+def test_samples_keep_receipt_content(name):
+    """Test that pruning keeps every line extraction needs and cuts the rest."""
+    text = (SAMPLES / name).read_text()
+    pruned = prune_ocr_text(text)
+
+    lines = pruned.splitlines()
+    for line in REQUIRED[name]:
+        assert line in lines
+    assert estimate_tokens(pruned) < 0.7 * estimate_tokens(text)
+
+
+def test_boilerplate_removed():
+    """Test that card slips, contact lines and marketing are dropped."""
+    pruned = "\n".join(prune_ocr_text((SAMPLES / name).read_text()) for name in REQUIRED)
+
+    for fragment in ["ABN", "ONEPASS", "APPROVED", "ARQC", "TERMINAL ID", "Ph:", "Wechat", "img-0"]:
+        assert fragment not in pruned
+    assert not re.search(r"\n\n\n", pruned)
+
+
+def test_template_parity():
+    """Test that the ALDI template reads the same receipt from pruned text."""
+    text = (SAMPLES / "IMG_4006_ocr.txt").read_text()
+
+    full = TemplateExtractor().extract(text)
+    pruned = TemplateExtractor().extract(prune_ocr_text(text))
+
+    assert full is not None and pruned is not None
+    assert full.model_dump(exclude={"id", "processed_at", "raw_ocr_text"}) == pruned.model_dump(
+        exclude={"id", "processed_at", "raw_ocr_text"}
+    )
+
+
+def test_repeated_items_kept():
+    """Test that only repeated lines without a price are de-duplicated."""
+    text = "SHOP\nSHOP\nMILK  2L   2.50\nMILK  2L   2.50\nTotal 5.00\nThanks\nthanks"
+    assert prune_ocr_text(text).splitlines() == [
+        "SHOP", "MILK 2L 2.50", "MILK 2L 2.50", "Total 5.00", "Thanks",
+    ]
+
+
+def test_repeated_multi_line_items_kept():
+    """Test that name and SKU lines of a repeated item stay with each price line."""
+    text = (
+        "# BUNNINGS warehouse\n# BUNNINGS warehouse\n"
+        "3017618 INSECTICIDE GARDEN RICHURO\n1 @ $12.98 12.98\n"
+        "3017618 INSECTICIDE GARDEN RICHURO\n1 @ $12.98 12.98\n"
+        "Pork Neck\n1.000kg NET X $13.99/kg = $13.99\n"
+        "Pork Neck\n1.000kg NET X $13.99/kg = $13.99\n"
+        "Total $53.94\nEFT $53.94\nEFT $53.94"
+    )
+    assert prune_ocr_text(text).splitlines() == [
+        "# BUNNINGS warehouse",
+        "3017618 INSECTICIDE GARDEN RICHURO", "1 @ $12.98 12.98",
+        "3017618 INSECTICIDE GARDEN RICHURO", "1 @ $12.98 12.98",
+        "Pork Neck", "1.000kg NET X $13.99/kg = $13.99",
+        "Pork Neck", "1.000kg NET X $13.99/kg = $13.99",
+        "Total $53.94", "EFT $53.94", "EFT $53.94",
+    ]
+
+
+def test_footer_only_after_total():
+    """Test that a footer phrase above the totals does not truncate the receipt."""
+    text = "THANK YOU FOR VISITING\nBREAD 3.00\nTotal 3.00\nThank you\nSURVEY"
+    assert prune_ocr_text(text).splitlines() == ["THANK YOU FOR VISITING", "BREAD 3.00", "Total 3.00"]
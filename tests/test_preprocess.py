@@ -0,0 +1,65 @@
+"""Tests for receipt image preprocessing."""
+
+import io
+from PIL import Image, ImageDraw
+from bot.services.preprocess import find_receipt_columns, preprocess_image
+
+
+def make_photo(orientation: int = 1) -> bytes:
+    """A dark 3000x2000 'table' with a white receipt strip holding some text."""
+    image = Image.new("RGB", (3000, 2000), (60, 50, 40))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((1000, 200, 1900, 1800), fill=(250, 250, 245))
+    for y in range(300, 1700, 60):
+        draw.rectangle((1050, y, 1800, y + 20), fill=(20, 20, 20))
+
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+def test_find_receipt_columns():
+    """Test that the bright receipt strip is located within a few pixels."""
+    image = Image.open(io.BytesIO(make_photo())).convert("L")
+    left, right = find_receipt_columns(image)
+    assert 900 < left <= 1000
+    assert 1900 <= right < 2000
+
+
+def test_full_frame_receipt_is_not_cropped():
+    """Test that a receipt filling the frame width is left alone."""
+    image = Image.new("L", (1000, 2000), 250)
+    assert find_receipt_columns(image) is None
+
+
+def test_preprocess_shrinks_and_crops():
+    """Test grayscale JPEG output, cropped to the receipt and downsampled."""
+    original = make_photo()
+    processed = preprocess_image(original, target_dpi=200)
+
+    assert len(processed) < len(original)
+    image = Image.open(io.BytesIO(processed))
+    assert image.format == "JPEG"
+    assert image.mode == "L"
+    # 80 mm at 200 DPI is 629 px; the crop keeps the full 2000 px height
+    assert image.width == 629
+    assert 1100 < image.height < 1400
+
+
+def test_preprocess_applies_exif_rotation():
+    """Test that a landscape-stored photo tagged as rotated 90 degrees comes out upright."""
+    image = Image.new("L", (3000, 2000), 250)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    output = io.BytesIO()
+    image.save(output, format="JPEG", exif=exif)
+
+    processed = Image.open(io.BytesIO(preprocess_image(output.getvalue(), target_dpi=200)))
+    assert processed.size == (629, 944)
+
+
+def test_undecodable_bytes_pass_through():
+    """Test that bytes Pillow cannot decode are uploaded unchanged."""
+    assert preprocess_image(b"not an image") == b"not an image"
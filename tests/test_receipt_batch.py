@@ -0,0 +1,357 @@
+"""Tests for concurrent batch receipt processing."""
+
+import asyncio
+import time
+import discord
+import pytest
+from types import SimpleNamespace
+from discord.ext import commands
+from bot.async_storage import AsyncStorage
+from bot.cogs.receipt import ReceiptCog, StreamingItemTable
+from bot.models import GuessResult
+from bot.services.ai_extractor import AIExtractor
+from bot.services.guesser import ItemGuesser
+from bot.image_index import DuplicateReceiptError, ImageHashIndex
+from bot.services.templates import TemplateExtractor
+from bot.storage import Storage
+
+
+class FakeOCR:
+    """OCR stand-in that takes 100 ms per image."""
+
+    async def prepare(self, image_bytes: bytes) -> bytes:
+        return image_bytes
+
+    async def process_image(self, image_bytes: bytes, prepared: bool = False) -> str:
+        await asyncio.sleep(0.1)
+        if image_bytes == b"bad":
+            raise Exception("OCR API error: unreadable")
+        return "ALDI STORES\nMILK 2.50"
+
+
+class FakeExtractor:
+    """Extraction stand-in that takes 100 ms per request."""
+
+    convert_to_receipt = AIExtractor.convert_to_receipt
+
+    def __init__(self):
+        self.batches = []
+
+    async def extract_batch(self, ocr_texts):
+        self.batches.append(len(ocr_texts))
+        await asyncio.sleep(0.1)
+        return [self._extract(ocr_text) for ocr_text in ocr_texts]
+
+    async def extract_receipt_data(self, ocr_text: str, on_item=None) -> dict:
+        await asyncio.sleep(0.1)
+        return self._extract(ocr_text)
+
+    @staticmethod
+    def _extract(ocr_text: str) -> dict:
+        name = ocr_text.splitlines()[1].split()[0]
+        return {
+            "store_name": "ALDI",
+            "date": "2025-12-30",
+            "time": "18:18",
+            "total": 2.50,
+            "items": [{"raw_name": name, "price": 2.50}],
+        }
+
+
+class FakeGuesser:
+    """Guesser stand-in that takes 100 ms per receipt."""
+
+    def update_corrections(self, corrections):
+        pass
+
+    def correction(self, raw_name, store):
+        return None
+
+    async def guess_batch(self, items, store):
+        await asyncio.sleep(0.1)
+        return [GuessResult(product_name=item.raw_name.title(), confidence=0.9) for item in items]
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_receipts_concurrently(tmp_path):
+    """Test that a batch takes about as long as one receipt and reports failures."""
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    storage = AsyncStorage(Storage(str(tmp_path)))
+    extractor = FakeExtractor()
+    cog = ReceiptCog(
+        bot, FakeOCR(), storage, FakeGuesser(), extractor,
+        SimpleNamespace(confidence_threshold=0.7),
+    )
+
+    sent = []
+
+    async def send(content=None, embed=None):
+        sent.append(embed or content)
+
+    interaction = SimpleNamespace(guild_id=1, followup=SimpleNamespace(send=send))
+
+    def attachment(name: str, data: bytes):
+        async def read():
+            return data
+        return SimpleNamespace(filename=name, read=read)
+
+    images = [attachment(f"IMG_{i}.jpg", f"item{i}".encode()) for i in range(5)]
+    images.append(attachment("IMG_bad.jpg", b"bad"))
+
+    started = time.perf_counter()
+    await cog._process_batch(interaction, images)
+    elapsed = time.perf_counter() - started
+
+    # Each receipt takes ~300 ms end to end; five in sequence would be 1.5 s
+    assert elapsed < 0.8
+
+    embed = sent[-1]
+    assert embed.title == "Processed 5 of 6 Receipts"
+    assert "❌ `IMG_bad.jpg`: OCR API error: unreadable" in embed.description
+    assert storage.count_receipts() == 5
+    # The five readable receipts are extracted together once OCR has settled
+    assert extractor.batches == [5]
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_photo_is_rejected_before_ocr(tmp_path):
+    """Test that a re-upload of a saved receipt's photo skips the pipeline."""
+    import io
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (600, 1200), 250)
+    draw = ImageDraw.Draw(image)
+    for y in range(50, 1150, 40):
+        draw.rectangle((40, y, 40 + (y * 7) % 500, y + 15), fill=20)
+    original, resized = io.BytesIO(), io.BytesIO()
+    image.save(original, format="PNG")
+    image.resize((300, 600)).save(resized, format="JPEG", quality=70)
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    storage = AsyncStorage(Storage(str(tmp_path)))
+    index = ImageHashIndex(tmp_path / "image_hashes.jsonl")
+    ocr = FakeOCR()
+    cog = ReceiptCog(
+        bot, ocr, storage, FakeGuesser(), FakeExtractor(),
+        SimpleNamespace(confidence_threshold=0.7), index,
+    )
+
+    _, filename, _, _ = await cog._process_one(original.getvalue())
+
+    # A smaller, re-compressed copy of the same photo is caught
+    with pytest.raises(DuplicateReceiptError) as excinfo:
+        await cog._process_one(resized.getvalue())
+    assert excinfo.value.filename == filename
+    assert storage.count_receipts() == 1
+
+    # force processes it anyway
+    await cog._process_one(resized.getvalue(), force=True)
+    assert storage.count_receipts() == 2
+
+    storage.close()
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_photo_repeated_in_batch_is_processed_once(tmp_path):
+    """Test that a photo attached twice to one batch is OCR'd and saved once."""
+    import io
+    from PIL import Image, ImageDraw
+
+    photos = []
+    for seed in (7, 13):
+        image = Image.new("L", (600, 1200), 250)
+        draw = ImageDraw.Draw(image)
+        for y in range(50, 1150, 40):
+            draw.rectangle((40, y, 40 + (y * seed) % 500, y + 15), fill=20)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        photos.append(buffer.getvalue())
+
+    class CountingOCR(FakeOCR):
+        calls = 0
+        prepared = 0
+
+        async def prepare(self, image_bytes: bytes) -> bytes:
+            # The first attachment finishes preparing last
+            CountingOCR.prepared += 1
+            if CountingOCR.prepared == 1:
+                await asyncio.sleep(0.05)
+            return image_bytes
+
+        async def process_image(self, image_bytes: bytes, prepared: bool = False) -> str:
+            CountingOCR.calls += 1
+            return await super().process_image(image_bytes, prepared)
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    storage = AsyncStorage(Storage(str(tmp_path)))
+    index = ImageHashIndex(tmp_path / "image_hashes.jsonl")
+    cog = ReceiptCog(
+        bot, CountingOCR(), storage, FakeGuesser(), FakeExtractor(),
+        SimpleNamespace(confidence_threshold=0.7), index,
+    )
+    sent = []
+
+    async def send(content=None, embed=None):
+        sent.append(embed or content)
+
+    def attachment(name: str, data: bytes):
+        async def read():
+            return data
+        return SimpleNamespace(filename=name, read=read)
+
+    images = [
+        attachment("IMG_1.png", photos[0]),
+        attachment("IMG_2.png", photos[1]),
+        attachment("IMG_1_again.png", photos[0]),
+    ]
+    await cog._process_batch(SimpleNamespace(guild_id=1, followup=SimpleNamespace(send=send)), images)
+
+    embed = sent[-1]
+    assert embed.title == "Processed 2 of 3 Receipts"
+    assert "♻️ `IMG_1_again.png`: same photo as `IMG_1.png` in this batch" in embed.description
+    assert CountingOCR.calls == 2
+    assert storage.count_receipts() == 2
+    storage.close()
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_template_receipt_skips_llm(tmp_path):
+    """Test that a receipt parsed by a store template never reaches the extractor."""
+    from pathlib import Path
+
+    aldi_text = (Path(__file__).parent.parent / "data" / "test_output" / "IMG_4006_ocr.txt").read_text()
+
+    class AldiOCR(FakeOCR):
+        async def process_image(self, image_bytes: bytes, prepared: bool = False) -> str:
+            return aldi_text
+
+    class NoLLMExtractor(FakeExtractor):
+        async def extract_receipt_data(self, ocr_text: str, on_item=None) -> dict:
+            raise AssertionError("LLM extraction should not run")
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    storage = AsyncStorage(Storage(str(tmp_path)))
+    templates = TemplateExtractor()
+    cog = ReceiptCog(
+        bot, AldiOCR(), storage, FakeGuesser(), NoLLMExtractor(),
+        SimpleNamespace(confidence_threshold=0.7), templates=templates,
+    )
+
+    receipt, _, issues, _ = await cog._process_one(b"aldi")
+
+    assert receipt.store == "ALDI" and len(receipt.items) == 5
+    assert issues == []
+    assert templates.hits == 1
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_fused_extraction_skips_guessing_call(tmp_path):
+    """Test that fused guesses are used, corrections win and only gaps are guessed."""
+
+    class FusedExtractor(FakeExtractor):
+        async def extract_receipt_data(self, ocr_text: str, on_item=None) -> dict:
+            return {
+                "store_name": "ALDI",
+                "date": "2025-12-30",
+                "total": 6.0,
+                "items": [
+                    {"raw_name": "MLK", "price": 2.5, "guessed_name": "Milk", "confidence": 0.9},
+                    {"raw_name": "BRD", "price": 1.5, "guessed_name": "Bred", "confidence": 0.4},
+                    {"raw_name": "EGG", "price": 2.0},
+                ],
+            }
+
+    class RecordingGuesser(FakeGuesser):
+        def __init__(self):
+            self.guessed = []
+            self.corrections = {}
+
+        def update_corrections(self, corrections):
+            self.corrections = corrections
+
+        correction = ItemGuesser.correction
+
+        async def guess_batch(self, items, store):
+            self.guessed.append([item.raw_name for item in items])
+            return await super().guess_batch(items, store)
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    storage = AsyncStorage(Storage(str(tmp_path)))
+    await storage.save_correction("BRD", "ALDI", "Bread")
+    guesser = RecordingGuesser()
+    cog = ReceiptCog(
+        bot, FakeOCR(), storage, guesser, FusedExtractor(),
+        SimpleNamespace(confidence_threshold=0.7),
+    )
+
+    receipt, _, _, needs_review = await cog._process_one(b"receipt")
+
+    assert [(item.guessed_name, item.confidence) for item in receipt.items] == [
+        ("Milk", 0.9), ("Bread", 1.0), ("Egg", 0.9),
+    ]
+    assert guesser.guessed == [["EGG"]]
+    assert needs_review == 0
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_streaming_table_edits_one_message():
+    """Test that streamed items update one message, throttled, with every item at the end."""
+    messages = []
+
+    class Message:
+        def __init__(self, content):
+            self.content = content
+            self.edits = 0
+
+        async def edit(self, content):
+            self.content = content
+            self.edits += 1
+
+    async def send(content, wait=False):
+        assert wait
+        messages.append(Message(content))
+        return messages[-1]
+
+    table = StreamingItemTable(send, interval=0.05)
+    for index in range(10):
+        await table.add(index, {"raw_name": f"ITEM{index}", "price": 1.5})
+        await asyncio.sleep(0.01)
+    # A retried stream repeats indexes without adding rows
+    await table.add(0, {"raw_name": "ITEM0", "price": 1.5})
+    await table.finish()
+
+    assert len(messages) == 1
+    assert 1 <= messages[0].edits < 10
+    assert messages[0].content.startswith("🧾 Extracted 10 items")
+    assert "ITEM9" in messages[0].content and "$1.50" in messages[0].content
+
+
+@pytest.mark.asyncio
+async def test_streamed_table_finishes_with_final_items():
+    """Test that rows from a longer failed attempt are dropped when a retry wins."""
+    sent = []
+
+    class Message:
+        async def edit(self, content):
+            sent.append(content)
+
+    async def send(content, wait=False):
+        sent.append(content)
+        return Message()
+
+    table = StreamingItemTable(send, interval=0)
+    for index, name in enumerate(["A", "B", "C"]):
+        await table.add(index, {"raw_name": name, "price": 1.0})
+    # The retry streams two items, then extraction returns them
+    final = [{"raw_name": "A", "price": 1.0}, {"raw_name": "B2", "price": 2.0}]
+    for index, item in enumerate(final):
+        await table.add(index, item)
+    await table.finish(final)
+
+    assert sent[-1].startswith("🧾 Extracted 2 items")
+    assert "B2" in sent[-1] and "C " not in sent[-1]
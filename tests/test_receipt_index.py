@@ -0,0 +1,87 @@
+"""Tests for receipt pagination and filename autocomplete."""
+
+import time
+import pytest
+from datetime import datetime
+from bot.storage import FilenameIndex, Storage
+from bot.sqlite_storage import SQLiteStorage
+from bot.models import Receipt, ReceiptItem
+
+
+@pytest.fixture(params=[Storage, SQLiteStorage], ids=["json", "sqlite"])
+def storage(request, tmp_path):
+    """Each storage backend holding ten receipts, every third one verified."""
+    storage = request.param(str(tmp_path))
+    for day in range(1, 11):
+        storage.save_receipt(
+            Receipt(
+                filename="",
+                store="Aldi" if day % 2 else "Coles",
+                datetime=datetime(2025, 12, day, 12, 0),
+                raw_ocr_text="test text",
+                items=[ReceiptItem(raw_name="Item", price=1.0)],
+                total=1.0,
+                verified=day % 3 == 0,
+            )
+        )
+    return storage
+
+
+def test_cursor_pagination(storage):
+    """Test that pages cover every receipt exactly once, in order."""
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page, cursor = storage.iter_receipts(cursor, limit=4)
+        seen.extend(r.filename for r in page)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == storage.list_receipts()
+    assert storage.count_receipts() == 10
+
+
+def test_pagination_with_filters(storage):
+    """Test that filters apply before the page limit."""
+    page, cursor = storage.iter_receipts(limit=2, verified=True)
+    assert [r.datetime.day for r in page] == [3, 6]
+    page, cursor = storage.iter_receipts(cursor, limit=2, verified=True)
+    assert [r.datetime.day for r in page] == [9]
+    assert cursor is None
+
+    page, _ = storage.iter_receipts(limit=25, store="coles")
+    assert len(page) == 5
+
+
+def test_autocomplete_tracks_saves_and_deletes(storage):
+    """Test that the index follows saves and deletes."""
+    filenames = storage.list_receipts()
+    assert storage.complete_filenames("2025-12-0") == filenames[:9]
+    assert storage.complete_filenames("coles", limit=3) == [filenames[1], filenames[3], filenames[5]]
+
+    storage.delete_receipt(filenames[1])
+    assert storage.complete_filenames("2025-12-02") == []
+    assert storage.count_receipts() == 9
+
+
+def test_index_prefix_before_substring():
+    """Test that prefix matches rank ahead of substring matches."""
+    index = FilenameIndex(["2025-12-01_aldi.json", "aldi_2025.json", "2025-11-01_coles.json"])
+    assert index.complete("aldi") == ["aldi_2025.json", "2025-12-01_aldi.json"]
+    assert index.complete("") == sorted(index.after())
+
+
+def test_autocomplete_is_fast_for_large_histories():
+    """Test autocomplete latency over 100k filenames."""
+    names = [f"20{n % 30:02d}-{n % 12 + 1:02d}-01_{n:06d}_store_{n % 97}.json" for n in range(100_000)]
+    index = FilenameIndex(names)
+
+    started = time.perf_counter()
+    for query in ["2024-0", "store_5", "no such receipt", ""]:
+        index.complete(query)
+    elapsed = (time.perf_counter() - started) / 4
+
+    assert elapsed < 0.1
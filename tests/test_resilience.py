@@ -0,0 +1,210 @@
+"""Tests for retries, hedging and circuit breaking."""
+
+import asyncio
+import httpx
+import pytest
+from bot.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderError,
+    ResiliencePolicy,
+    is_retryable,
+)
+
+
+def flaky(*outcomes):
+    """Return a request function that raises or returns each outcome in turn."""
+    remaining = list(outcomes)
+    calls = []
+
+    async def send():
+        calls.append(1)
+        outcome = remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return send, calls
+
+
+def test_retryable_errors():
+    """Test which failures are treated as transient."""
+    assert is_retryable(ProviderError("openrouter", 429, "slow down"))
+    assert is_retryable(ProviderError("openrouter", 503, "unavailable"))
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ProviderError("openrouter", 400, "bad request"))
+    assert not is_retryable(CircuitOpenError("openrouter", 10))
+    assert not is_retryable(ValueError("bad json"))
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_retried():
+    """Test that 429 and 5xx responses are retried until one succeeds."""
+    policy = ResiliencePolicy("test", max_attempts=3, base_delay=0.01)
+    send, calls = flaky(ProviderError("test", 429, "slow"), ProviderError("test", 502, "bad"), "ok")
+
+    assert await policy.call(send) == "ok"
+    assert len(calls) == 3
+    assert policy.stats()["retries"] == 2
+    assert policy.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_client_errors_not_retried():
+    """Test that a 400 is raised at once and does not count against the provider."""
+    policy = ResiliencePolicy("test", base_delay=0.01)
+    send, calls = flaky(ProviderError("test", 400, "bad request"))
+
+    with pytest.raises(ProviderError):
+        await policy.call(send)
+    assert len(calls) == 1
+    assert policy.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_after_honoured():
+    """Test that backoff waits at least as long as Retry-After."""
+    policy = ResiliencePolicy("test", base_delay=0.001)
+    send, _ = flaky(ProviderError("test", 429, "slow", retry_after=0.2), "ok")
+
+    started = asyncio.get_running_loop().time()
+    await policy.call(send)
+    assert asyncio.get_running_loop().time() - started >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_recovers():
+    """Test failing fast while open and closing after a successful trial."""
+    policy = ResiliencePolicy(
+        "test", max_attempts=1, failure_threshold=2, reset_seconds=0.1, base_delay=0.01
+    )
+    send, calls = flaky(*[ProviderError("test", 503, "down")] * 2, "ok")
+
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            await policy.call(send)
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await policy.call(send)
+    assert len(calls) == 2
+
+    await asyncio.sleep(0.15)
+    assert await policy.call(send) == "ok"
+    assert policy.stats()["circuit"] == CircuitBreaker.CLOSED
+    assert policy.stats()["trips"] == 1
+    assert policy.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_trial_reopens_circuit():
+    """Test that a half-open trial failure opens the circuit again."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Only one trial at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_releases_circuit():
+    """Test that cancelling the half-open trial lets the next call through."""
+    policy = ResiliencePolicy("test", max_attempts=1, failure_threshold=1, reset_seconds=0.0)
+    policy.breaker.record_failure()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    trial = asyncio.ensure_future(policy.call(hang))
+    await asyncio.sleep(0.01)
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    send, calls = flaky("ok")
+    assert await policy.call(send) == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_slow_request_hedged():
+    """Test that a request past p95 is duplicated and the faster copy wins."""
+    policy = ResiliencePolicy("test")
+    for _ in range(20):
+        policy.latency("request").add(0.02)
+
+    delays = [1.0, 0.01]
+
+    async def send():
+        await asyncio.sleep(delays.pop(0))
+        return "done"
+
+    started = asyncio.get_running_loop().time()
+    assert await policy.call(send) == "done"
+
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert policy.stats()["hedges"] == 1
+    assert policy.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_timer_excludes_acquire():
+    """Test that time spent waiting for a rate-limit slot does not trigger a hedge."""
+    policy = ResiliencePolicy("test")
+    for _ in range(20):
+        policy.latency("request").add(0.02)
+
+    async def acquire():
+        await asyncio.sleep(0.1)
+
+    async def send():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert await policy.call(send, acquire) == "done"
+    assert policy.stats()["hedges"] == 0
+
+
+@pytest.mark.asyncio
+async def test_latency_tracked_per_kind():
+    """Test that a long request kind is not hedged against a short kind's p95."""
+    policy = ResiliencePolicy("test")
+    for _ in range(20):
+        policy.latency("guess").add(0.01)
+
+    calls = []
+
+    async def send():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    assert await policy.call(send, kind="batch") == "done"
+    assert len(calls) == 1
+    assert policy.stats()["hedges"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedging_disabled_per_call():
+    """Test that hedge=False sends a single request even past the p95."""
+    policy = ResiliencePolicy("test")
+    for _ in range(20):
+        policy.latency("stream").add(0.01)
+
+    calls = []
+
+    async def send():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    assert await policy.call(send, kind="stream", hedge=False) == "done"
+    assert len(calls) == 1
+    assert policy.stats()["latency"]["stream"]["p95_ms"] is not None
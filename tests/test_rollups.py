@@ -0,0 +1,82 @@
+"""Tests for incrementally maintained spending rollups."""
+
+import pytest
+from datetime import datetime
+from bot.storage import Storage
+from bot.sqlite_storage import SQLiteStorage
+from bot.models import Receipt, ReceiptItem
+
+
+@pytest.fixture(params=[Storage, SQLiteStorage], ids=["json", "sqlite"])
+def storage(request, tmp_path):
+    """Each storage backend in an empty data directory."""
+    return request.param(str(tmp_path))
+
+
+def make_receipt(store: str, dt: datetime, prices: list[float]) -> Receipt:
+    """Build a receipt with one Dairy item per price."""
+    return Receipt(
+        filename="",
+        store=store,
+        datetime=dt,
+        raw_ocr_text="test text",
+        items=[ReceiptItem(raw_name=f"Item {i}", price=p, category="Dairy") for i, p in enumerate(prices)],
+        total=sum(prices),
+    )
+
+
+def test_incremental_updates(storage):
+    """Test that save, re-save and delete keep the rollups exact."""
+    aldi = make_receipt("Aldi", datetime(2025, 12, 30, 18, 18), [3.69, 6.19])
+    coles = make_receipt("Coles", datetime(2025, 12, 2, 9, 0), [5.00])
+    filename = storage.save_receipt(aldi)
+    storage.save_receipt(coles)
+
+    assert storage.monthly_summary("2025-12") == (14.88, 2, 3)
+    assert storage.month_breakdown("2025-12")[("Aldi", "Dairy")] == {
+        "total": 9.88, "receipts": 1, "items": 2,
+    }
+
+    # Re-saving replaces the previous contribution instead of adding to it
+    aldi.items.append(ReceiptItem(raw_name="Extra", price=1.00, category="Bakery"))
+    aldi.total = 10.88
+    storage.save_receipt(aldi)
+    assert storage.monthly_summary("2025-12") == (15.88, 2, 4)
+    assert storage.month_breakdown("2025-12")[("Aldi", "Bakery")]["total"] == 1.00
+
+    storage.delete_receipt(filename)
+    assert storage.monthly_summary("2025-12") == (5.00, 1, 1)
+    assert ("Aldi", "Dairy") not in storage.month_breakdown("2025-12")
+    assert storage.monthly_summary("2026-01") == (0.0, 0, 0)
+
+
+def test_range_summary(storage):
+    """Test ranges mixing whole months (rollups) and partial months (scan)."""
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 10, 31, 12, 0), [1.00]))
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 11, 1, 12, 0), [2.00]))
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 11, 20, 12, 0), [4.00]))
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 12, 5, 12, 0), [8.00]))
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 12, 20, 12, 0), [16.00]))
+
+    assert storage.range_summary(datetime(2025, 10, 15), datetime(2025, 12, 10)) == (15.00, 4)
+    assert storage.range_summary(datetime(2025, 11, 1), datetime(2025, 11, 30, 23, 59)) == (6.00, 2)
+    assert storage.range_summary(datetime(2026, 1, 1), datetime(2026, 2, 1)) == (0.0, 0)
+
+
+def test_rebuild_matches_incremental(storage):
+    """Test that a from-scratch rebuild reproduces the incremental rollups."""
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 12, 30, 18, 18), [3.69, 6.19]))
+    storage.save_receipt(make_receipt("Coles", datetime(2026, 1, 2, 15, 48), [14.03]))
+    before = (storage.month_breakdown("2025-12"), storage.month_breakdown("2026-01"))
+
+    assert storage.rebuild_rollups() == 2
+    assert (storage.month_breakdown("2025-12"), storage.month_breakdown("2026-01")) == before
+
+
+def test_built_for_existing_data(tmp_path):
+    """Test that rollups are built on startup for data saved without them."""
+    storage = Storage(str(tmp_path))
+    storage.save_receipt(make_receipt("Aldi", datetime(2025, 12, 30, 18, 18), [3.69, 6.19]))
+    storage.rollups.path.unlink()
+
+    assert Storage(str(tmp_path)).monthly_summary("2025-12") == (9.88, 1, 2)
@@ -0,0 +1,121 @@
+"""Tests for the rate-limited request scheduler."""
+
+import asyncio
+import time
+import pytest
+from bot.services.scheduler import (
+    BACKFILL,
+    INTERACTIVE,
+    RequestScheduler,
+    TokenBucket,
+    current_context,
+    request_context,
+)
+
+
+async def drain(scheduler: RequestScheduler, provider: str, count: int) -> None:
+    """Use up the burst capacity of a provider's request bucket."""
+    for _ in range(count):
+        await scheduler.acquire(provider)
+
+
+def test_token_bucket_delay():
+    """Test bucket refill arithmetic."""
+    bucket = TokenBucket(per_minute=600, capacity=2)
+    assert bucket.delay(1) == 0
+    bucket.take(2)
+    # 10 tokens per second: one token is 100 ms away
+    assert 0.05 < bucket.delay(1) <= 0.1
+    # Requests larger than the capacity only wait for a full bucket
+    assert bucket.delay(50) <= 0.2
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_limit():
+    """Test that requests beyond the burst are spaced at the sustained rate."""
+    # 600 rpm: burst of 100, then one request every 100 ms
+    scheduler = RequestScheduler({"mistral": (600, 0)})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(scheduler.acquire("mistral") for _ in range(103)))
+    elapsed = time.perf_counter() - started
+
+    assert 0.25 < elapsed < 0.6
+    assert scheduler.stats()["mistral"]["granted"] == 103
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_goes_first():
+    """Test that a queued interactive request overtakes earlier backfill requests."""
+    scheduler = RequestScheduler({"openrouter": (600, 0)})
+    await drain(scheduler, "openrouter", 100)
+
+    order = []
+
+    async def request(name: str):
+        await scheduler.acquire("openrouter")
+        order.append(name)
+
+    with request_context(guild_id=1, priority=BACKFILL):
+        backfill = [asyncio.create_task(request(f"backfill{i}")) for i in range(2)]
+    await asyncio.sleep(0)
+    with request_context(guild_id=1, priority=INTERACTIVE):
+        interactive = asyncio.create_task(request("interactive"))
+
+    await asyncio.gather(*backfill, interactive)
+    assert order == ["interactive", "backfill0", "backfill1"]
+
+
+@pytest.mark.asyncio
+async def test_guilds_take_turns():
+    """Test round-robin between guilds within a lane."""
+    scheduler = RequestScheduler({"openrouter": (600, 0)})
+    await drain(scheduler, "openrouter", 100)
+
+    order = []
+
+    async def request(name: str):
+        await scheduler.acquire("openrouter")
+        order.append(name)
+
+    tasks = []
+    with request_context(guild_id=1):
+        tasks += [asyncio.create_task(request(f"a{i}")) for i in range(3)]
+    with request_context(guild_id=2):
+        tasks.append(asyncio.create_task(request("b0")))
+
+    await asyncio.gather(*tasks)
+    assert order == ["a0", "b0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_and_settle():
+    """Test tokens-per-minute limiting and correction by actual usage."""
+    # 600k tpm: burst of 100k tokens, refilled at 10k per second
+    scheduler = RequestScheduler({"openrouter": (0, 600000)})
+    await scheduler.acquire("openrouter", tokens=100000)
+
+    # Estimated 1k but used 3k: the budget is 2k in deficit
+    scheduler.settle("openrouter", estimated=1000, actual=3000)
+    assert scheduler.stats()["openrouter"]["token_budget"] < 0
+
+    # 500 more tokens need 2.5k of refill, about 250 ms
+    started = time.perf_counter()
+    await scheduler.acquire("openrouter", tokens=500)
+    assert 0.2 < time.perf_counter() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_unknown_provider_is_unlimited():
+    """Test that providers without limits are not queued."""
+    scheduler = RequestScheduler({})
+    assert await scheduler.submit("local", lambda: asyncio.sleep(0, result="ok")) == "ok"
+
+
+def test_request_context_resets():
+    """Test that the context is restored after the block."""
+    with request_context(guild_id=7, priority=BACKFILL):
+        assert current_context().guild_id == 7
+        assert current_context().priority == BACKFILL
+    assert current_context().guild_id is None
+    assert current_context().priority == INTERACTIVE
@@ -0,0 +1,104 @@
+"""Tests for the SQLite storage backend."""
+
+import pytest
+from datetime import datetime
+from bot.storage import Storage
+from bot.sqlite_storage import SQLiteStorage, migrate_json_to_sqlite
+from bot.models import Receipt, ReceiptItem
+
+
+def make_receipt(store: str, dt: datetime, verified: bool = False) -> Receipt:
+    """Build a small two-item receipt."""
+    return Receipt(
+        filename="",
+        store=store,
+        datetime=dt,
+        raw_ocr_text="test text",
+        items=[
+            ReceiptItem(raw_name="MILK 2L", price=3.50, category="Dairy"),
+            ReceiptItem(raw_name="BREAD", price=2.00, quantity=2, guessed_name="White Bread"),
+        ],
+        total=7.50,
+        verified=verified,
+    )
+
+
+def test_save_load_delete(tmp_path):
+    """Test the basic receipt round trip."""
+    storage = SQLiteStorage(str(tmp_path))
+
+    receipt = make_receipt("Test Store", datetime(2025, 12, 30, 18, 18))
+    filename = storage.save_receipt(receipt)
+    loaded = storage.load_receipt(filename)
+
+    assert loaded is not None
+    assert loaded.id == receipt.id
+    assert loaded.store == "Test Store"
+    assert [item.raw_name for item in loaded.items] == ["MILK 2L", "BREAD"]
+    assert loaded.items[1].guessed_name == "White Bread"
+    assert storage.list_receipts() == [filename]
+
+    # Re-saving the same receipt overwrites rather than duplicating
+    loaded.verified = True
+    storage.save_receipt(loaded)
+    assert storage.list_receipts() == [filename]
+    assert storage.load_receipt(filename).verified is True
+
+    assert storage.delete_receipt(filename) is True
+    assert storage.load_receipt(filename) is None
+    assert storage.delete_receipt(filename) is False
+
+
+def test_query_filters(tmp_path):
+    """Test that query filters and item spending match the JSON backend."""
+    sqlite_storage = SQLiteStorage(str(tmp_path / "sqlite"))
+    json_storage = Storage(str(tmp_path / "json"))
+
+    receipts = [
+        make_receipt("Aldi", datetime(2025, 11, 3, 10, 0), verified=True),
+        make_receipt("Aldi", datetime(2025, 12, 1, 9, 30)),
+        make_receipt("Coles", datetime(2025, 12, 15, 17, 45), verified=True),
+    ]
+    for receipt in receipts:
+        sqlite_storage.save_receipt(receipt)
+        json_storage.save_receipt(receipt)
+
+    for storage in (sqlite_storage, json_storage):
+        assert len(storage.query_receipts()) == 3
+        assert len(storage.query_receipts(verified=True)) == 2
+        assert len(storage.query_receipts(store="aldi")) == 2
+        december = storage.query_receipts(
+            start=datetime(2025, 12, 1), end=datetime(2025, 12, 31, 23, 59)
+        )
+        assert [r.store for r in december] == ["Aldi", "Coles"]
+
+        assert storage.item_spending("bread") == (12.0, 3)
+        assert storage.item_spending("milk", month="2025-12") == (7.0, 2)
+        assert storage.item_spending("eggs") == (0.0, 0)
+
+
+def test_corrections(tmp_path):
+    """Test correction storage."""
+    storage = SQLiteStorage(str(tmp_path))
+
+    storage.save_correction("GV MLK", "Walmart", "Great Value Milk")
+    storage.save_correction("GV MLK", "Walmart", "Great Value Whole Milk")
+    assert storage.load_corrections() == {"GV MLK|Walmart": "Great Value Whole Milk"}
+
+    assert storage.delete_correction("GV MLK", "Walmart") is True
+    assert storage.delete_correction("GV MLK", "Walmart") is False
+    assert storage.load_corrections() == {}
+
+
+def test_migrate_from_json(tmp_path):
+    """Test one-shot migration from the JSON file layout."""
+    json_storage = Storage(str(tmp_path))
+    json_storage.save_receipt(make_receipt("Aldi", datetime(2025, 12, 30, 18, 18)))
+    json_storage.save_receipt(make_receipt("Coles", datetime(2026, 1, 2, 15, 48)))
+    json_storage.save_correction("GV MLK", "Walmart", "Great Value Milk")
+
+    assert migrate_json_to_sqlite(str(tmp_path)) == (2, 1)
+
+    storage = SQLiteStorage(str(tmp_path))
+    assert storage.list_receipts() == json_storage.list_receipts()
+    assert storage.load_corrections() == {"GV MLK|Walmart": "Great Value Milk"}
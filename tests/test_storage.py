@@ -46,3 +46,126 @@ def test_corrections(tmp_path):
 
     corrections = storage.load_corrections()
     assert "GV MLK|Walmart" not in corrections
+
+
+def test_receipt_cache(tmp_path):
+    """Test LRU caching of parsed receipts with mtime/size invalidation."""
+    storage = Storage(str(tmp_path), cache_size=1)
+
+    receipt = Receipt(
+        filename="",
+        store="Test Store",
+        datetime=datetime(2025, 12, 30, 18, 18),
+        raw_ocr_text="test text",
+        items=[ReceiptItem(raw_name="Item 1", price=5.99)],
+        total=5.99,
+    )
+    filename = storage.save_receipt(receipt)
+
+    first = storage.load_receipt(filename)
+    second = storage.load_receipt(filename)
+    assert second is first
+    assert storage.cache_info()["hits"] == 1
+    assert storage.cache_info()["misses"] == 1
+
+    # Saving invalidates the cached copy
+    first.verified = True
+    storage.save_receipt(first)
+    assert storage.load_receipt(filename).verified is True
+    assert storage.cache_info()["misses"] == 2
+
+    # External edits are detected through the file signature
+    path = storage.receipt_path(filename)
+    path.write_text(path.read_text().replace("Test Store", "Other Store Name"))
+    assert storage.load_receipt(filename).store == "Other Store Name"
+
+    # Bounded size evicts the least recently used entry
+    other = storage.save_receipt(receipt.model_copy(update={"id": "other", "filename": ""}))
+    storage.load_receipt(other)
+    assert storage.cache_info()["size"] == 1
+
+    storage.delete_receipt(filename)
+    assert storage.load_receipt(filename) is None
+
+
+def make_store_receipt(store: str, dt: datetime, total: float = 5.99) -> Receipt:
+    """Build a one-item receipt."""
+    return Receipt(
+        filename="",
+        store=store,
+        datetime=dt,
+        raw_ocr_text="test text",
+        items=[ReceiptItem(raw_name="Item 1", price=total)],
+        total=total,
+    )
+
+
+def test_same_minute_receipts_do_not_collide(tmp_path):
+    """Test that two receipts from one store in the same minute both survive."""
+    storage = Storage(str(tmp_path))
+    dt = datetime(2025, 12, 30, 18, 18)
+
+    first = storage.save_receipt(make_store_receipt("Aldi", dt, 3.69))
+    second = storage.save_receipt(make_store_receipt("Aldi", dt, 6.19))
+
+    assert first != second
+    assert storage.receipt_path(first).parent == tmp_path / "receipts" / "2025" / "12"
+    assert {storage.load_receipt(f).total for f in (first, second)} == {3.69, 6.19}
+
+
+def test_manifest_serves_listing_and_filters(tmp_path):
+    """Test that the manifest answers listing and range queries without reading other files."""
+    storage = Storage(str(tmp_path))
+    storage.save_receipt(make_store_receipt("Aldi", datetime(2025, 11, 3, 10, 0)))
+    december = storage.save_receipt(make_store_receipt("Coles", datetime(2025, 12, 15, 17, 45)))
+
+    entry = storage.manifest.get(december)
+    assert entry["store"] == "Coles"
+    assert entry["path"] == f"2025/12/{december}"
+
+    reopened = Storage(str(tmp_path))
+    assert reopened.list_receipts() == storage.list_receipts()
+    receipts = reopened.query_receipts(start=datetime(2025, 12, 1))
+    assert [r.filename for r in receipts] == [december]
+    assert reopened.cache_info()["misses"] == 1
+
+    reopened.delete_receipt(december)
+    assert Storage(str(tmp_path)).list_receipts() == storage.list_receipts()[:1]
+
+
+def test_flat_layout_is_sharded_on_startup(tmp_path):
+    """Test that receipts from the old flat layout move into month shards."""
+    receipt = make_store_receipt("Aldi", datetime(2025, 12, 30, 18, 18))
+    receipt.filename = "2025-12-30_1818_aldi.json"
+    (tmp_path / "receipts").mkdir()
+    (tmp_path / "receipts" / receipt.filename).write_text(receipt.model_dump_json())
+
+    storage = Storage(str(tmp_path))
+
+    assert storage.list_receipts() == ["2025-12-30_1818_aldi.json"]
+    assert not (tmp_path / "receipts" / "2025-12-30_1818_aldi.json").exists()
+    assert (tmp_path / "receipts" / "2025" / "12" / "2025-12-30_1818_aldi.json").exists()
+    assert storage.load_receipt("2025-12-30_1818_aldi.json").store == "Aldi"
+    assert storage.monthly_summary("2025-12") == (5.99, 1, 1)
+
+
+def test_unreadable_receipt_does_not_block_manifest_build(tmp_path):
+    """Test that a corrupt receipt file is skipped when the manifest is first built."""
+    storage = Storage(str(tmp_path))
+    good = storage.save_receipt(make_store_receipt("Aldi", datetime(2025, 12, 30, 18, 18)))
+    storage.manifest.close()
+    (tmp_path / "manifest.jsonl").unlink()
+    (tmp_path / "receipts" / "2025" / "12" / "2025-12-31_0900_coles_deadbeef.json").write_text("{")
+
+    assert Storage(str(tmp_path)).list_receipts() == [good]
+
+
+def test_empty_manifest_is_rebuilt(tmp_path):
+    """Test that an empty manifest left by an interrupted build is not trusted."""
+    storage = Storage(str(tmp_path))
+    first = storage.save_receipt(make_store_receipt("Aldi", datetime(2025, 11, 3, 10, 0)))
+    second = storage.save_receipt(make_store_receipt("Coles", datetime(2025, 12, 15, 17, 45)))
+    storage.manifest.close()
+    (tmp_path / "manifest.jsonl").write_text("")
+
+    assert Storage(str(tmp_path)).list_receipts() == sorted([first, second])
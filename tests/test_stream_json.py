@@ -0,0 +1,63 @@
+"""Tests for incremental parsing of streamed JSON completions."""
+
+import json
+from bot.services.stream_json import ItemStreamParser
+
+
+RECEIPT = {
+    "store_name": "ALDI",
+    "note": "items",
+    "items": [
+        {"raw_name": "Bread {wholemeal}", "price": 3.69, "tags": ["a", "b"]},
+        {"raw_name": "Say \"cheese\" \\ brie", "price": 6.19},
+        {"raw_name": "Blueberries", "price": 2.29, "extra": {"nested": [1, 2]}},
+    ],
+    "total": 12.17,
+}
+
+
+def feed_in_chunks(parser, text, size):
+    """Feed text in fixed-size chunks and collect everything emitted."""
+    emitted = []
+    for start in range(0, len(text), size):
+        emitted.extend(parser.feed(text[start:start + size]))
+    return emitted
+
+
+def test_items_emitted_as_they_close():
+    """Test that each item is emitted once, in order, whatever the chunking."""
+    text = json.dumps(RECEIPT, indent=2)
+    for size in (1, 7, len(text)):
+        parser = ItemStreamParser()
+        emitted = feed_in_chunks(parser, text, size)
+        assert emitted == list(enumerate(RECEIPT["items"]))
+        assert parser.result() == RECEIPT
+
+
+def test_item_available_before_stream_ends():
+    """Test that an item is emitted as soon as its closing brace arrives."""
+    text = json.dumps(RECEIPT)
+    first_end = text.index('"b"]}') + len('"b"]}')
+    parser = ItemStreamParser()
+
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [(0, RECEIPT["items"][0])]
+
+
+def test_code_fence_and_bad_item_tolerated():
+    """Test that fences are ignored and a malformed item is skipped."""
+    text = '```json\n{"items": [{"raw_name": "A", "price": 1.0}, {"raw_name": NaN-ish}, {"raw_name": "B", "price": 2.0}], "total": 3.0}\n```'
+    parser = ItemStreamParser()
+
+    emitted = feed_in_chunks(parser, text, 5)
+
+    assert [item["raw_name"] for _, item in emitted] == ["A", "B"]
+    assert [index for index, _ in emitted] == [0, 1]
+
+
+def test_other_arrays_ignored():
+    """Test that objects in arrays under other keys, or nested deeper, are not emitted."""
+    text = json.dumps({"payments": [{"method": "card"}], "meta": {"items": [{"x": 1}]}, "items": []})
+    parser = ItemStreamParser()
+
+    assert feed_in_chunks(parser, text, 3) == []
@@ -0,0 +1,77 @@
+"""Tests for store-template receipt extraction."""
+
+from datetime import datetime
+from pathlib import Path
+from bot.services.templates import TemplateExtractor
+
+
+SAMPLES = Path(__file__).parent.parent / "data" / "test_output"
+ALDI_TEXT = (SAMPLES / "IMG_4006_ocr.txt").read_text()
+
+
+def sum_matches_total(receipt):
+    """Validation stand-in: the items must add up to the total."""
+    items_sum = sum(item.price * item.quantity for item in receipt.items)
+    return [] if abs(items_sum - receipt.total) <= 0.10 else ["sum mismatch"]
+
+
+def test_aldi_receipt_extracted():
+    """Test that the ALDI sample is parsed completely without an LLM."""
+    extractor = TemplateExtractor()
+    receipt = extractor.extract(ALDI_TEXT, sum_matches_total)
+
+    assert receipt is not None
+    assert receipt.store == "ALDI"
+    assert receipt.datetime == datetime(2025, 12, 30, 18, 18)
+    assert receipt.total == 24.05
+    assert receipt.tax == 0.00
+    assert receipt.payment_method == "Card"
+    assert [(item.sku, item.raw_name, item.price) for item in receipt.items] == [
+        ("399365", "TradWmealBread750g", 3.69),
+        ("405617", "EggsFreeRange 700g", 6.19),
+        ("380204", "Blueberries 170g", 2.29),
+        ("403073", "VanillaYogurt 990g", 6.99),
+        ("494093", "YogMngBlood0rg700g", 4.89),
+    ]
+    assert receipt.raw_ocr_text == ALDI_TEXT
+    assert extractor.stats() == {"attempts": 1, "hits": 1, "hit_rate": 1.0, "declined": {}}
+
+
+def test_markdown_decoration_ignored():
+    """Test that headings and bold markers added by OCR do not break the grammar."""
+    text = ALDI_TEXT.replace("ALDI STORES", "# ALDI STORES").replace(
+        "Total (INCL GST) $ 24.05", "**Total (INCL GST) $ 24.05**"
+    )
+    assert TemplateExtractor().extract(text, sum_matches_total) is not None
+
+
+def test_other_stores_fall_back():
+    """Test that receipts without a template are left to the LLM."""
+    extractor = TemplateExtractor()
+    for name in ["IMG_4008_ocr.txt", "IMG_4073_ocr.txt", "IMG_4108_ocr.txt"]:
+        assert extractor.extract((SAMPLES / name).read_text(), sum_matches_total) is None
+
+    assert extractor.stats()["hits"] == 0
+    assert extractor.stats()["declined"] == {}
+
+
+def test_unrecognised_item_line_declines():
+    """Test that a priced line outside the grammar rejects the whole receipt."""
+    text = ALDI_TEXT.replace(
+        "494093 YogMngBlood0rg700g 4.89 A",
+        "494093 YogMngBlood0rg700g 4.89 A\n2 x 1.99 3.98",
+    )
+    extractor = TemplateExtractor()
+
+    assert extractor.extract(text, sum_matches_total) is None
+    assert extractor.declined == {"ALDI": 1}
+
+
+def test_validation_failure_declines():
+    """Test that a parsed receipt whose items do not add up is not used."""
+    text = ALDI_TEXT.replace("380204 Blueberries 170g 2.29 A\n", "")
+    extractor = TemplateExtractor()
+
+    assert extractor.extract(text, sum_matches_total) is None
+    assert extractor.extract(ALDI_TEXT, sum_matches_total) is not None
+    assert extractor.hit_rate == 0.5
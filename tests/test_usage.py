@@ -0,0 +1,171 @@
+"""Tests for API usage and cost accounting."""
+
+import asyncio
+import sqlite3
+import discord
+import pytest
+from types import SimpleNamespace
+from discord.ext import commands
+from bot.cogs.admin import AdminCog
+from bot.services.ai_extractor import AIExtractor
+from bot.services.resilience import ProviderError, ResiliencePolicy
+from bot.services.scheduler import request_context
+from bot.services.usage import SCHEMA, EXTRACTION, GUESSING, OCR, ModelPrice, UsageTracker, usage_tokens
+
+
+def test_record_and_rollup(tmp_path):
+    """Test that calls are buffered, priced and rolled up per stage and model."""
+    usage = UsageTracker(tmp_path / "usage.db", flush_every=3)
+
+    with request_context(guild_id=42):
+        usage.record(OCR, "mistral", "mistral-ocr-latest", latency_ms=800, pages=1)
+        usage.record(
+            EXTRACTION, "openrouter", "openai/gpt-4o-mini", latency_ms=1200,
+            prompt_tokens=1_000_000, completion_tokens=100_000, store="ALDI",
+        )
+    # Buffered until flush_every calls
+    assert usage.conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0] == 0
+
+    with request_context(guild_id=42):
+        usage.record(
+            GUESSING, "openrouter", "openai/gpt-4o-mini", latency_ms=400,
+            prompt_tokens=100, completion_tokens=50, cost=0.5, store="ALDI",
+        )
+    assert usage.conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0] == 3
+    usage.record(GUESSING, "openrouter", "unknown/model", latency_ms=300, ok=False)
+
+    rows = {row["stage"]: row for row in usage.rollup("day", 1, guild_id=42)}
+    assert set(rows) == {OCR, EXTRACTION, GUESSING}
+    assert rows[OCR]["cost"] == pytest.approx(0.001)
+    assert rows[EXTRACTION]["cost"] == pytest.approx(0.15 + 0.06)
+    # A provider-reported cost wins over the price table
+    assert rows[GUESSING]["cost"] == 0.5
+
+    # The call outside the guild context is counted only without a guild filter
+    everything = usage.rollup("month", 1)
+    assert sum(row["calls"] for row in everything) == 4
+    assert sum(row["failures"] for row in everything) == 1
+
+    stores = usage.top_stores("day", 1, guild_id=42)
+    assert stores[0]["store"] == "ALDI"
+    assert stores[0]["cost"] == pytest.approx(0.71)
+    usage.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_from_event_loop_runs_in_thread(tmp_path):
+    """Test that a batch recorded on the event loop is written by a worker thread."""
+    import threading
+
+    class RecordingTracker(UsageTracker):
+        threads = []
+
+        def flush(self):
+            self.threads.append(threading.current_thread())
+            super().flush()
+
+    usage = RecordingTracker(tmp_path / "usage.db", flush_every=2)
+    usage.record(OCR, "mistral", "mistral-ocr-latest", latency_ms=800, pages=1)
+    usage.record(OCR, "mistral", "mistral-ocr-latest", latency_ms=800, pages=1)
+    await asyncio.gather(*usage._flushes)
+
+    assert usage.threads and threading.main_thread() not in usage.threads
+    assert usage.conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0] == 2
+    usage.close()
+
+def test_usage_tokens_and_prices():
+    """Test reading usage blocks from dicts and SDK objects, and price estimates."""
+    assert usage_tokens({"prompt_tokens": 10, "completion_tokens": 5, "cost": 0.01}) == (10, 5, 0.01)
+    assert usage_tokens(SimpleNamespace(prompt_tokens=10, completion_tokens=None)) == (10, 0, None)
+    assert usage_tokens(None) == (0, 0, None)
+    assert ModelPrice(1.0, 2.0).cost(1_000_000, 500_000, 0) == pytest.approx(2.0)
+
+
+@pytest.mark.asyncio
+async def test_extraction_records_usage(tmp_path):
+    """Test that an extraction request is recorded with its store, tokens and cost."""
+    usage = UsageTracker(tmp_path / "usage.db")
+
+    async def complete(body):
+        extracted = {"store_name": "ALDI", "items": [], "total": 2.5}
+        return extracted, {"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000, "cost": 0.0002}
+
+    extractor = AIExtractor(api_key="test", usage=usage)
+    extractor._complete = complete
+    with request_context(guild_id=7):
+        await extractor.extract_receipt_data("ALDI STORES\nMILK 2.50")
+
+    [row] = usage.rollup("day", 1, guild_id=7)
+    assert row["stage"] == EXTRACTION
+    assert row["prompt_tokens"] == 900
+    assert row["cost"] == pytest.approx(0.0002)
+    assert usage.top_stores("day", 1, guild_id=7)[0]["store"] == "ALDI"
+    usage.close()
+
+
+@pytest.mark.asyncio
+async def test_admin_usage_command(tmp_path):
+    """Test that /admin usage reports this server's totals per day."""
+    usage = UsageTracker(tmp_path / "usage.db")
+    with request_context(guild_id=1):
+        usage.record(OCR, "mistral", "mistral-ocr-latest", latency_ms=800, pages=2)
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    cog = AdminCog(bot, usage)
+    sent = []
+
+    async def send_message(embed=None, ephemeral=False):
+        sent.append(embed)
+
+    interaction = SimpleNamespace(guild_id=1, response=SimpleNamespace(send_message=send_message))
+    await cog.usage_report.callback(cog, interaction, "day", 7)
+
+    embed = sent[0]
+    assert embed.fields[0].value == "$0.0020"
+    assert "ocr `mistral-ocr-latest`: 1 calls, 2 pages" in embed.fields[2].value
+    usage.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_and_retry_attempts_recorded(tmp_path):
+    """Test that retries and losing hedges are recorded and counted, not just the winner."""
+    usage = UsageTracker(tmp_path / "usage.db")
+    extractor = AIExtractor(
+        api_key="test", usage=usage,
+        resilience=ResiliencePolicy("openrouter", base_delay=0.01),
+    )
+    for _ in range(20):
+        extractor.resilience.latency(EXTRACTION).add(0.01)
+    outcomes = [ProviderError("openrouter", 503, "down"), 1.0, 0.02]
+
+    async def complete(body):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        await asyncio.sleep(outcome)
+        usage_block = {"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000, "cost": 0.0002}
+        return {"store_name": "ALDI", "items": [], "total": 2.5}, usage_block
+
+    extractor._complete = complete
+    await extractor.extract_receipt_data("ALDI STORES\nMILK 2.50")
+    # Let the cancelled loser record itself
+    await asyncio.sleep(0.01)
+
+    [row] = usage.rollup("day", 1)
+    assert row["calls"] == 3
+    assert (row["failures"], row["retries"], row["hedges"]) == (2, 1, 1)
+    # The retry lost to the hedge after its prompt was sent, so the prompt is counted
+    assert row["prompt_tokens"] > 900
+    usage.close()
+
+
+def test_old_database_gains_attempt_column(tmp_path):
+    """Test that a usage database from before attempts were tagged is migrated."""
+    conn = sqlite3.connect(tmp_path / "usage.db")
+    conn.executescript(SCHEMA.replace(",\n    attempt TEXT NOT NULL DEFAULT 'first'", ""))
+    conn.close()
+
+    usage = UsageTracker(tmp_path / "usage.db")
+    usage.record(OCR, "mistral", "mistral-ocr-latest", latency_ms=800, pages=1)
+    assert usage.rollup("day", 1)[0]["retries"] == 0
+    usage.close()